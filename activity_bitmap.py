@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+Activity Bitmaps for PaperPacer
+
+This module keeps one bitmap of active days per student, phase and year: bit
+``n`` is set when the student logged progress on day ``n`` of the year
+(0-based day of year). Bitmaps are updated on every check-in, so streaks and
+heatmaps can be computed with a few integer bit operations instead of
+loading and walking the student's whole progress history.
+
+Phase id 0 is the student's all-phases bitmap. Each row also stores the
+longest streak that ends within its year (counting days carried over from
+earlier years), so the longest streak overall is a single MAX query.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Bitmap covering every student phase; per-phase rows use the phase id
+ALL_PHASES = 0
+
+# 366 days rounded up to whole bytes
+BITMAP_BYTES = 46
+
+
+# --- Bit operations -------------------------------------------------------
+
+def day_index(day: date) -> int:
+    """0-based day of the year"""
+    return day.timetuple().tm_yday - 1
+
+
+def days_in_year(year: int) -> int:
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def bits_from_bytes(data: Optional[bytes]) -> int:
+    return int.from_bytes(data, 'little') if data else 0
+
+
+def bits_to_bytes(bits: int) -> bytes:
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+
+def run_ending_at(bits: int, index: int) -> int:
+    """Number of consecutive set bits ending at (and including) ``index``"""
+    if index < 0 or not (bits >> index) & 1:
+        return 0
+    # The highest clear bit below index bounds the run
+    gaps = ~bits & ((1 << (index + 1)) - 1)
+    return index + 1 if gaps == 0 else index - gaps.bit_length() + 1
+
+
+def leading_run(bits: int) -> int:
+    """Number of consecutive set bits starting at day 0"""
+    return (~bits & (bits + 1)).bit_length() - 1
+
+
+def longest_run(bits: int) -> int:
+    """Length of the longest run of set bits"""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def active_indexes(bits: int) -> List[int]:
+    """Indexes of the set bits, in ascending order"""
+    indexes = []
+    while bits:
+        lowest = bits & -bits
+        indexes.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return indexes
+
+
+# --- Storage ----------------------------------------------------------------
+
+def _get_row(student_id: int, phase_id: int, year: int, create: bool = False):
+    from app import db, ActivityBitmap
+
+    row = ActivityBitmap.query.filter_by(student_id=student_id, phase_id=phase_id, year=year).first()
+    if row is None and create:
+        row = ActivityBitmap(student_id=student_id, phase_id=phase_id, year=year,
+                             bits=bits_to_bytes(0), longest_streak=0)
+        db.session.add(row)
+    return row
+
+
+def _carry_into(student_id: int, phase_id: int, year: int) -> int:
+    """Length of the streak running through December 31 of the year before ``year``"""
+    carry = 0
+    previous_year = year - 1
+    while True:
+        row = _get_row(student_id, phase_id, previous_year)
+        if row is None:
+            return carry
+        length = days_in_year(previous_year)
+        run = run_ending_at(bits_from_bytes(row.bits), length - 1)
+        carry += run
+        if run < length:
+            return carry
+        previous_year -= 1
+
+
+def _refresh_longest(row, carry: int):
+    bits = bits_from_bytes(row.bits)
+    row.longest_streak = max(longest_run(bits), leading_run(bits) + carry if bits & 1 else 0)
+
+
+def record_activity(student_id: int, day: date, phase_id: Optional[int] = None):
+    """
+    Mark ``day`` active in the student's bitmap (and the phase bitmap if given).
+
+    The caller commits the session, together with the progress log.
+    """
+    phase_ids = [ALL_PHASES] if not phase_id else [ALL_PHASES, phase_id]
+    for pid in phase_ids:
+        row = _get_row(student_id, pid, day.year, create=True)
+        bits = bits_from_bytes(row.bits)
+        index = day_index(day)
+        if (bits >> index) & 1:
+            continue
+        bits |= 1 << index
+        row.bits = bits_to_bytes(bits)
+        _refresh_longest(row, _carry_into(student_id, pid, day.year))
+
+        # A run reaching December 31 extends into the next year's leading run
+        last_day = days_in_year(day.year) - 1
+        if run_ending_at(bits, last_day) >= last_day - index + 1:
+            next_row = _get_row(student_id, pid, day.year + 1)
+            if next_row is not None:
+                _refresh_longest(next_row, _carry_into(student_id, pid, day.year + 1))
+
+
+def get_streaks(student_id: int, phase_id: Optional[int] = None,
+                today: Optional[date] = None) -> Tuple[int, int]:
+    """
+    Return (current streak, longest streak) in days.
+
+    The current streak is the run of active days ending today, or ending
+    yesterday if today has no progress logged yet.
+    """
+    from app import db, ActivityBitmap
+
+    today = today or date.today()
+    pid = phase_id or ALL_PHASES
+
+    longest = db.session.query(db.func.max(ActivityBitmap.longest_streak)).filter_by(
+        student_id=student_id, phase_id=pid
+    ).scalar() or 0
+
+    current = 0
+    for day in (today, today - timedelta(days=1)):
+        row = _get_row(student_id, pid, day.year)
+        if row is None:
+            continue
+        index = day_index(day)
+        run = run_ending_at(bits_from_bytes(row.bits), index)
+        if run:
+            current = run
+            if run == index + 1:
+                current += _carry_into(student_id, pid, day.year)
+            break
+
+    return current, longest
+
+
+def get_heatmap(student_id: int, year: int, phase_id: Optional[int] = None) -> Dict[str, any]:
+    """Active days of ``year`` for an activity heatmap"""
+    row = _get_row(student_id, phase_id or ALL_PHASES, year)
+    bits = bits_from_bytes(row.bits) if row else 0
+    start = date(year, 1, 1)
+
+    return {
+        'year': year,
+        'active_days': [(start + timedelta(days=i)).isoformat() for i in active_indexes(bits)],
+        'total_active_days': bin(bits).count('1'),
+        'longest_streak_in_year': row.longest_streak if row else 0
+    }
+
+
+def backfill_from_progress_logs(student_id: Optional[int] = None) -> int:
+    """
+    Rebuild bitmaps from existing ProgressLog rows.
+
+    Args:
+        student_id: Only rebuild this student's bitmaps (default: everyone)
+
+    Returns:
+        Number of bitmap rows written
+    """
+    from app import db, ActivityBitmap, ProgressLog
+
+    query = db.session.query(ProgressLog.student_id, ProgressLog.phase_id, ProgressLog.date).distinct()
+    delete = ActivityBitmap.query
+    if student_id is not None:
+        query = query.filter(ProgressLog.student_id == student_id)
+        delete = delete.filter_by(student_id=student_id)
+
+    # Build every bitmap in memory, then write each row once
+    bitmaps = {}
+    for sid, pid, day in query:
+        if day is None:
+            continue
+        for key_pid in ([ALL_PHASES] if not pid else [ALL_PHASES, pid]):
+            key = (sid, key_pid, day.year)
+            bitmaps[key] = bitmaps.get(key, 0) | (1 << day_index(day))
+
+    delete.delete(synchronize_session=False)
+
+    carries = {}
+    for sid, pid, year in sorted(bitmaps):
+        bits = bitmaps[(sid, pid, year)]
+        carry = carries.get((sid, pid, year - 1), 0)
+        row = ActivityBitmap(student_id=sid, phase_id=pid, year=year, bits=bits_to_bytes(bits))
+        _refresh_longest(row, carry)
+        db.session.add(row)
+
+        length = days_in_year(year)
+        trailing = run_ending_at(bits, length - 1)
+        carries[(sid, pid, year)] = carry + trailing if trailing == length else trailing
+
+    db.session.commit()
+    return len(bitmaps)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+"""
+Admin Endpoint Authentication
+
+Operational endpoints (profiler dumps, memory reports) are not tied to a
+student account. They are protected by a shared token from the ADMIN_TOKEN
+setting, sent in the X-Admin-Token header. When no token is configured the
+endpoints are disabled entirely.
+"""
+
+import hmac
+from functools import wraps
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+
+def token_matches(expected, supplied) -> bool:
+    """Constant-time comparison of a configured token with a supplied one"""
+    if not expected or not supplied:
+        return False
+    return hmac.compare_digest(str(expected), str(supplied))
+
+
+def admin_token_required(view):
+    """Reject requests that do not carry the configured admin token"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        from flask import current_app, jsonify, request
+
+        expected = current_app.config.get('ADMIN_TOKEN')
+        if not expected:
+            return jsonify({'error': 'Admin endpoints are disabled'}), 404
+
+        if not token_matches(expected, request.headers.get(ADMIN_TOKEN_HEADER)):
+            return jsonify({'error': 'Access denied'}), 403
+
+        return view(*args, **kwargs)
+
+    return wrapped
@@ -1,12 +1,15 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import contains_eager
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import json
 import secrets
 import os
 from schedule_coordinator import ScheduleCoordinator, create_timeline_visualization_data
+from apportionment import apportion, intensity_weight, intensity_capacity
+from task_classifier import classify_task_type, task_priority
+from task_plans import LegacyPlan, compile_phase_plans, compile_task_list, plan_version
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -15,6 +18,21 @@ import enum
 
 # Import configuration
 from config.config import config
+import metrics
+import profiler
+import memory_tracker
+import server_timing
+import activity_bitmap
+import passwords
+import what_if
+import change_tracking
+import bulk_migration
+import cold_archive
+import read_routing
+import fragment_cache
+import live_events
+from dependencies import TaskNode, compile_dependencies, resolve_edges
+from redistribution import TaskSlot, plan_redistribution
 
 app = Flask(__name__)
 
@@ -23,15 +41,39 @@ config_name = os.environ.get('FLASK_ENV') or 'default'
 app.config.from_object(config[config_name])
 
 # Create SQLAlchemy instance after configuring app
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': read_routing.RoutingSession})
 db.init_app(app)
 
+# WAL journaling, and GET requests read through a read-only engine
+read_routing.init_app(app, db)
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
+# Request, database and background-work metrics exported on /metrics
+metrics.init_app(app)
+
+# Opt-in sampling profiler and per-request deep profiles
+profiler.init_app(app)
+
+# Opt-in per-worker memory growth tracking
+memory_tracker.init_app(app)
+
+# Server-Timing header and per-request timing log line
+server_timing.init_app(app)
+
+# Per-student schedule versions for caches of derived schedule data
+change_tracking.init_app(app)
+
+# {% cache %} tag for template fragments that only change with the schedule
+fragment_cache.init_app(app)
+
+# Schedule and progress change events for the live update stream
+live_events.init_app(app)
+
 # Add custom Jinja filter for JSON parsing
 @app.template_filter('from_json')
 def from_json_filter(json_str):
@@ -39,41 +81,55 @@ def from_json_filter(json_str):
         return json.loads(json_str)
     return []
 
+def build_email(to_email, subject, body_text, body_html=None):
+    """Build a plain-text email with an optional HTML alternative"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = app.config['MAIL_DEFAULT_SENDER']
+    msg['To'] = to_email
+    
+    # Add text part
+    text_part = MIMEText(body_text, 'plain')
+    msg.attach(text_part)
+    
+    # Add HTML part if provided
+    if body_html:
+        html_part = MIMEText(body_html, 'html')
+        msg.attach(html_part)
+    
+    return msg
+
+def open_smtp_connection():
+    """Connect and log in to the configured SMTP server (caller quits it)"""
+    server = smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT'])
+    if app.config.get('MAIL_USE_TLS', True):
+        server.starttls()
+    if app.config.get('MAIL_USERNAME'):
+        server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
+    return server
+
 def send_email(to_email, subject, body_text, body_html=None):
     """Send an email using SMTP configuration"""
     if not app.config.get('MAIL_ENABLED', False):
         print(f"Email sending disabled. Would have sent to {to_email}: {subject}")
+        metrics.EMAILS.inc(outcome='disabled')
         return False
     
     try:
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = app.config['MAIL_DEFAULT_SENDER']
-        msg['To'] = to_email
-        
-        # Add text part
-        text_part = MIMEText(body_text, 'plain')
-        msg.attach(text_part)
-        
-        # Add HTML part if provided
-        if body_html:
-            html_part = MIMEText(body_html, 'html')
-            msg.attach(html_part)
+        msg = build_email(to_email, subject, body_text, body_html)
         
         # Send email
-        server = smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT'])
-        server.starttls()
-        server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
-        
+        server = open_smtp_connection()
         server.send_message(msg)
         server.quit()
         
         print(f"Email sent successfully to {to_email}")
+        metrics.EMAILS.inc(outcome='sent')
         return True
         
     except Exception as e:
         print(f"Failed to send email to {to_email}: {str(e)}")
+        metrics.EMAILS.inc(outcome='failed')
         return False
 
 # Database Models
@@ -96,16 +152,48 @@ class Student(UserMixin, db.Model):
     # Multi-phase system flag
     is_multi_phase = db.Column(db.Boolean, default=False)  # Migration flag
     
+    # Bumped on every change to the student's phases or tasks (see change_tracking.py)
+    schedule_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Cold archive (see cold_archive.py): set while the student's rows live in StudentArchive
+    archived_at = db.Column(db.DateTime, nullable=True)
+    last_login_at = db.Column(db.DateTime, nullable=True)
+    
+    # Daily digest (see digest.py): the date the student's last digest went out
+    digest_sent_on = db.Column(db.Date, nullable=True)
+    
     # Relationships
     schedule_items = db.relationship('ScheduleItem', backref='student', lazy=True)
     progress_logs = db.relationship('ProgressLog', backref='student', lazy=True)
     project_phases = db.relationship('ProjectPhase', backref='student', lazy=True, cascade='all, delete-orphan')
     
+    def recent_progress_logs(self, limit=5):
+        """Latest ``limit`` progress logs, oldest first, without loading the full history"""
+        logs = ProgressLog.query.filter_by(student_id=self.id).order_by(
+            ProgressLog.id.desc()
+        ).limit(limit).all()
+        return list(reversed(logs))
+    
+    def schedule_item_counts(self):
+        """Total and completed schedule item counts, computed in SQL"""
+        total, completed = db.session.query(
+            db.func.count(ScheduleItem.id),
+            db.func.coalesce(db.func.sum(db.case((ScheduleItem.completed == True, 1), else_=0)), 0)
+        ).filter(ScheduleItem.student_id == self.id).one()
+        return {'total': total, 'completed': completed}
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+    
+    def upgrade_password_hash(self, password):
+        """Rehash a just-verified password if PASSWORD_HASH_METHOD has changed"""
+        if passwords.needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
     
     def generate_reset_token(self):
         self.reset_token = secrets.token_urlsafe(32)
@@ -135,6 +223,13 @@ class ScheduleItem(db.Model):
     status = db.Column(db.String(20), default='not_started')  # 'not_started', 'in_progress', 'completed', 'deferred'
     completed = db.Column(db.Boolean, default=False)  # Keep for backward compatibility
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    plan_version = db.Column(db.String(16))  # Task plan that generated the item, if any
+
+class ProgressLogTask(db.Model):
+    """One completed task recorded by a progress log (normalized tasks_completed lists)"""
+    progress_log_id = db.Column(db.Integer, db.ForeignKey('progress_log.id'), primary_key=True)
+    task_id = db.Column(db.Integer, primary_key=True, index=True)
+    is_phase_task = db.Column(db.Boolean, primary_key=True, default=False)  # PhaseTask id, else ScheduleItem id
 
 class ProgressLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -152,6 +247,101 @@ class ProgressLog(db.Model):
     
     # Relationship to phase
     phase = db.relationship('ProjectPhase', backref='progress_logs')
+    
+    # Completed tasks, normalized alongside the JSON columns
+    completed_task_links = db.relationship('ProgressLogTask', backref='progress_log', lazy=True,
+                                           cascade='all, delete-orphan')
+    completed_task_count = db.column_property(
+        db.select(db.func.count(ProgressLogTask.task_id))
+        .where(ProgressLogTask.progress_log_id == id)
+        .correlate_except(ProgressLogTask)
+        .scalar_subquery()
+    )
+    
+    def task_count(self):
+        """Completed tasks of this log; logs without links yet fall back to their JSON lists"""
+        if self.completed_task_count:
+            return self.completed_task_count
+        task_ids = set()
+        for value in (self.tasks_completed, self.phase_tasks_completed):
+            try:
+                ids = json.loads(value) if value else []
+            except (TypeError, ValueError):
+                continue
+            if isinstance(ids, list):
+                task_ids.update(str(task_id) for task_id in ids)
+        return len(task_ids)
+    
+    def add_completed_tasks(self, task_ids, is_phase_task):
+        """Link completed task ids (ints or numeric strings) to this log"""
+        linked = {(link.task_id, link.is_phase_task) for link in self.completed_task_links}
+        for task_id in task_ids:
+            try:
+                key = (int(task_id), bool(is_phase_task))
+            except (TypeError, ValueError):
+                continue
+            if key not in linked:
+                linked.add(key)
+                self.completed_task_links.append(ProgressLogTask(task_id=key[0], is_phase_task=key[1]))
+
+class ActivityBitmap(db.Model):
+    """Days with logged progress for one student, phase (0 = all phases) and year"""
+    __table_args__ = (db.UniqueConstraint('student_id', 'phase_id', 'year', name='uq_activity_bitmap'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False, index=True)
+    phase_id = db.Column(db.Integer, nullable=False, default=0)  # Not a foreign key: 0 means all phases
+    year = db.Column(db.Integer, nullable=False)
+    bits = db.Column(db.LargeBinary(46), nullable=False)  # Bit n set = active on day n of the year
+    longest_streak = db.Column(db.Integer, default=0)  # Longest streak ending within this year
+
+class JobLock(db.Model):
+    """Lease held by the one process running a background job (see job_lock.py)"""
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class JobCheckpoint(db.Model):
+    """Resume point and running totals of a chunked background job (see bulk_migration.py)"""
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Last id fully processed (keyset position)
+    processed = db.Column(db.Integer, nullable=False, default=0)  # Rows processed across runs
+    items = db.Column(db.Integer, nullable=False, default=0)  # Child rows written across runs
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StudentArchive(db.Model):
+    """An inactive student's phases, tasks and progress logs as zlib-compressed JSON (see cold_archive.py)"""
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    format_version = db.Column(db.Integer, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    raw_bytes = db.Column(db.Integer, nullable=False, default=0)  # JSON size before compression
+    payload = db.Column(db.LargeBinary, nullable=False)
+
+class ScheduleChange(db.Model):
+    """Latest change to one phase or task, for delta sync (see change_tracking.py)"""
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'kind', 'entity_id', name='uq_schedule_change'),
+        db.Index('ix_schedule_change_student_version', 'student_id', 'version'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # schedule_version the change produced
+    kind = db.Column(db.String(10), nullable=False)  # 'phase', 'task' or 'reset'
+    entity_id = db.Column(db.Integer, nullable=False, default=0)  # phase or task id; 0 for resets
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+class LiveEvent(db.Model):
+    """Change notice streamed to a student's open pages (see live_events.py)"""
+    __table_args__ = {'sqlite_autoincrement': True}  # ids are the event stream's cursor; never reused
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # 'schedule' or 'progress'
+    version = db.Column(db.Integer)  # schedule_version after a schedule change
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
 # Phase Type Enumeration
 class PhaseType(enum.Enum):
@@ -188,6 +378,7 @@ class PhaseTask(db.Model):
     status = db.Column(db.String(20), default='not_started')  # 'not_started', 'in_progress', 'completed', 'deferred'
     completed = db.Column(db.Boolean, default=False)  # Keep for backward compatibility
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    plan_version = db.Column(db.String(16))  # Task plan that generated the task, if any
     
     # Computed property for student_id (for backward compatibility)
     @property
@@ -286,6 +477,122 @@ PHASE_TEMPLATES = {
     }
 }
 
+# Legacy 12-week thesis timeline tasks organized by phase (single-phase schedules)
+LEGACY_WEEKLY_TASKS = {
+    # Weeks 1-2: Literature Review Foundation
+    1: [
+        "Create comprehensive list of initial sources from adviser recommendations",
+        "Set up note-taking system with template for articles",
+        "Begin wide reading to orient toward topic",
+        "Start populating reading queue using citation strategies",
+        "Begin thesis journal for daily progress and reflections"
+    ],
+    2: [
+        "Skim and take detailed notes on 2 articles per day",
+        "Identify research questions and motivations in readings",
+        "Begin identifying 2-3 major theoretical frameworks",
+        "Organize sources by theme/topic (not chronologically)",
+        "Meet with adviser to discuss promising directions"
+    ],
+    
+    # Weeks 3-4: Refining the Research Question
+    3: [
+        "Continue skimming 2 articles per day",
+        "Create literature synopsis extracting key elements",
+        "Identify commonalities and literature gaps",
+        "Draft 2-3 potential research questions",
+        "Practice 3-sentence elevator pitch for project"
+    ],
+    4: [
+        "Finalize specific research question with adviser feedback",
+        "Clarify if question is empirical, theoretical, or both",
+        "Identify key concepts and variables",
+        "Determine sociological significance of question",
+        "Draft one-paragraph research gap statement"
+    ],
+    
+    # Weeks 5-6: Methodology Design
+    5: [
+        "Choose primary research method",
+        "Identify validated instruments from literature",
+        "Collect examples of similar studies and methods",
+        "Draft Methods section outline (sampling, procedure, instruments)",
+        "Review methodological blueprints"
+    ],
+    6: [
+        "Draft survey, interview guide, or observation plan",
+        "Design backwards from hypothetical results",
+        "Calculate sample size and feasibility constraints",
+        "Create data collection strategy",
+        "Meet with adviser for methods input"
+    ],
+    
+    # Weeks 7-8: Testing and Refinement
+    7: [
+        "Pilot instruments with 3-5 participants",
+        "Refine based on clarity and usefulness",
+        "Finalize sampling criteria and recruitment methods",
+        "Begin preparing IRB materials",
+        "Draft consent forms and recruitment scripts"
+    ],
+    8: [
+        "Conduct second round of pilot testing if needed",
+        "Finalize instruments and consent materials",
+        "Start writing research proposal introduction",
+        "Draft methods section",
+        "Create project timeline"
+    ],
+    
+    # Weeks 9-10: IRB and Proposal Draft
+    9: [
+        "Complete CITI training or ethics certification",
+        "Prepare and compile all IRB documents",
+        "Finish working draft of research proposal",
+        "Synthesize literature review section",
+        "Get adviser feedback on IRB documents"
+    ],
+    10: [
+        "Submit IRB application",
+        "Complete full draft of research proposal",
+        "Include research question, literature review, and methods",
+        "Add feasibility and timeline sections",
+        "Send to adviser or committee for feedback"
+    ],
+    
+    # Weeks 11-12: Finalization
+    11: [
+        "Revise proposal based on feedback",
+        "Finalize literature review with thematic organization",
+        "Ensure methods are consistent with literature",
+        "Double-check citation formatting",
+        "Identify and justify research gap clearly"
+    ],
+    12: [
+        "Submit final proposal to department/adviser",
+        "Check on IRB status and follow up",
+        "Plan for next semester recruitment timeline",
+        "Set up equipment and materials",
+        "Identify remaining literature gaps for future reading"
+    ]
+}
+
+# Ongoing weekly tasks to be distributed
+LEGACY_ONGOING_TASKS = [
+    "Skim and note 2 articles per day during deep work time",
+    "Review and update literature synopsis",
+    "Clean up reading queue and remove irrelevant items",
+    "Add exemplary articles to reference file",
+    "Maintain thesis journal (20-30 min/day)",
+    "Back up work and organize files"
+]
+
+# Task plans compiled once from the static task tables
+PHASE_PLANS = compile_phase_plans(PHASE_TEMPLATES)
+LEGACY_PLAN = LegacyPlan(LEGACY_WEEKLY_TASKS, LEGACY_ONGOING_TASKS)
+PHASE_DEPENDENCY_RULES = compile_dependencies(PHASE_TEMPLATES)
+PHASE_PLAN_VERSION = plan_version(PHASE_TEMPLATES, LEGACY_WEEKLY_TASKS, LEGACY_ONGOING_TASKS)
+
+@server_timing.timed_methods('service')
 class PhaseManager:
     """Manages phase lifecycle and validation for multi-phase projects"""
     
@@ -422,6 +729,7 @@ class PhaseManager:
             'is_complete': progress_percentage == 100
         }
 
+@server_timing.timed_methods('service')
 class PhaseTaskGenerator:
     """Generates phase-specific tasks and distributes them across work days"""
     
@@ -435,16 +743,20 @@ class PhaseTaskGenerator:
         if not template:
             return []
         
-        # Get task templates for this phase
-        task_templates = template['task_templates']
+        # Compiled plan for this phase's task templates
+        task_plan = PHASE_PLANS.get(phase.phase_type) or compile_task_list(template['task_templates'])
         
         # Parse work preferences
         work_days = json.loads(work_preferences) if isinstance(work_preferences, str) else work_preferences
         
         # Generate tasks distributed across available work days
-        tasks = PhaseTaskGenerator.distribute_tasks_by_intensity(
-            task_templates, work_days, phase.deadline, phase.id
-        )
+        with metrics.TASK_GENERATION_DURATION.time(phase_type=phase.phase_type):
+            tasks = PhaseTaskGenerator.distribute_tasks_by_intensity(
+                task_plan, work_days, phase.deadline, phase.id
+            )
+            tasks = PhaseTaskGenerator.adjust_tasks_for_dependencies(
+                tasks, phase.phase_type, work_days, phase.deadline
+            )
         
         return tasks
     
@@ -456,7 +768,12 @@ class PhaseTaskGenerator:
     
     @staticmethod
     def distribute_tasks_by_intensity(task_templates, work_days, deadline, phase_id):
-        """Distribute tasks evenly across work days with intelligent load balancing"""
+        """
+        Distribute tasks evenly across work days with intelligent load balancing.
+
+        ``task_templates`` is either a compiled plan (tuple of PlanTask) or a
+        list of task descriptions, which is compiled on the fly.
+        """
         if not task_templates or not work_days:
             return []
         
@@ -466,36 +783,34 @@ class PhaseTaskGenerator:
         if not available_days:
             return []
         
-        total_tasks = len(task_templates)
-        total_days = len(available_days)
+        task_plan = task_templates
+        if isinstance(task_plan[0], str):
+            task_plan = compile_task_list(task_templates)
         
         # Calculate task distribution
-        task_distribution = PhaseTaskGenerator._calculate_task_distribution(
-            total_tasks, available_days
+        task_distribution, _ = PhaseTaskGenerator._calculate_task_distribution(
+            len(task_plan), available_days
         )
         
-        # Create tasks based on the distribution
+        # Create tasks based on the distribution; type and priority come from the plan
         tasks = []
-        task_index = 0
+        plan_tasks = iter(task_plan)
         
         for day_info in task_distribution:
-            tasks_for_day = day_info['task_count']
-            
-            for _ in range(tasks_for_day):
-                if task_index < total_tasks:
-                    task = PhaseTask(
-                        phase_id=phase_id,
-                        date=day_info['date'],
-                        task_description=task_templates[task_index],
-                        task_type=PhaseTaskGenerator._determine_task_type(task_templates[task_index]),
-                        day_intensity=day_info['intensity'],
-                        priority=PhaseTaskGenerator._determine_task_priority(task_templates[task_index], task_index, len(task_templates)),
-                        status='not_started',
-                        completed=False,
-                        created_at=datetime.utcnow()
-                    )
-                    tasks.append(task)
-                    task_index += 1
+            for _ in range(day_info['task_count']):
+                plan_task = next(plan_tasks)
+                tasks.append(PhaseTask(
+                    phase_id=phase_id,
+                    date=day_info['date'],
+                    task_description=plan_task.description,
+                    task_type=plan_task.task_type,
+                    day_intensity=day_info['intensity'],
+                    priority=plan_task.priority,
+                    status='not_started',
+                    completed=False,
+                    created_at=datetime.utcnow(),
+                    plan_version=PHASE_PLAN_VERSION
+                ))
         
         return tasks
     
@@ -522,165 +837,105 @@ class PhaseTaskGenerator:
         return available_days
     
     @staticmethod
-    def _calculate_task_distribution(total_tasks, available_days):
-        """Calculate intelligent task distribution across available days"""
-        if not available_days or total_tasks == 0:
-            return []
-        
-        total_days = len(available_days)
-        
-        # Separate light and heavy days
-        light_days = [day for day in available_days if day['intensity'] == 'light']
-        heavy_days = [day for day in available_days if day['intensity'] == 'heavy']
-        
-        # Calculate base distribution (evenly spread)
-        base_tasks_per_day = total_tasks // total_days
-        extra_tasks = total_tasks % total_days
-        
-        # Create distribution plan
-        distribution = []
-        
-        # If we have more tasks than days, we need to distribute intelligently
-        if total_tasks > total_days:
-            # Calculate capacity ratios (heavy days can handle more)
-            light_capacity_weight = 1.0
-            heavy_capacity_weight = 2.0
-            
-            # Calculate total capacity weights
-            total_capacity = (len(light_days) * light_capacity_weight + 
-                            len(heavy_days) * heavy_capacity_weight)
-            
-            # Distribute tasks proportionally
-            for day in available_days:
-                if day['intensity'] == 'light':
-                    # Light days get proportionally fewer tasks
-                    task_count = max(1, int((total_tasks * light_capacity_weight) / total_capacity))
-                else:  # heavy day
-                    # Heavy days get proportionally more tasks
-                    task_count = max(1, int((total_tasks * heavy_capacity_weight) / total_capacity))
-                
-                distribution.append({
-                    'date': day['date'],
-                    'intensity': day['intensity'],
-                    'task_count': task_count
-                })
-            
-            # Adjust for any rounding differences
-            assigned_tasks = sum(d['task_count'] for d in distribution)
-            remaining_tasks = total_tasks - assigned_tasks
-            
-            # Distribute remaining tasks, preferring heavy days
-            day_index = 0
-            while remaining_tasks > 0:
-                # Prefer heavy days for extra tasks
-                if distribution[day_index]['intensity'] == 'heavy' or len(heavy_days) == 0:
-                    distribution[day_index]['task_count'] += 1
-                    remaining_tasks -= 1
-                day_index = (day_index + 1) % len(distribution)
-        
-        else:
-            # We have fewer or equal tasks than days - distribute evenly
-            for i, day in enumerate(available_days):
-                task_count = base_tasks_per_day
-                # Distribute extra tasks to the first few days
-                if i < extra_tasks:
-                    task_count += 1
-                
-                distribution.append({
-                    'date': day['date'],
-                    'intensity': day['intensity'],
-                    'task_count': task_count
-                })
-        
-        # Remove days with 0 tasks and sort by date
-        distribution = [d for d in distribution if d['task_count'] > 0]
+    def _calculate_task_distribution(total_tasks, available_days, capacities=None):
+        """
+        Calculate task distribution across available days.
+
+        Tasks are apportioned by day intensity weight (largest remainder) and
+        no day receives more than its intensity's capacity. Tasks that do not
+        fit before the deadline still get scheduled: they are spread one at a
+        time over the days from the last one backwards, above capacity.
+
+        Returns (distribution, overflow); overflow counts the tasks placed
+        above capacity, for the caller to tell the student.
+        """
+        if not available_days or total_tasks <= 0:
+            return [], 0
+        
+        weights = [intensity_weight(day['intensity']) for day in available_days]
+        caps = [intensity_capacity(day['intensity'], capacities) for day in available_days]
+        counts = apportion(total_tasks, weights, caps)
+        
+        overflow = total_tasks - sum(counts)
+        for index in range(overflow):
+            counts[-1 - index % len(counts)] += 1
+        
+        # Keep only days with tasks, in date order
+        distribution = [
+            {
+                'date': day['date'],
+                'intensity': day['intensity'],
+                'task_count': count
+            }
+            for day, count in zip(available_days, counts)
+            if count > 0
+        ]
         distribution.sort(key=lambda x: x['date'])
         
-        return distribution
+        return distribution, overflow
+    
+    @staticmethod
+    def capacity_overflow(total_tasks, available_days, capacities=None):
+        """Tasks beyond the summed day capacities of ``available_days``"""
+        capacity = sum(intensity_capacity(day['intensity'], capacities) for day in available_days)
+        return max(0, total_tasks - capacity) if available_days else 0
     
     @staticmethod
     def _determine_task_type(task_description):
         """Determine task type based on task description keywords"""
-        task_lower = task_description.lower()
-        
-        # Documentation/compliance tasks (check first for specificity)
-        if any(keyword in task_lower for keyword in ['irb', 'consent', 'compliance', 'ethics', 'submit']):
-            return 'documentation'
-        
-        # Meeting/consultation tasks (check before writing to avoid conflicts)
-        elif any(keyword in task_lower for keyword in ['meet', 'discuss', 'adviser', 'advisor', 'feedback']):
-            return 'consultation'
-        
-        # Writing-related tasks (more specific keywords first)
-        elif any(keyword in task_lower for keyword in ['draft', 'write', 'document methodology', 'outline']):
-            return 'writing'
-        
-        # Reading-related tasks
-        elif any(keyword in task_lower for keyword in ['read', 'skim', 'article', 'source', 'literature']):
-            return 'reading'
-        
-        # Research-related tasks
-        elif any(keyword in task_lower for keyword in ['research', 'identify', 'collect', 'find', 'search']):
-            return 'research'
-        
-        # Analysis-related tasks
-        elif any(keyword in task_lower for keyword in ['analyze', 'synthesis', 'organize', 'compare', 'evaluate']):
-            return 'analysis'
-        
-        # Design/planning tasks
-        elif any(keyword in task_lower for keyword in ['design', 'plan', 'create', 'develop', 'method']):
-            return 'design'
-        
-        # Default to general
-        else:
-            return 'general'
+        return classify_task_type(task_description)
     
     @staticmethod
     def _determine_task_priority(task_description, task_index, total_tasks):
         """Determine task priority based on description and position in timeline"""
-        task_lower = task_description.lower()
-        
-        # High priority keywords
-        high_priority_keywords = [
-            'deadline', 'urgent', 'critical', 'important', 'due', 'submit', 
-            'approval', 'irb', 'ethics', 'committee', 'proposal', 'defense'
-        ]
-        
-        # Low priority keywords  
-        low_priority_keywords = [
-            'optional', 'extra', 'additional', 'supplementary', 'bonus',
-            'explore', 'consider', 'maybe', 'if time'
-        ]
-        
-        # Check for explicit priority keywords
-        if any(word in task_lower for word in high_priority_keywords):
-            return 'high'
-        
-        if any(word in task_lower for word in low_priority_keywords):
-            return 'low'
-        
-        # Priority based on position in timeline
-        # First 20% of tasks are high priority (foundational work)
-        # Last 20% of tasks are high priority (final deliverables)
-        # Middle 60% are medium priority
-        position_ratio = task_index / max(1, total_tasks - 1)
-        
-        if position_ratio <= 0.2 or position_ratio >= 0.8:
-            return 'high'
-        
-        return 'medium'
+        return task_priority(task_description, task_index, total_tasks)
     
     @staticmethod
-    def adjust_tasks_for_dependencies(phase_tasks):
-        """Adjust task scheduling based on phase dependencies (future enhancement)"""
-        # This method can be enhanced later to handle inter-phase dependencies
-        # For now, it returns tasks as-is
+    def adjust_tasks_for_dependencies(phase_tasks, phase_type=None, work_days=None, deadline=None):
+        """
+        Move generated tasks so each comes after its prerequisites.
+
+        Template order already puts prerequisites first, but a prerequisite
+        and its dependent can share a day; those dependents move to the next
+        day with spare capacity before the deadline (see dependencies.py).
+        Without a phase type and work days, tasks are returned as-is.
+        """
+        if not phase_tasks or not phase_type or not work_days or deadline is None:
+            return phase_tasks
+        
+        nodes = [
+            TaskNode(index, 0, phase_type, task.task_description, task.date, deadline)
+            for index, task in enumerate(phase_tasks)
+        ]
+        edges = resolve_edges(PHASE_DEPENDENCY_RULES, nodes)
+        if not edges:
+            return phase_tasks
+        
+        slots = [TaskSlot(node.task_id, 0, 0, deadline, node.date, node.task_id) for node in nodes]
+        days = {
+            day['date']: (day['intensity'], intensity_capacity(day['intensity']))
+            for day in PhaseTaskGenerator._get_available_work_days(work_days, deadline)
+        }
+        for move in plan_redistribution(slots, days, edges).moves:
+            task = phase_tasks[move.task_id]
+            task.date = move.new_date
+            task.day_intensity = move.intensity
+        
         return phase_tasks
     
     @staticmethod
     def create_and_save_tasks_for_phase(phase, work_preferences):
-        """Generate and save tasks for a phase to the database"""
+        """
+        Generate and save tasks for a phase to the database
+
+        Returns (tasks, overflow), where overflow counts the tasks scheduled
+        above the daily capacity because they do not fit before the deadline.
+        """
         tasks = PhaseTaskGenerator.generate_tasks_for_phase(phase, work_preferences)
+        work_days = json.loads(work_preferences) if isinstance(work_preferences, str) else work_preferences
+        overflow = PhaseTaskGenerator.capacity_overflow(
+            len(tasks), PhaseTaskGenerator._get_available_work_days(work_days or {}, phase.deadline)
+        ) if tasks else 0
         
         # Save tasks to database
         for task in tasks:
@@ -688,11 +943,12 @@ class PhaseTaskGenerator:
         
         try:
             db.session.commit()
-            return tasks
+            return tasks, overflow
         except Exception as e:
             db.session.rollback()
             raise e
 
+@server_timing.timed_methods('service')
 class LegacyScheduleAdapter:
     """Adapter to maintain compatibility with existing ScheduleItem queries"""
     
@@ -839,6 +1095,7 @@ class LegacyScheduleAdapter:
             'remaining': total - completed
         }
 
+@server_timing.timed_methods('service')
 class MigrationService:
     """Service for migrating legacy students to multi-phase system"""
     
@@ -920,30 +1177,13 @@ class MigrationService:
     
     @staticmethod
     def get_migration_preview(student_id):
-        """Preview what would happen during migration"""
+        """Preview what would happen during migration (task counts aggregated in SQL)"""
         student = Student.query.get(student_id)
         
         if not student:
             return None
         
-        existing_tasks = ScheduleItem.query.filter_by(student_id=student_id).all()
-        
-        # Analyze existing tasks
-        task_analysis = {
-            'total_tasks': len(existing_tasks),
-            'completed_tasks': len([t for t in existing_tasks if t.completed]),
-            'pending_tasks': len([t for t in existing_tasks if not t.completed]),
-            'date_range': {
-                'earliest': min([t.date for t in existing_tasks]) if existing_tasks else None,
-                'latest': max([t.date for t in existing_tasks]) if existing_tasks else None
-            },
-            'task_types': {}
-        }
-        
-        # Analyze task types that would be assigned
-        for task in existing_tasks:
-            task_type = PhaseTaskGenerator._determine_task_type(task.task_description)
-            task_analysis['task_types'][task_type] = task_analysis['task_types'].get(task_type, 0) + 1
+        task_analysis = bulk_migration.preview_students([student_id])[student_id]
         
         return {
             'student': {
@@ -986,9 +1226,76 @@ class MigrationService:
             db.session.rollback()
             return False, f"Rollback failed: {str(e)}"
 
+    @staticmethod
+    def migrate_progress_log_tasks(student_id=None, batch_size=500):
+        """
+        Copy the JSON completed-task lists of progress logs into progress_log_task rows.
+
+        Logs that already have linked tasks are skipped, so the migration can be
+        re-run. Ids in tasks_completed are matched to the student's schedule
+        items or phase tasks; ids matching neither (or both) follow the
+        student's current mode.
+        """
+        owned = {}
+        
+        def owned_task_ids(sid):
+            if sid not in owned:
+                schedule_ids = {row.id for row in db.session.query(ScheduleItem.id).filter_by(student_id=sid)}
+                phase_ids = {row.id for row in db.session.query(PhaseTask.id).join(ProjectPhase).filter(
+                    ProjectPhase.student_id == sid)}
+                student = Student.query.get(sid)
+                owned[sid] = (schedule_ids, phase_ids, bool(student and student.is_multi_phase))
+            return owned[sid]
+        
+        def decode(value):
+            try:
+                ids = json.loads(value) if value else []
+            except (TypeError, ValueError):
+                return []
+            return ids if isinstance(ids, list) else []
+        
+        query = ProgressLog.query.filter(~ProgressLog.completed_task_links.any())
+        if student_id is not None:
+            query = query.filter(ProgressLog.student_id == student_id)
+        
+        last_id = 0
+        migrated_logs = 0
+        migrated_links = 0
+        while True:
+            logs = query.filter(ProgressLog.id > last_id).order_by(ProgressLog.id).limit(batch_size).all()
+            if not logs:
+                break
+            
+            for log in logs:
+                schedule_ids, phase_ids, multi_phase = owned_task_ids(log.student_id)
+                
+                for task_id in decode(log.tasks_completed):
+                    try:
+                        task_id = int(task_id)
+                    except (TypeError, ValueError):
+                        continue
+                    in_schedule, in_phase = task_id in schedule_ids, task_id in phase_ids
+                    is_phase_task = in_phase if in_schedule != in_phase else multi_phase
+                    log.add_completed_tasks([task_id], is_phase_task)
+                
+                log.add_completed_tasks(decode(log.phase_tasks_completed), is_phase_task=True)
+                
+                if log.completed_task_links:
+                    migrated_logs += 1
+                    migrated_links += len(log.completed_task_links)
+            
+            last_id = logs[-1].id
+            db.session.commit()
+        
+        return {'migrated_logs': migrated_logs, 'migrated_links': migrated_links}
+
 @login_manager.user_loader
 def load_user(user_id):
-    return Student.query.get(int(user_id))
+    student = Student.query.get(int(user_id))
+    if student and student.archived_at:
+        # A remembered session outlived the archive run
+        cold_archive.rehydrate_student(student)
+    return student
 
 # Routes
 @app.route('/')
@@ -1032,6 +1339,10 @@ def login():
         student = Student.query.filter_by(email=email).first()
         
         if student and student.check_password(password):
+            student.upgrade_password_hash(password)
+            student.last_login_at = datetime.utcnow()
+            db.session.commit()
+            cold_archive.rehydrate_student(student)
             login_user(student)
             if student.onboarded:
                 return redirect(url_for('dashboard'))
@@ -1238,7 +1549,8 @@ def submit_onboarding():
         
         # Generate tasks for each phase
         for phase in phases:
-            PhaseTaskGenerator.create_and_save_tasks_for_phase(phase, work_day_preferences)
+            _, overflow = PhaseTaskGenerator.create_and_save_tasks_for_phase(phase, work_day_preferences)
+            flash_capacity_overflow(phase.phase_name, overflow)
         
         flash(f'Successfully created your project with {len(phases)} research phases!')
         return redirect(url_for('dashboard'))
@@ -1358,7 +1670,9 @@ def integrated_timeline():
         return redirect(url_for('dashboard'))
     
     try:
-        timeline_data = create_timeline_visualization_data(current_user.id)
+        # Only built if a fragment of the page is not cached
+        student_id = current_user.id
+        timeline_data = fragment_cache.LazyData(lambda: create_timeline_visualization_data(student_id))
         return render_template('timeline.html', 
                              timeline_data=timeline_data,
                              student=current_user)
@@ -1382,6 +1696,19 @@ def api_timeline_data(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/changes')
+@login_required
+def api_changes():
+    """Phases and tasks changed since a client's schedule version (for patching local state)"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({'error': 'since must be a schedule version'}), 400
+    
+    if not current_user.is_multi_phase:
+        return jsonify({'error': 'Multi-phase project required'}), 400
+    
+    return jsonify(change_tracking.changes_since(current_user, since))
+
 @app.route('/api/redistribute_tasks', methods=['POST'])
 @login_required
 def api_redistribute_tasks():
@@ -1410,6 +1737,24 @@ def api_redistribute_tasks():
     except Exception as e:
         return jsonify({'error': f'Redistribution failed: {str(e)}'}), 500
 
+@app.route('/api/what_if', methods=['POST'])
+@login_required
+def api_what_if():
+    """Project proposed deadlines and work days without saving anything"""
+    if not current_user.is_multi_phase:
+        return jsonify({'error': 'What-if evaluation requires the multi-phase system'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    snapshot = what_if.load_snapshot(current_user)
+    try:
+        deadlines, work_days = what_if.validate_proposal(
+            snapshot, data.get('deadlines'), data.get('work_days')
+        )
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid data: {str(e)}'}), 400
+    
+    return jsonify(what_if.evaluate(snapshot, datetime.now().date(), deadlines, work_days))
+
 @app.route('/daily_checkin')
 @login_required
 def daily_checkin():
@@ -1470,6 +1815,95 @@ def day_detail(date_str):
                          is_today=is_today,
                          today=today)
 
+# Upcoming weeks rendered with the remaining tasks page; later weeks load on demand
+REMAINING_TASKS_WEEKS_PER_PAGE = 4
+
+def _week_start(date_column):
+    """SQL expression for the Monday on or before a date column"""
+    if db.engine.dialect.name == 'sqlite':
+        return db.func.date(date_column, '-6 days', 'weekday 1')
+    return db.func.date(db.func.date_trunc('week', date_column))
+
+def _remaining_task_model(student):
+    return PhaseTask if student.is_multi_phase else ScheduleItem
+
+def _filter_student_tasks(query, student, phase_filter=None, eager_phase=False):
+    """Restrict a query over the student's task model to that student (and phase)"""
+    if not student.is_multi_phase:
+        return query.filter(ScheduleItem.student_id == student.id)
+    
+    query = query.join(PhaseTask.project_phase).filter(ProjectPhase.student_id == student.id)
+    if eager_phase:
+        # The template shows each task's phase; fill it from the join
+        query = query.options(contains_eager(PhaseTask.project_phase))
+    if phase_filter:
+        query = query.filter(PhaseTask.phase_id == phase_filter)
+    return query
+
+def _as_date(value):
+    # SQLite returns date() results as ISO strings
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+def _remaining_task_counts(student, phase_filter, today):
+    """Overdue/today/upcoming/total counts in one aggregate query"""
+    model = _remaining_task_model(student)
+    
+    def bucket(condition):
+        return db.func.coalesce(db.func.sum(db.case(((model.completed == False) & condition, 1), else_=0)), 0)
+    
+    query = db.session.query(
+        bucket(model.date < today),
+        bucket(model.date == today),
+        bucket(model.date > today),
+        db.func.count(model.id)
+    ).select_from(model)
+    overdue, due_today, upcoming, total = _filter_student_tasks(query, student, phase_filter).one()
+    
+    return {'overdue': overdue, 'today': due_today, 'upcoming': upcoming, 'total': total}
+
+def _upcoming_weeks(student, phase_filter, today, offset, limit):
+    """
+    Upcoming tasks grouped by week, for weeks ``offset`` to ``offset + limit``.
+    
+    Returns (weeks, total number of upcoming weeks); weeks are
+    (week_key, {'week_start', 'tasks'}) pairs in date order.
+    """
+    model = _remaining_task_model(student)
+    week_start = _week_start(model.date).label('week_start')
+    
+    # Week boundaries and per-week counts come from SQL
+    week_query = db.session.query(week_start, db.func.count(model.id)).select_from(model)
+    week_rows = _filter_student_tasks(week_query, student, phase_filter).filter(
+        model.completed == False,
+        model.date > today
+    ).group_by(week_start).order_by(week_start).all()
+    
+    page = week_rows[offset:offset + limit]
+    if not page:
+        return [], len(week_rows)
+    
+    # Load only the tasks of the weeks on this page
+    task_query = _filter_student_tasks(db.session.query(model, week_start), student, phase_filter,
+                                       eager_phase=True)
+    rows = task_query.filter(
+        model.completed == False,
+        model.date > today,
+        model.date >= _as_date(page[0][0]),
+        model.date < _as_date(page[-1][0]) + timedelta(days=7)
+    ).order_by(model.date, model.id).all()
+    
+    weeks = {}
+    for task, week_key in rows:
+        week_key = str(week_key)
+        if week_key not in weeks:
+            weeks[week_key] = {
+                'week_start': _as_date(week_key),
+                'tasks': []
+            }
+        weeks[week_key]['tasks'].append(task)
+    
+    return list(weeks.items()), len(week_rows)
+
 @app.route('/remaining_tasks')
 @login_required
 def remaining_tasks():
@@ -1478,69 +1912,36 @@ def remaining_tasks():
     
     # Get phase filter parameter
     phase_filter = request.args.get('phase', type=int)
+    today = datetime.now().date()
+    
+    # Bucket counts for the whole backlog come from one aggregate query
+    counts = _remaining_task_counts(current_user, phase_filter, today)
+    
+    # Overdue and today's tasks, with phases eager-loaded
+    model = _remaining_task_model(current_user)
+    query = _filter_student_tasks(model.query, current_user, phase_filter, eager_phase=True).filter(
+        model.completed == False
+    )
+    overdue_tasks = query.filter(model.date < today).order_by(model.date, model.id).all()
+    today_tasks = query.filter(model.date == today).order_by(model.id).all()
+    
+    # Only the first weeks of upcoming tasks render; the rest load on demand
+    upcoming_weeks, total_weeks = _upcoming_weeks(
+        current_user, phase_filter, today, 0, REMAINING_TASKS_WEEKS_PER_PAGE
+    )
     
-    # Get all incomplete tasks, organized by date
     if current_user.is_multi_phase:
-        # Use new PhaseTask model with optional phase filtering
-        query = db.session.query(PhaseTask).join(ProjectPhase).filter(
-            ProjectPhase.student_id == current_user.id,
-            PhaseTask.completed == False
-        )
-        
-        if phase_filter:
-            query = query.filter(PhaseTask.phase_id == phase_filter)
-            
-        incomplete_tasks = query.order_by(PhaseTask.date).all()
-        
-        # Get total tasks for completion rate calculation
-        total_query = db.session.query(PhaseTask).join(ProjectPhase).filter(
-            ProjectPhase.student_id == current_user.id
-        )
-        if phase_filter:
-            total_query = total_query.filter(PhaseTask.phase_id == phase_filter)
-        total_tasks = total_query.count()
-        
         # Get user's phases for filtering dropdown
         user_phases = ProjectPhase.query.filter_by(
             student_id=current_user.id,
             is_active=True
         ).order_by(ProjectPhase.order_index).all()
-        
     else:
-        # Legacy single-phase support
-        incomplete_tasks = ScheduleItem.query.filter_by(
-            student_id=current_user.id,
-            completed=False
-        ).order_by(ScheduleItem.date).all()
-        
-        total_tasks = ScheduleItem.query.filter_by(student_id=current_user.id).count()
         user_phases = []
     
-    # Group tasks by different categories for better organization
-    today = datetime.now().date()
-    
-    overdue_tasks = [task for task in incomplete_tasks if task.date < today]
-    today_tasks = [task for task in incomplete_tasks if task.date == today]
-    upcoming_tasks = [task for task in incomplete_tasks if task.date > today]
-    
-    # Group upcoming tasks by week for better display
-    upcoming_by_week = {}
-    for task in upcoming_tasks:
-        # Calculate the Monday of the week this task falls in
-        week_start = task.date - timedelta(days=task.date.weekday())
-        week_key = week_start.strftime('%Y-%m-%d')
-        if week_key not in upcoming_by_week:
-            upcoming_by_week[week_key] = {
-                'week_start': week_start,
-                'tasks': []
-            }
-        upcoming_by_week[week_key]['tasks'].append(task)
-    
-    # Sort weeks by date
-    upcoming_weeks = sorted(upcoming_by_week.items(), key=lambda x: x[1]['week_start'])
-    
     # Calculate some stats
-    total_incomplete = len(incomplete_tasks)
+    total_tasks = counts['total']
+    total_incomplete = counts['overdue'] + counts['today'] + counts['upcoming']
     completion_rate = ((total_tasks - total_incomplete) / total_tasks * 100) if total_tasks > 0 else 0
     
     # Get selected phase info for display
@@ -1552,8 +1953,11 @@ def remaining_tasks():
                          student=current_user,
                          overdue_tasks=overdue_tasks,
                          today_tasks=today_tasks,
-                         upcoming_tasks=upcoming_tasks,
+                         upcoming_count=counts['upcoming'],
                          upcoming_weeks=upcoming_weeks,
+                         more_weeks=total_weeks > len(upcoming_weeks),
+                         next_week_offset=len(upcoming_weeks),
+                         total_tasks=total_tasks,
                          total_incomplete=total_incomplete,
                          completion_rate=completion_rate,
                          today=today,
@@ -1561,6 +1965,24 @@ def remaining_tasks():
                          selected_phase=selected_phase,
                          phase_filter=phase_filter)
 
+@app.route('/remaining_tasks/weeks')
+@login_required
+def remaining_tasks_weeks():
+    """HTML fragment with the next weeks of upcoming tasks"""
+    phase_filter = request.args.get('phase', type=int)
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', REMAINING_TASKS_WEEKS_PER_PAGE, type=int)), 52)
+    
+    upcoming_weeks, total_weeks = _upcoming_weeks(
+        current_user, phase_filter, datetime.now().date(), offset, limit
+    )
+    
+    return jsonify({
+        'html': render_template('_upcoming_weeks.html', student=current_user, upcoming_weeks=upcoming_weeks),
+        'next_offset': offset + len(upcoming_weeks),
+        'has_more': total_weeks > offset + len(upcoming_weeks)
+    })
+
 @app.route('/settings')
 @login_required
 def settings():
@@ -1584,8 +2006,7 @@ def update_settings():
             for phase_id in delete_phase_ids:
                 phase = ProjectPhase.query.get(int(phase_id))
                 if phase and phase.student_id == current_user.id:
-                    # Delete associated tasks
-                    PhaseTask.query.filter_by(phase_id=phase.id).delete()
+                    # Associated tasks go with it (cascade), so the change journal records them
                     db.session.delete(phase)
             
             # Process existing phase updates
@@ -1657,15 +2078,17 @@ def update_settings():
     
     # Regenerate schedule with new settings
     if current_user.is_multi_phase:
-        # Delete existing incomplete phase tasks
+        # Delete existing incomplete phase tasks (through the ORM, so the change journal records them)
         for phase in current_user.project_phases:
-            PhaseTask.query.filter_by(phase_id=phase.id, completed=False).delete()
+            for task in PhaseTask.query.filter_by(phase_id=phase.id, completed=False):
+                db.session.delete(task)
         
         # Regenerate tasks for all phases
         for phase in current_user.project_phases:
             # Use existing task generation logic
             try:
-                PhaseTaskGenerator.create_and_save_tasks_for_phase(phase, current_user.work_days)
+                _, overflow = PhaseTaskGenerator.create_and_save_tasks_for_phase(phase, current_user.work_days)
+                flash_capacity_overflow(phase.phase_name, overflow)
             except Exception as e:
                 # Fallback: create basic tasks if generator fails
                 today = datetime.now().date()
@@ -1717,14 +2140,18 @@ def submit_progress():
             notes=notes
         )
         db.session.add(progress_log)
+        activity_bitmap.record_activity(current_user.id, date)
         
-        # Mark completed tasks
+        # Mark completed tasks; only the student's own tasks are linked to the log
+        owned_tasks = []
         for task_id in completed_tasks:
             task = PhaseTask.query.get(task_id)
             if task:
                 phase = ProjectPhase.query.get(task.phase_id)
                 if phase and phase.student_id == current_user.id:
                     task.completed = True
+                    owned_tasks.append(task.id)
+        progress_log.add_completed_tasks(owned_tasks, is_phase_task=True)
     else:
         # Legacy single-phase progress tracking
         progress_log = ProgressLog(
@@ -1734,12 +2161,16 @@ def submit_progress():
             notes=notes
         )
         db.session.add(progress_log)
+        activity_bitmap.record_activity(current_user.id, date)
         
-        # Mark completed tasks
+        # Mark completed tasks; only the student's own tasks are linked to the log
+        owned_tasks = []
         for task_id in completed_tasks:
             task = ScheduleItem.query.get(task_id)
             if task and task.student_id == current_user.id:
                 task.completed = True
+                owned_tasks.append(task.id)
+        progress_log.add_completed_tasks(owned_tasks, is_phase_task=False)
     
     db.session.commit()
     
@@ -1793,6 +2224,21 @@ def phase_progress_detail(phase_id):
         flash(f'Error loading progress details: {str(e)}')
         return redirect(url_for('phase_detail', phase_id=phase_id))
 
+@app.route('/api/activity_heatmap/<int:student_id>')
+@login_required
+def api_activity_heatmap(student_id):
+    """API endpoint for activity heatmap and streak data"""
+    if student_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    year = request.args.get('year', datetime.now().year, type=int)
+    phase_id = request.args.get('phase_id', type=int)
+    
+    heatmap = activity_bitmap.get_heatmap(student_id, year, phase_id)
+    heatmap['current_streak'], heatmap['longest_streak'] = activity_bitmap.get_streaks(student_id, phase_id)
+    
+    return jsonify(heatmap)
+
 @app.route('/api/progress_data/<int:student_id>')
 @login_required
 def api_progress_data(student_id):
@@ -1876,8 +2322,13 @@ def update_day_intensity():
     flash(f'Day intensity updated to {new_intensity}. Schedule adjusted accordingly.')
     return redirect(url_for('day_detail', date_str=date.strftime('%Y-%m-%d')))
 
-def find_next_available_slot(student, from_date):
-    """Find the next available work day for rescheduling a task"""
+def find_next_available_slot(student, from_date, pending=None):
+    """
+    Find the next available work day for rescheduling a task
+
+    ``pending`` maps dates to task count changes not yet flushed (a batch
+    running without autoflush), added to the stored counts.
+    """
     work_day_preferences = json.loads(student.work_days) if student.work_days else {}
     current_date = from_date + timedelta(days=1)
     end_date = student.lit_review_deadline
@@ -1900,6 +2351,8 @@ def find_next_available_slot(student, from_date):
                     date=current_date
                 ).count()
             
+            existing_tasks_count += (pending or {}).get(current_date, 0)
+            
             # For rescheduling, we use a more flexible approach
             # Heavy days can handle more tasks than light days
             reasonable_limit = 3 if day_intensity == 'heavy' else 2
@@ -1912,6 +2365,14 @@ def find_next_available_slot(student, from_date):
     
     return None
 
+def flash_capacity_overflow(phase_name, overflow):
+    """Tell the student when tasks had to go above the daily capacity"""
+    if overflow > 0:
+        tasks = '1 task' if overflow == 1 else f'{overflow} tasks'
+        where = f' in {phase_name}' if phase_name else ''
+        flash(f'{tasks}{where} did not fit your daily capacity before the deadline, so the last work days '
+              f'got extra. Consider extending the deadline or adding work days.')
+
 def readjust_schedule_from_date(student_id, from_date):
     """Intelligently readjust schedule from a specific date forward using new distribution logic"""
     student = Student.query.get(student_id)
@@ -1957,9 +2418,10 @@ def readjust_schedule_from_date(student_id, from_date):
         return
     
     # Use the new distribution logic for rescheduling
-    task_distribution = PhaseTaskGenerator._calculate_task_distribution(
+    task_distribution, overflow = PhaseTaskGenerator._calculate_task_distribution(
         len(future_tasks), available_days
     )
+    flash_capacity_overflow(None, overflow)
     
     # Redistribute tasks based on the new distribution
     task_index = 0
@@ -1985,138 +2447,13 @@ def generate_schedule(student):
     total_days = (end_date - current_date).days
     total_weeks = max(1, total_days // 7)
     
-    # 12-week thesis timeline tasks organized by phase
-    weekly_tasks = {
-        # Weeks 1-2: Literature Review Foundation
-        1: [
-            "Create comprehensive list of initial sources from adviser recommendations",
-            "Set up note-taking system with template for articles",
-            "Begin wide reading to orient toward topic",
-            "Start populating reading queue using citation strategies",
-            "Begin thesis journal for daily progress and reflections"
-        ],
-        2: [
-            "Skim and take detailed notes on 2 articles per day",
-            "Identify research questions and motivations in readings",
-            "Begin identifying 2-3 major theoretical frameworks",
-            "Organize sources by theme/topic (not chronologically)",
-            "Meet with adviser to discuss promising directions"
-        ],
-        
-        # Weeks 3-4: Refining the Research Question
-        3: [
-            "Continue skimming 2 articles per day",
-            "Create literature synopsis extracting key elements",
-            "Identify commonalities and literature gaps",
-            "Draft 2-3 potential research questions",
-            "Practice 3-sentence elevator pitch for project"
-        ],
-        4: [
-            "Finalize specific research question with adviser feedback",
-            "Clarify if question is empirical, theoretical, or both",
-            "Identify key concepts and variables",
-            "Determine sociological significance of question",
-            "Draft one-paragraph research gap statement"
-        ],
-        
-        # Weeks 5-6: Methodology Design
-        5: [
-            "Choose primary research method",
-            "Identify validated instruments from literature",
-            "Collect examples of similar studies and methods",
-            "Draft Methods section outline (sampling, procedure, instruments)",
-            "Review methodological blueprints"
-        ],
-        6: [
-            "Draft survey, interview guide, or observation plan",
-            "Design backwards from hypothetical results",
-            "Calculate sample size and feasibility constraints",
-            "Create data collection strategy",
-            "Meet with adviser for methods input"
-        ],
-        
-        # Weeks 7-8: Testing and Refinement
-        7: [
-            "Pilot instruments with 3-5 participants",
-            "Refine based on clarity and usefulness",
-            "Finalize sampling criteria and recruitment methods",
-            "Begin preparing IRB materials",
-            "Draft consent forms and recruitment scripts"
-        ],
-        8: [
-            "Conduct second round of pilot testing if needed",
-            "Finalize instruments and consent materials",
-            "Start writing research proposal introduction",
-            "Draft methods section",
-            "Create project timeline"
-        ],
-        
-        # Weeks 9-10: IRB and Proposal Draft
-        9: [
-            "Complete CITI training or ethics certification",
-            "Prepare and compile all IRB documents",
-            "Finish working draft of research proposal",
-            "Synthesize literature review section",
-            "Get adviser feedback on IRB documents"
-        ],
-        10: [
-            "Submit IRB application",
-            "Complete full draft of research proposal",
-            "Include research question, literature review, and methods",
-            "Add feasibility and timeline sections",
-            "Send to adviser or committee for feedback"
-        ],
-        
-        # Weeks 11-12: Finalization
-        11: [
-            "Revise proposal based on feedback",
-            "Finalize literature review with thematic organization",
-            "Ensure methods are consistent with literature",
-            "Double-check citation formatting",
-            "Identify and justify research gap clearly"
-        ],
-        12: [
-            "Submit final proposal to department/adviser",
-            "Check on IRB status and follow up",
-            "Plan for next semester recruitment timeline",
-            "Set up equipment and materials",
-            "Identify remaining literature gaps for future reading"
-        ]
-    }
-    
-    # Ongoing weekly tasks to be distributed
-    ongoing_tasks = [
-        "Skim and note 2 articles per day during deep work time",
-        "Review and update literature synopsis",
-        "Clean up reading queue and remove irrelevant items",
-        "Add exemplary articles to reference file",
-        "Maintain thesis journal (20-30 min/day)",
-        "Back up work and organize files"
-    ]
-    
     # Calculate task allocation based on intensity
     current_date = datetime.now().date()
     week_number = 1
     tasks_added = 0
     
-    # Create a task queue with all tasks and their weights
-    task_queue = []
-    for week_num in range(1, min(13, total_weeks + 1)):
-        week_tasks = weekly_tasks.get(week_num, [])
-        for task in week_tasks:
-            task_queue.append({
-                'description': f"Week {week_num}: {task}",
-                'weight': 2 if any(keyword in task.lower() for keyword in ['draft', 'write', 'create', 'complete']) else 1,
-                'week': week_num
-            })
-    
-    # Add ongoing tasks
-    for task in ongoing_tasks:
-        task_queue.append({
-            'description': f"Ongoing: {task}",
-            'weight': 1,
-            'week': 0
-        })
+    # Compiled task queue for the weeks that fit before the deadline
+    task_queue = LEGACY_PLAN.task_queue(total_weeks)
     
     # Distribute tasks based on day intensity
     current_date = datetime.now().date()
@@ -2141,8 +2478,9 @@ def generate_schedule(student):
                     schedule_item = ScheduleItem(
                         student_id=student.id,
                         date=current_date,
-                        task_description=task['description'],
-                        day_intensity=day_intensity
+                        task_description=task.description,
+                        day_intensity=day_intensity,
+                        plan_version=PHASE_PLAN_VERSION
                     )
                     db.session.add(schedule_item)
                     task_index += 1
@@ -2161,8 +2499,9 @@ def generate_schedule(student):
             schedule_item = ScheduleItem(
                 student_id=student.id,
                 date=current_date,
-                task_description=task['description'],
-                day_intensity=day_intensity
+                task_description=task.description,
+                day_intensity=day_intensity,
+                plan_version=PHASE_PLAN_VERSION
             )
             db.session.add(schedule_item)
             task_index += 1
@@ -2218,7 +2557,8 @@ def toggle_task_completion():
             'success': True,
             'task_id': task_id,
             'completed': is_completed,
-            'status': task.status
+            'status': task.status,
+            'version': current_user.schedule_version
         })
         
     except Exception as e:
@@ -2273,7 +2613,8 @@ def update_task_status():
             'task_id': task_id,
             'status': task.status,
             'completed': task.completed,
-            'new_date': task.date.strftime('%Y-%m-%d') if new_status == 'deferred' else None
+            'new_date': task.date.strftime('%Y-%m-%d') if new_status == 'deferred' else None,
+            'version': current_user.schedule_version
         })
         
     except Exception as e:
@@ -2351,13 +2692,151 @@ def add_task():
         return jsonify({
             'success': True,
             'message': 'Task added successfully',
-            'task_id': new_task.id
+            'task_id': new_task.id,
+            'version': current_user.schedule_version
         })
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# Changes /api/tasks/batch accepts, and the most one request may carry
+TASK_BATCH_OPERATIONS = ('complete', 'uncomplete', 'set_status', 'move', 'set_priority', 'delete')
+TASK_BATCH_MAX_OPERATIONS = 200
+TASK_STATUSES = ('not_started', 'in_progress', 'completed', 'deferred')
+TASK_PRIORITIES = ('high', 'medium', 'low')
+
+def _parse_task_operation(operation):
+    """(task id, operation, value) of one batch entry; raises ValueError when it is malformed"""
+    if not isinstance(operation, dict):
+        raise ValueError('Operation must be an object')
+    name = operation.get('op')
+    if name not in TASK_BATCH_OPERATIONS:
+        raise ValueError(f'Unknown operation: {name}')
+    try:
+        task_id = int(operation.get('task_id'))
+    except (TypeError, ValueError):
+        raise ValueError('task_id must be an integer')
+    
+    value = None
+    if name == 'set_status':
+        value = operation.get('status')
+        if value not in TASK_STATUSES:
+            raise ValueError('Invalid status')
+    elif name == 'move':
+        try:
+            value = datetime.strptime(str(operation.get('date')), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Invalid date format')
+    elif name == 'set_priority':
+        value = operation.get('priority')
+        if value not in TASK_PRIORITIES:
+            raise ValueError('Invalid priority')
+    return task_id, name, value
+
+def _apply_task_operation(task, name, value, pending):
+    """
+    Apply one parsed batch operation to a task the student owns (same rules as
+    the single-task routes). ``pending`` collects the per-date task count
+    changes of the batch, which deferrals count against.
+    """
+    old_date = task.date
+    if name == 'delete':
+        db.session.delete(task)
+        pending[old_date] = pending.get(old_date, 0) - 1
+        return {'task_id': task.id, 'success': True, 'deleted': True}
+    
+    if name in ('complete', 'uncomplete'):
+        task.completed = name == 'complete'
+        task.status = 'completed' if task.completed else 'not_started'
+    elif name == 'set_status':
+        task.status = value
+        task.completed = (value == 'completed')
+        if value == 'deferred':
+            next_slot = find_next_available_slot(current_user, task.date, pending)
+            if next_slot:
+                task.date = next_slot
+                task.status = 'not_started'  # Reset status when rescheduled
+    elif name == 'move':
+        task.date = value
+    elif name == 'set_priority':
+        task.priority = value
+    
+    if task.date != old_date:
+        pending[old_date] = pending.get(old_date, 0) - 1
+        pending[task.date] = pending.get(task.date, 0) + 1
+    
+    return {
+        'task_id': task.id,
+        'success': True,
+        'status': task.status,
+        'completed': task.completed,
+        'date': task.date.strftime('%Y-%m-%d'),
+        'priority': task.priority
+    }
+
+@app.route('/api/tasks/batch', methods=['POST'])
+@login_required
+def api_tasks_batch():
+    """Apply many task changes with one ownership query and one commit"""
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    if len(operations) > TASK_BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {TASK_BATCH_MAX_OPERATIONS} operations per batch'}), 400
+    
+    parsed = []
+    for operation in operations:
+        try:
+            parsed.append(_parse_task_operation(operation))
+        except ValueError as e:
+            parsed.append(e)
+    
+    # One query checks ownership of every task in the batch
+    task_ids = {entry[0] for entry in parsed if isinstance(entry, tuple)}
+    if current_user.is_multi_phase:
+        tasks = PhaseTask.query.join(ProjectPhase).filter(
+            PhaseTask.id.in_(task_ids),
+            ProjectPhase.student_id == current_user.id
+        ).all()
+    else:
+        tasks = ScheduleItem.query.filter(
+            ScheduleItem.id.in_(task_ids),
+            ScheduleItem.student_id == current_user.id
+        ).all()
+    tasks = {task.id: task for task in tasks}
+    
+    # Results are built before the commit, which would expire every task. Without
+    # autoflush, slot lookups for deferrals do not flush (and version) each change.
+    results = []
+    pending = {}
+    try:
+        with db.session.no_autoflush:
+            for operation, entry in zip(operations, parsed):
+                if isinstance(entry, ValueError):
+                    task_id = operation.get('task_id') if isinstance(operation, dict) else None
+                    results.append({'task_id': task_id, 'success': False, 'error': str(entry)})
+                    continue
+                task_id, name, value = entry
+                task = tasks.get(task_id)
+                if task is None:
+                    results.append({'task_id': task_id, 'success': False, 'error': 'Task not found'})
+                    continue
+                results.append(_apply_task_operation(task, name, value, pending))
+                if name == 'delete':
+                    del tasks[task_id]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'version': current_user.schedule_version
+    })
+
 @app.route('/mark_today_complete', methods=['POST'])
 @login_required
 def mark_today_complete():
@@ -2404,9 +2883,9 @@ def init_db():
             
             # Check if priority column exists, add if missing
             import sqlite3
-            db_path = 'instance/paperpacer.db'
+            db_path = db.engine.url.database if db.engine.url.get_backend_name() == 'sqlite' else None
             
-            if os.path.exists(db_path):
+            if db_path and os.path.exists(db_path):
                 conn = sqlite3.connect(db_path)
                 cursor = conn.cursor()
                 
@@ -2424,6 +2903,36 @@ def init_db():
                     cursor.execute("ALTER TABLE schedule_item ADD COLUMN priority VARCHAR(10) DEFAULT 'medium'")
                     print("Added priority column to schedule_item")
                 
+                # Check and add plan_version columns if missing
+                for table in ('phase_task', 'schedule_item'):
+                    try:
+                        cursor.execute(f"SELECT plan_version FROM {table} LIMIT 1")
+                    except sqlite3.OperationalError:
+                        cursor.execute(f"ALTER TABLE {table} ADD COLUMN plan_version VARCHAR(16)")
+                        print(f"Added plan_version column to {table}")
+                
+                # Check and add schedule_version column to student if missing
+                try:
+                    cursor.execute("SELECT schedule_version FROM student LIMIT 1")
+                except sqlite3.OperationalError:
+                    cursor.execute("ALTER TABLE student ADD COLUMN schedule_version INTEGER NOT NULL DEFAULT 0")
+                    print("Added schedule_version column to student")
+                
+                # Check and add cold archive columns to student if missing
+                for column in ('archived_at', 'last_login_at'):
+                    try:
+                        cursor.execute(f"SELECT {column} FROM student LIMIT 1")
+                    except sqlite3.OperationalError:
+                        cursor.execute(f"ALTER TABLE student ADD COLUMN {column} DATETIME")
+                        print(f"Added {column} column to student")
+                
+                # Check and add digest_sent_on column to student if missing
+                try:
+                    cursor.execute("SELECT digest_sent_on FROM student LIMIT 1")
+                except sqlite3.OperationalError:
+                    cursor.execute("ALTER TABLE student ADD COLUMN digest_sent_on DATE")
+                    print("Added digest_sent_on column to student")
+                
                 conn.commit()
                 conn.close()
             
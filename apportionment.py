@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Task Apportionment for PaperPacer
+
+This module splits a number of tasks across work days in proportion to each
+day's intensity weight (heavy days carry twice the load of light days) while
+never exceeding a per-day capacity cap.
+
+The split uses the largest remainder method on capped quotas:
+
+1. Find the fill level ``λ`` such that ``Σ min(cap_i, λ·weight_i)`` equals the
+   number of tasks (water-filling). Days whose quota reaches their cap are
+   saturated.
+2. Give every day the integer part of its quota.
+3. Hand the remaining tasks, one each, to the days with the largest
+   fractional parts. Ties go to the heavier day, then to the earlier day.
+
+Days with the same (weight, cap) pair share the same quota, so the fill level
+is found per intensity class and the whole computation is O(days).
+"""
+
+from fractions import Fraction
+from typing import Dict, List, Sequence
+
+# Relative load of each day intensity
+INTENSITY_WEIGHTS = {
+    'light': 1,
+    'heavy': 2
+}
+
+# Most tasks that may be scheduled on a single day of each intensity
+DAY_CAPACITY = {
+    'light': 4,
+    'heavy': 8
+}
+
+
+def intensity_weight(intensity: str) -> int:
+    return INTENSITY_WEIGHTS.get(intensity, INTENSITY_WEIGHTS['light'])
+
+
+def intensity_capacity(intensity: str, capacities: Dict[str, int] = None) -> int:
+    capacities = capacities or DAY_CAPACITY
+    return capacities.get(intensity, capacities.get('light', DAY_CAPACITY['light']))
+
+
+def apportion(total: int, weights: Sequence[int], caps: Sequence[int]) -> List[int]:
+    """
+    Split ``total`` tasks across days by weight without exceeding any cap.
+
+    Args:
+        total: Number of tasks to place
+        weights: Positive weight per day
+        caps: Maximum number of tasks per day
+
+    Returns:
+        Task count per day, in the same order as ``weights``. The counts sum
+        to ``min(total, sum(caps))``; any excess is left for the caller.
+    """
+    if len(weights) != len(caps):
+        raise ValueError("weights and caps must have the same length")
+    if any(w <= 0 for w in weights):
+        raise ValueError("weights must be positive")
+    if any(c < 0 for c in caps):
+        raise ValueError("caps must not be negative")
+
+    total = max(0, int(total))
+    capacity = sum(caps)
+    if total >= capacity:
+        return list(caps)
+    if total == 0:
+        return [0] * len(weights)
+
+    fill_level = _fill_level(total, weights, caps)
+
+    counts = []
+    remainders = []
+    for index, (weight, cap) in enumerate(zip(weights, caps)):
+        quota = min(Fraction(cap), fill_level * weight)
+        base = quota.numerator // quota.denominator
+        counts.append(base)
+        remainder = quota - base
+        if remainder > 0:
+            remainders.append((-remainder, -weight, index))
+
+    # The fractional parts sum to exactly the tasks still unassigned
+    leftover = total - sum(counts)
+    remainders.sort()
+    for _, _, index in remainders[:leftover]:
+        counts[index] += 1
+
+    return counts
+
+
+def _fill_level(total: int, weights: Sequence[int], caps: Sequence[int]) -> Fraction:
+    """Solve Σ min(cap_i, λ·w_i) = total for λ (requires 0 < total < Σ caps)"""
+    # Group identical days; intensity-based inputs have only a few classes
+    classes = {}
+    for weight, cap in zip(weights, caps):
+        classes[(weight, cap)] = classes.get((weight, cap), 0) + 1
+
+    # Classes saturate in order of cap / weight as λ grows
+    ordered = sorted(classes.items(), key=lambda item: Fraction(item[0][1], item[0][0]))
+
+    saturated_tasks = 0
+    free_weight = sum(weight * count for (weight, _), count in ordered)
+
+    for (weight, cap), count in ordered:
+        breakpoint = Fraction(cap, weight)
+        if saturated_tasks + breakpoint * free_weight >= total:
+            break
+        saturated_tasks += cap * count
+        free_weight -= weight * count
+
+    return Fraction(total - saturated_tasks, free_weight)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+"""
+Bulk Multi-Phase Migration for PaperPacer
+
+``MigrationService.migrate_student_to_multiphase`` migrates one student at a
+time through ORM objects. That is fine from a request, but far too slow for
+moving a whole legacy cohort. This module migrates students in chunks with
+set-based SQL. Each chunk takes a fixed number of statements, whatever its
+size:
+
+1. ``INSERT ... SELECT`` creates every student's Literature Review phase from
+   the student rows.
+2. The chunk's distinct task descriptions are classified in one batch (the
+   keyword classifier is cached). The result becomes a ``CASE`` over the
+   description.
+3. ``INSERT ... SELECT`` copies every ``ScheduleItem`` of the chunk into
+   ``PhaseTask``, joined to the new phases.
+4. One UPDATE marks the students as multi-phase, and their schedule versions
+   are bumped (see change_tracking.py).
+
+Each chunk commits together with its checkpoint row (``JobCheckpoint``).
+An interrupted run therefore resumes after the last committed chunk and
+never copies a student twice. A run that finishes resets the checkpoint, so
+the next one starts from the first student again and picks up anyone who has
+become eligible since (eligibility already excludes migrated students). Runs report throughput (students and tasks per
+second) and hold the job lock (see job_lock.py).
+
+A dry run writes nothing. It walks the same chunks and aggregates what would
+be migrated with grouped queries, the same ones behind
+``MigrationService.get_migration_preview``.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import case, func, insert, literal, select, update
+
+import change_tracking
+import job_lock
+import metrics
+from task_classifier import classify_task_type
+
+logger = logging.getLogger('paperpacer.jobs')
+
+# Job lock and checkpoint name
+JOB_NAME = 'multiphase_migration'
+
+# Students per chunk when the config does not say
+DEFAULT_CHUNK_SIZE = 500
+
+LITERATURE_REVIEW = 'literature_review'
+
+
+def classify_descriptions(descriptions: Iterable[str]) -> Dict[str, str]:
+    """Task type for each distinct description"""
+    return {text: classify_task_type(text) for text in set(descriptions)}
+
+
+def preview_students(student_ids: Sequence[int]) -> Dict[int, dict]:
+    """
+    What migrating each student would copy, aggregated in SQL.
+
+    Returns:
+        Per student id: total, completed and pending task counts, the task
+        date range and the task types that would be assigned
+    """
+    from app import db, ScheduleItem
+
+    previews = {
+        student_id: {
+            'total_tasks': 0, 'completed_tasks': 0, 'pending_tasks': 0,
+            'date_range': {'earliest': None, 'latest': None},
+            'task_types': {}
+        }
+        for student_id in student_ids
+    }
+    if not previews:
+        return previews
+
+    for student_id, total, completed, earliest, latest in db.session.query(
+        ScheduleItem.student_id,
+        func.count(ScheduleItem.id),
+        func.coalesce(func.sum(case((ScheduleItem.completed == True, 1), else_=0)), 0),
+        func.min(ScheduleItem.date),
+        func.max(ScheduleItem.date)
+    ).filter(ScheduleItem.student_id.in_(list(previews))).group_by(ScheduleItem.student_id):
+        preview = previews[student_id]
+        preview.update(total_tasks=total, completed_tasks=completed, pending_tasks=total - completed)
+        preview['date_range'] = {'earliest': earliest, 'latest': latest}
+
+    rows = db.session.query(
+        ScheduleItem.student_id, ScheduleItem.task_description, func.count(ScheduleItem.id)
+    ).filter(ScheduleItem.student_id.in_(list(previews))).group_by(
+        ScheduleItem.student_id, ScheduleItem.task_description
+    ).all()
+    task_types = classify_descriptions(description for _, description, _ in rows)
+    for student_id, description, count in rows:
+        counts = previews[student_id]['task_types']
+        task_type = task_types[description]
+        counts[task_type] = counts.get(task_type, 0) + count
+
+    return previews
+
+
+def _eligible_chunks(after_id: int, chunk_size: int):
+    """Ids of students the migration applies to, in id order after ``after_id`` (keyset paging)"""
+    from app import Student
+
+    last_id = after_id
+    while True:
+        ids = [row.id for row in Student.query.with_entities(Student.id).filter(
+            Student.id > last_id,
+            Student.is_multi_phase == False,
+            Student.onboarded == True,
+            Student.lit_review_deadline.isnot(None)
+        ).order_by(Student.id).limit(chunk_size)]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _migrate_chunk(student_ids: List[int], now: datetime) -> int:
+    """Migrate one chunk of students with set-based statements; returns tasks copied"""
+    from app import db, PhaseTask, ProjectPhase, ScheduleItem, Student
+
+    eligible = db.and_(
+        Student.id.in_(student_ids),
+        Student.is_multi_phase == False
+    )
+    db.session.execute(insert(ProjectPhase).from_select(
+        ['student_id', 'phase_type', 'phase_name', 'deadline', 'is_active', 'order_index', 'created_at'],
+        select(Student.id, literal(LITERATURE_REVIEW), literal('Literature Review'),
+               Student.lit_review_deadline, literal(True), literal(1), literal(now)).where(eligible)
+    ))
+
+    descriptions = db.session.execute(
+        select(ScheduleItem.task_description).where(ScheduleItem.student_id.in_(student_ids)).distinct()
+    ).scalars().all()
+    copied = 0
+    if descriptions:
+        task_type = case(classify_descriptions(descriptions), value=ScheduleItem.task_description,
+                         else_='general')
+        result = db.session.execute(insert(PhaseTask).from_select(
+            ['phase_id', 'date', 'task_description', 'task_type', 'day_intensity', 'priority',
+             'status', 'completed', 'created_at', 'plan_version'],
+            select(ProjectPhase.id, ScheduleItem.date, ScheduleItem.task_description, task_type,
+                   ScheduleItem.day_intensity, ScheduleItem.priority, ScheduleItem.status,
+                   ScheduleItem.completed, ScheduleItem.created_at, ScheduleItem.plan_version).join(
+                ProjectPhase, db.and_(
+                    ProjectPhase.student_id == ScheduleItem.student_id,
+                    ProjectPhase.phase_type == LITERATURE_REVIEW,
+                    ProjectPhase.created_at == now
+                )
+            ).where(ScheduleItem.student_id.in_(student_ids)).order_by(ScheduleItem.id)
+        ))
+        copied = result.rowcount
+
+    db.session.execute(update(Student).where(eligible).values(is_multi_phase=True))
+    change_tracking.bump_schedule_versions(student_ids)
+    return copied
+
+
+def _load_checkpoint(restart: bool):
+    from app import db, JobCheckpoint
+
+    checkpoint = db.session.get(JobCheckpoint, JOB_NAME)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=JOB_NAME, last_id=0, processed=0, items=0)
+        db.session.add(checkpoint)
+    elif restart or checkpoint.last_id == 0:
+        # Restarted, or the previous run finished
+        checkpoint.last_id = checkpoint.processed = checkpoint.items = 0
+    db.session.commit()
+    return checkpoint
+
+
+def _throughput(summary: Dict[str, any], elapsed: float):
+    summary['duration_ms'] = round(elapsed * 1000, 2)
+    summary['students_per_second'] = round(summary['students'] / elapsed, 1) if elapsed else 0.0
+    summary['tasks_per_second'] = round(summary['tasks'] / elapsed, 1) if elapsed else 0.0
+
+
+def run_bulk_migration(chunk_size: Optional[int] = None, dry_run: bool = False, restart: bool = False,
+                       lock_ttl: Optional[float] = None,
+                       progress: Optional[Callable[[Dict[str, any]], None]] = None) -> Dict[str, any]:
+    """
+    Migrate every eligible legacy student. Call inside an app context.
+
+    Args:
+        chunk_size: Students per chunk (and per transaction)
+        dry_run: Aggregate what would be migrated without writing anything
+        restart: Ignore the saved checkpoint and start from the first student
+        progress: Called with the running summary after each chunk
+
+    Returns a summary of the run. ``status`` is 'ok', 'skipped' when another
+    process holds the migration lock, or 'failed'. ``resumed_from`` is the
+    student id the run continued after.
+    """
+    from app import app, db
+
+    chunk_size = chunk_size or app.config.get('MIGRATION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    lock_ttl = lock_ttl or job_lock.DEFAULT_TTL
+
+    summary = {'job': JOB_NAME, 'status': 'ok', 'dry_run': dry_run, 'resumed_from': 0,
+               'chunks': 0, 'students': 0, 'tasks': 0}
+    if dry_run:
+        summary.update(completed_tasks=0, task_types={})
+    started = time.perf_counter()
+    outcome = 'failed'
+
+    try:
+        if dry_run:
+            from app import JobCheckpoint
+
+            checkpoint = None if restart else db.session.get(JobCheckpoint, JOB_NAME)
+            summary['resumed_from'] = checkpoint.last_id if checkpoint else 0
+            for student_ids in _eligible_chunks(summary['resumed_from'], chunk_size):
+                for preview in preview_students(student_ids).values():
+                    summary['tasks'] += preview['total_tasks']
+                    summary['completed_tasks'] += preview['completed_tasks']
+                    for task_type, count in preview['task_types'].items():
+                        summary['task_types'][task_type] = summary['task_types'].get(task_type, 0) + count
+                summary['chunks'] += 1
+                summary['students'] += len(student_ids)
+                _throughput(summary, time.perf_counter() - started)
+                if progress:
+                    progress(summary)
+        else:
+            with job_lock.job_lock(JOB_NAME, ttl=lock_ttl) as holder:
+                checkpoint = _load_checkpoint(restart)
+                summary['resumed_from'] = checkpoint.last_id
+                for student_ids in _eligible_chunks(checkpoint.last_id, chunk_size):
+                    now = datetime.utcnow()
+                    copied = _migrate_chunk(student_ids, now)
+                    checkpoint.last_id = student_ids[-1]
+                    checkpoint.processed += len(student_ids)
+                    checkpoint.items += copied
+                    checkpoint.updated_at = now
+                    db.session.commit()
+
+                    summary['chunks'] += 1
+                    summary['students'] += len(student_ids)
+                    summary['tasks'] += copied
+                    _throughput(summary, time.perf_counter() - started)
+                    if progress:
+                        progress(summary)
+
+                    if not job_lock.renew(JOB_NAME, holder, lock_ttl):
+                        raise RuntimeError("Lost the migration lock; stopping")
+
+                # Finished; processed and items keep this run's totals
+                checkpoint.last_id = 0
+                checkpoint.updated_at = datetime.utcnow()
+                db.session.commit()
+        outcome = 'ok'
+    except job_lock.LockNotAcquired:
+        summary['status'] = outcome = 'skipped'
+    finally:
+        _throughput(summary, time.perf_counter() - started)
+        if outcome == 'failed':
+            summary['status'] = 'failed'
+        metrics.JOB_DURATION.observe(time.perf_counter() - started, job=JOB_NAME, outcome=outcome)
+        logger.info(json.dumps({'event': 'job_run', **summary}, default=str))
+
+    return summary
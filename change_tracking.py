@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+
+"""
+Schedule Change Tracking for PaperPacer
+
+Every student has a ``schedule_version``. It goes up whenever one of their
+phases or phase tasks is inserted, updated or deleted. Caches of derived
+schedule data, such as the critical path in dependencies.py, are keyed by this
+version, so they never serve results for a schedule that has since changed.
+
+ORM changes are picked up by a session ``after_flush`` hook. Bulk UPDATE and
+INSERT ... SELECT statements bypass the hook, so code that uses them calls
+``bump_schedule_versions`` itself. Each bump is a single
+``schedule_version = schedule_version + 1`` UPDATE, so concurrent writers
+never hand out the same version twice.
+
+When a commit only moves tasks to new dates, the functions registered with
+``on_tasks_moved`` get the new version and the moves once the commit
+succeeds. They can then update their caches in place instead of rebuilding.
+
+The same hook keeps a change journal (``ScheduleChange``) for delta sync.
+It has one row per changed phase or task: the version of its latest change,
+and whether that change deleted it. ``changes_since`` turns the rows past a
+client's version into just the phases and tasks it has to patch. Bulk
+changes made through ``bump_schedule_versions`` journal the tasks they were
+given, or else a ``reset`` entry telling clients to reload everything. A
+reset replaces the student's older entries, which keeps the journal small.
+Deleting a phase journals the phase alone; clients drop its tasks with it.
+"""
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
+# Task changes that leave dependency graphs as they are, apart from dates
+_MOVE_ATTRIBUTES = {'date', 'day_intensity', 'status'}
+
+# Journal entry kinds; a reset entry has entity id 0
+PHASE, TASK, RESET = 'phase', 'task', 'reset'
+
+_move_listeners: List[Callable] = []
+_bump_listeners: List[Callable] = []
+
+
+def on_tasks_moved(listener: Callable):
+    """Register ``listener(student_id, new_version, {task_id: new_date})``"""
+    _move_listeners.append(listener)
+    return listener
+
+
+def on_versions_bumped(listener: Callable):
+    """Register ``listener(connection, {student_id: new_version})``, called inside the bumping transaction"""
+    if listener not in _bump_listeners:
+        _bump_listeners.append(listener)
+    return listener
+
+
+def bump_schedule_versions(student_ids: Iterable[int], changed_tasks: Optional[Mapping[int, Iterable[int]]] = None):
+    """
+    Record a change to these students' schedules made outside the ORM.
+
+    ``changed_tasks`` maps student ids to the ids of the (still existing) tasks
+    the change updated. Those are journaled one by one; any other student gets
+    a reset entry.
+    """
+    from sqlalchemy import update
+    from app import db, Student
+
+    student_ids = sorted(set(student_ids))
+    if not student_ids:
+        return
+    rows = db.session.execute(
+        update(Student).where(Student.id.in_(student_ids)).values(
+            schedule_version=Student.schedule_version + 1
+        ).returning(Student.id, Student.schedule_version),
+        execution_options={'synchronize_session': 'fetch'}
+    ).all()
+
+    entries = []
+    for student_id, version in rows:
+        task_ids = (changed_tasks or {}).get(student_id)
+        if task_ids:
+            entries.extend((student_id, version, TASK, task_id, False) for task_id in task_ids)
+        else:
+            entries.append((student_id, version, RESET, 0, False))
+    connection = db.session.connection()
+    _write_journal(connection, entries)
+    for listener in _bump_listeners:
+        listener(connection, dict(rows))
+
+
+def _write_journal(connection, entries):
+    """Store ``(student_id, version, kind, entity_id, deleted)`` entries, replacing older ones"""
+    from sqlalchemy import delete, insert
+    from app import ScheduleChange
+
+    table = ScheduleChange.__table__
+    latest = {}
+    for student_id, version, kind, entity_id, deleted in entries:
+        latest[(student_id, kind, entity_id)] = (version, deleted)
+    if not latest:
+        return
+
+    resets = sorted({student_id for student_id, kind, _ in latest if kind == RESET})
+    if resets:
+        connection.execute(delete(table).where(table.c.student_id.in_(resets)))
+    for kind in (PHASE, TASK):
+        entity_ids = sorted(entity_id for student_id, entry_kind, entity_id in latest
+                            if entry_kind == kind and student_id not in resets)
+        if entity_ids:
+            connection.execute(delete(table).where(table.c.kind == kind, table.c.entity_id.in_(entity_ids)))
+    connection.execute(insert(table), [
+        {'student_id': student_id, 'version': version, 'kind': kind, 'entity_id': entity_id, 'deleted': deleted}
+        for (student_id, kind, entity_id), (version, deleted) in latest.items()
+        if kind == RESET or student_id not in resets
+    ])
+
+
+def changes_since(student, since: int) -> Dict[str, any]:
+    """
+    The student's phases and tasks changed after schedule version ``since``.
+
+    Changed rows are returned as they are now; deleted ones by id only. With
+    ``reset`` set, the journal cannot cover the gap and the client should
+    reload its whole schedule instead.
+    """
+    from sqlalchemy import select
+    from app import db, PhaseTask, ProjectPhase, ScheduleChange
+
+    version = student.schedule_version or 0
+    result = {'version': version, 'reset': False, 'phases': [], 'tasks': [],
+              'deleted': {'phases': [], 'tasks': []}}
+    if since >= version:
+        # Nothing new, or a replica that has not caught up with the client yet
+        return result
+    if since < 0:
+        result['reset'] = True
+        return result
+
+    changed = {PHASE: set(), TASK: set()}
+    deleted = {PHASE: set(), TASK: set()}
+    for kind, entity_id, is_deleted in db.session.execute(
+        select(ScheduleChange.kind, ScheduleChange.entity_id, ScheduleChange.deleted).where(
+            ScheduleChange.student_id == student.id,
+            ScheduleChange.version > since,
+            ScheduleChange.version <= version
+        )
+    ):
+        if kind == RESET:
+            result['reset'] = True
+            return result
+        (deleted if is_deleted else changed)[kind].add(entity_id)
+
+    if changed[PHASE]:
+        for phase in db.session.execute(
+            select(ProjectPhase.id, ProjectPhase.phase_type, ProjectPhase.phase_name, ProjectPhase.deadline,
+                   ProjectPhase.order_index, ProjectPhase.is_active).where(
+                ProjectPhase.id.in_(sorted(changed[PHASE])), ProjectPhase.student_id == student.id
+            ).order_by(ProjectPhase.order_index, ProjectPhase.id)
+        ):
+            changed[PHASE].discard(phase.id)
+            result['phases'].append({
+                'id': phase.id, 'phase_type': phase.phase_type, 'phase_name': phase.phase_name,
+                'deadline': phase.deadline.isoformat(), 'order_index': phase.order_index,
+                'is_active': bool(phase.is_active)
+            })
+    if changed[TASK]:
+        for task in db.session.execute(
+            select(PhaseTask.id, PhaseTask.phase_id, PhaseTask.date, PhaseTask.task_description,
+                   PhaseTask.day_intensity, PhaseTask.priority, PhaseTask.status, PhaseTask.completed)
+            .join(ProjectPhase, PhaseTask.phase_id == ProjectPhase.id).where(
+                PhaseTask.id.in_(sorted(changed[TASK])), ProjectPhase.student_id == student.id
+            ).order_by(PhaseTask.date, PhaseTask.id)
+        ):
+            changed[TASK].discard(task.id)
+            result['tasks'].append({
+                'id': task.id, 'phase_id': task.phase_id, 'date': task.date.isoformat(),
+                'task_description': task.task_description, 'day_intensity': task.day_intensity,
+                'priority': task.priority, 'status': task.status, 'completed': bool(task.completed)
+            })
+
+    # Journaled as changed but gone since (e.g. removed along with their phase)
+    result['deleted']['phases'] = sorted(deleted[PHASE] | changed[PHASE])
+    result['deleted']['tasks'] = sorted(deleted[TASK] | changed[TASK])
+    return result
+
+
+def _changed_attributes(obj) -> set:
+    from sqlalchemy import inspect
+
+    state = inspect(obj)
+    return {attr.key for attr in state.attrs if attr.history.has_changes()}
+
+
+def _collect_changes(session):
+    """
+    Affected student ids, per student the task moves (None when more than
+    moves changed), and ``(student_id, kind, entity_id, deleted)`` journal
+    entries
+    """
+    from sqlalchemy import select
+    from app import PhaseTask, ProjectPhase
+
+    students = set()
+    not_moves = set()
+    journal = []
+    phase_changes = {}  # phase id -> [(task, moved date or None)]
+    phase_tasks = {}  # phase id -> [(task id, deleted)]
+    deleted = set(session.deleted)
+
+    for obj in list(session.new) + list(deleted):
+        if isinstance(obj, ProjectPhase):
+            students.add(obj.student_id)
+            not_moves.add(obj.student_id)
+            journal.append((obj.student_id, PHASE, obj.id, obj in deleted))
+        elif isinstance(obj, PhaseTask):
+            phase_changes.setdefault(obj.phase_id, []).append(None)
+            phase_tasks.setdefault(obj.phase_id, []).append((obj.id, obj in deleted))
+
+    for obj in session.dirty:
+        if isinstance(obj, ProjectPhase) and session.is_modified(obj):
+            students.add(obj.student_id)
+            not_moves.add(obj.student_id)
+            journal.append((obj.student_id, PHASE, obj.id, False))
+        elif isinstance(obj, PhaseTask) and session.is_modified(obj):
+            changed = _changed_attributes(obj)
+            if changed <= _MOVE_ATTRIBUTES:
+                entry = (obj.id, obj.date) if 'date' in changed else ()
+            else:
+                entry = None
+            phase_changes.setdefault(obj.phase_id, []).append(entry)
+            phase_tasks.setdefault(obj.phase_id, []).append((obj.id, False))
+
+    moves: Dict[int, dict] = {}
+    if phase_changes:
+        rows = session.connection().execute(
+            select(ProjectPhase.id, ProjectPhase.student_id).where(ProjectPhase.id.in_(list(phase_changes)))
+        ).all()
+        for phase_id, student_id in rows:
+            students.add(student_id)
+            for entry in phase_changes[phase_id]:
+                if entry is None:
+                    not_moves.add(student_id)
+                elif entry:
+                    moves.setdefault(student_id, {})[entry[0]] = entry[1]
+            journal.extend((student_id, TASK, task_id, is_deleted)
+                           for task_id, is_deleted in phase_tasks[phase_id])
+        # Tasks of deleted phases are gone along with them; the phase already counted
+        if len(rows) < len(phase_changes):
+            not_moves.update(students)
+
+    moves = {student_id: moves.get(student_id, {}) for student_id in students - not_moves}
+    return students, moves, journal
+
+
+def install_session_hooks():
+    """Bump schedule versions on flush and notify move listeners on commit"""
+    from sqlalchemy import event, update
+    from sqlalchemy.orm import Session
+    from sqlalchemy.orm.attributes import set_committed_value
+
+    if getattr(install_session_hooks, 'installed', False):
+        return
+    install_session_hooks.installed = True
+
+    @event.listens_for(Session, 'after_flush')
+    def _after_flush(session, flush_context):
+        from app import Student
+
+        students, moves, journal = _collect_changes(session)
+        if not students:
+            return
+        connection = session.connection()
+        rows = connection.execute(
+            update(Student.__table__).where(Student.__table__.c.id.in_(sorted(students))).values(
+                schedule_version=Student.__table__.c.schedule_version + 1
+            ).returning(Student.__table__.c.id, Student.__table__.c.schedule_version)
+        ).all()
+        versions = dict(rows)
+        _write_journal(connection, [(student_id, versions[student_id], kind, entity_id, is_deleted)
+                                    for student_id, kind, entity_id, is_deleted in journal
+                                    if student_id in versions])
+        for listener in _bump_listeners:
+            listener(connection, versions)
+        session.info.setdefault('schedule_versions', {}).update(versions)
+        pending = session.info.setdefault('schedule_moves', [])
+        for student_id, student_moves in moves.items():
+            if student_moves and student_id in versions:
+                pending.append((student_id, versions[student_id], student_moves))
+
+    @event.listens_for(Session, 'after_flush_postexec')
+    def _sync_loaded_students(session, flush_context):
+        from app import Student
+
+        versions = session.info.pop('schedule_versions', None)
+        if not versions:
+            return
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Student) and obj.id in versions:
+                set_committed_value(obj, 'schedule_version', versions[obj.id])
+
+    @event.listens_for(Session, 'after_commit')
+    def _notify_moves(session):
+        for student_id, version, student_moves in session.info.pop('schedule_moves', ()):
+            for listener in _move_listeners:
+                listener(student_id, version, student_moves)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_moves(session):
+        session.info.pop('schedule_moves', None)
+        session.info.pop('schedule_versions', None)
+
+
+def init_app(app):
+    """Track schedule versions for the app's database sessions"""
+    import dependencies
+
+    install_session_hooks()
+    if dependencies.apply_task_moves not in _move_listeners:
+        on_tasks_moved(dependencies.apply_task_moves)
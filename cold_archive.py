@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+"""
+Cold Archive for Inactive Students in PaperPacer
+
+Students stay in the database long after their thesis deadline has passed.
+Their phases, tasks and progress logs then only bloat the indexes that every
+page view and background job reads. This module moves those rows out of the
+hot tables and into one compressed ``StudentArchive`` row per student:
+
+- The archive job (see scripts/archive_inactive_students.py) picks students
+  who have been inactive for ``ARCHIVE_INACTIVE_DAYS``. That means no phase,
+  thesis or literature review deadline, progress log or login in that period.
+- A student's rows in every per-student table are serialized to JSON,
+  compressed with zlib and stored together with their primary keys. They are
+  then deleted from the hot tables. The ``Student`` row itself stays, so the
+  student can still log in, and ``archived_at`` marks it as archived.
+- When an archived student logs in again, ``rehydrate_student`` writes the
+  rows back under their original ids. Progress log links and the JSON task
+  lists therefore still point at the right tasks. If a new row has taken one
+  of those ids in the meantime, that row is restored under a fresh id and its
+  references are rewritten to match.
+
+Students are archived in chunks. Each chunk reads every table once for the
+whole chunk, deletes with one statement per table and commits on its own.
+The job holds the job lock (see job_lock.py).
+"""
+
+import base64
+import json
+import logging
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, DateTime, LargeBinary, and_, delete, exists, func, insert, or_, select, update
+
+import change_tracking
+import job_lock
+import metrics
+
+logger = logging.getLogger('paperpacer.jobs')
+
+LOCK_NAME = 'cold_archive'
+
+# Defaults when the app config does not set ARCHIVE_* values
+DEFAULT_INACTIVE_DAYS = 180
+DEFAULT_CHUNK_SIZE = 100
+
+# Bumped whenever the payload layout changes
+FORMAT_VERSION = 1
+
+# Archived tables, parents first (the order rows are restored in)
+TABLES = ('project_phase', 'phase_task', 'schedule_item', 'progress_log', 'progress_log_task',
+          'activity_bitmap')
+
+
+def _table_models():
+    from app import ActivityBitmap, PhaseTask, ProgressLog, ProgressLogTask, ProjectPhase, ScheduleItem
+
+    return {
+        'project_phase': ProjectPhase.__table__,
+        'phase_task': PhaseTask.__table__,
+        'schedule_item': ScheduleItem.__table__,
+        'progress_log': ProgressLog.__table__,
+        'progress_log_task': ProgressLogTask.__table__,
+        'activity_bitmap': ActivityBitmap.__table__,
+    }
+
+
+def _student_filters(tables, student_ids: List[int]):
+    """WHERE clause selecting each table's rows for ``student_ids``"""
+    phases = select(tables['project_phase'].c.id).where(tables['project_phase'].c.student_id.in_(student_ids))
+    logs = select(tables['progress_log'].c.id).where(tables['progress_log'].c.student_id.in_(student_ids))
+    return {
+        'project_phase': tables['project_phase'].c.student_id.in_(student_ids),
+        'phase_task': tables['phase_task'].c.phase_id.in_(phases),
+        'schedule_item': tables['schedule_item'].c.student_id.in_(student_ids),
+        'progress_log': tables['progress_log'].c.student_id.in_(student_ids),
+        'progress_log_task': tables['progress_log_task'].c.progress_log_id.in_(logs),
+        'activity_bitmap': tables['activity_bitmap'].c.student_id.in_(student_ids),
+    }
+
+
+# --- Payloads -------------------------------------------------------------
+
+def _encode_value(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, LargeBinary):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, LargeBinary):
+        return base64.b64decode(value)
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_payload(rows: Dict[str, List[dict]]) -> bytes:
+    """Compress one student's rows (table name -> column dicts)"""
+    tables = _table_models()
+    document = {
+        'format': FORMAT_VERSION,
+        'tables': {
+            name: [{key: _encode_value(tables[name].c[key], value) for key, value in row.items()}
+                   for row in rows.get(name, [])]
+            for name in TABLES
+        }
+    }
+    return zlib.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def decode_payload(payload: bytes) -> Dict[str, List[dict]]:
+    """Inverse of ``encode_payload``"""
+    tables = _table_models()
+    document = json.loads(zlib.decompress(payload).decode('utf-8'))
+    if document.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive format {document.get('format')!r}")
+    return {
+        name: [{key: _decode_value(tables[name].c[key], value) for key, value in row.items()}
+               for row in document['tables'].get(name, [])]
+        for name in TABLES
+    }
+
+
+# --- Archiving ------------------------------------------------------------
+
+def inactive_student_filter(cutoff: date):
+    """Students with no deadline, progress log, login or sign-up on or after ``cutoff``"""
+    from app import ProgressLog, ProjectPhase, Student
+
+    cutoff_time = datetime.combine(cutoff, datetime.min.time())
+    return and_(
+        Student.archived_at.is_(None),
+        Student.created_at < cutoff_time,
+        or_(Student.last_login_at.is_(None), Student.last_login_at < cutoff_time),
+        or_(Student.thesis_deadline.is_(None), Student.thesis_deadline < cutoff),
+        or_(Student.lit_review_deadline.is_(None), Student.lit_review_deadline < cutoff),
+        ~exists().where(ProjectPhase.student_id == Student.id, ProjectPhase.deadline >= cutoff),
+        ~exists().where(ProgressLog.student_id == Student.id, ProgressLog.date >= cutoff)
+    )
+
+
+def _inactive_chunks(cutoff: date, chunk_size: int):
+    """Ids of inactive students in id order, ``chunk_size`` at a time (keyset paging)"""
+    from app import Student
+
+    last_id = 0
+    while True:
+        ids = [row.id for row in Student.query.with_entities(Student.id).filter(
+            Student.id > last_id,
+            inactive_student_filter(cutoff)
+        ).order_by(Student.id).limit(chunk_size)]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _archive_chunk(student_ids: List[int], cutoff: date, now: datetime) -> Dict[str, int]:
+    """Move one chunk of students into the archive; returns students, rows and bytes written"""
+    from app import db, Student, StudentArchive
+
+    # Claim the students first: one that logged in since the chunk was read is skipped
+    claimed = [row[0] for row in db.session.execute(
+        update(Student).where(Student.id.in_(student_ids), inactive_student_filter(cutoff)).values(
+            archived_at=now
+        ).returning(Student.id),
+        execution_options={'synchronize_session': False}
+    )]
+    if not claimed:
+        db.session.commit()
+        return {'students': 0, 'rows': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+
+    tables = _table_models()
+    filters = _student_filters(tables, claimed)
+    phase_students = {}
+    log_students = {}
+    per_student = {student_id: {name: [] for name in TABLES} for student_id in claimed}
+
+    for name in TABLES:
+        table = tables[name]
+        for row in db.session.execute(select(table).where(filters[name]).order_by(*table.primary_key)).mappings():
+            row = dict(row)
+            if name == 'phase_task':
+                student_id = phase_students[row['phase_id']]
+            elif name == 'progress_log_task':
+                student_id = log_students[row['progress_log_id']]
+            else:
+                student_id = row['student_id']
+            if name == 'project_phase':
+                phase_students[row['id']] = student_id
+            elif name == 'progress_log':
+                log_students[row['id']] = student_id
+            per_student[student_id][name].append(row)
+
+    archives = []
+    totals = {'students': len(claimed), 'rows': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+    for student_id, rows in per_student.items():
+        payload = encode_payload(rows)
+        row_count = sum(len(table_rows) for table_rows in rows.values())
+        raw_bytes = len(zlib.decompress(payload))
+        archives.append({'student_id': student_id, 'archived_at': now, 'format_version': FORMAT_VERSION,
+                         'row_count': row_count, 'raw_bytes': raw_bytes, 'payload': payload})
+        totals['rows'] += row_count
+        totals['raw_bytes'] += raw_bytes
+        totals['stored_bytes'] += len(payload)
+    db.session.execute(insert(StudentArchive), archives)
+
+    # Children first, so no foreign key is left dangling mid-statement
+    for name in reversed(TABLES):
+        db.session.execute(delete(tables[name]).where(filters[name]))
+    change_tracking.bump_schedule_versions(claimed)
+    db.session.commit()
+    return totals
+
+
+def run_archive(today: Optional[date] = None, inactive_days: Optional[int] = None,
+                chunk_size: Optional[int] = None, lock_ttl: Optional[float] = None) -> Dict[str, any]:
+    """
+    Archive every inactive student. Call inside an app context.
+
+    Returns a summary of the run. ``status`` is 'ok', 'skipped' when another
+    process holds the archive lock, or 'failed'.
+    """
+    from app import app
+
+    today = today or date.today()
+    if inactive_days is None:
+        inactive_days = app.config.get('ARCHIVE_INACTIVE_DAYS', DEFAULT_INACTIVE_DAYS)
+    chunk_size = chunk_size or app.config.get('ARCHIVE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    lock_ttl = lock_ttl or app.config.get('ARCHIVE_LOCK_TTL', job_lock.DEFAULT_TTL)
+    cutoff = today - timedelta(days=inactive_days)
+
+    summary = {'job': LOCK_NAME, 'date': today.isoformat(), 'cutoff': cutoff.isoformat(), 'status': 'ok',
+               'chunks': 0, 'students': 0, 'rows': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+    started = time.perf_counter()
+    outcome = 'failed'
+
+    try:
+        with job_lock.job_lock(LOCK_NAME, ttl=lock_ttl) as holder:
+            for student_ids in _inactive_chunks(cutoff, chunk_size):
+                totals = _archive_chunk(student_ids, cutoff, datetime.utcnow())
+                summary['chunks'] += 1
+                for key, value in totals.items():
+                    summary[key] += value
+
+                if not job_lock.renew(LOCK_NAME, holder, lock_ttl):
+                    raise RuntimeError("Lost the archive lock; stopping")
+        outcome = 'ok'
+    except job_lock.LockNotAcquired:
+        summary['status'] = outcome = 'skipped'
+    finally:
+        duration = time.perf_counter() - started
+        summary['duration_ms'] = round(duration * 1000, 2)
+        if outcome == 'failed':
+            summary['status'] = 'failed'
+        metrics.JOB_DURATION.observe(duration, job=LOCK_NAME, outcome=outcome)
+        metrics.ARCHIVED_STUDENTS.inc(summary['students'], outcome='archived')
+        logger.info(json.dumps({'event': 'job_run', **summary}))
+
+    return summary
+
+
+# --- Rehydration ----------------------------------------------------------
+
+def _remap_ids(rows: Dict[str, List[dict]], taken: Dict[str, set], next_ids: Dict[str, int],
+               is_multi_phase: bool):
+    """Give rows whose id is now taken a fresh one and rewrite references to it"""
+    id_maps = {}
+    for name in ('project_phase', 'phase_task', 'schedule_item', 'progress_log', 'activity_bitmap'):
+        id_maps[name] = {}
+        for row in rows[name]:
+            if row['id'] in taken[name]:
+                id_maps[name][row['id']] = next_ids[name]
+                row['id'] = next_ids[name]
+                next_ids[name] += 1
+
+    phases, tasks, items, logs = (id_maps['project_phase'], id_maps['phase_task'],
+                                  id_maps['schedule_item'], id_maps['progress_log'])
+    if not (phases or tasks or items or logs):
+        return
+
+    def remap_list(text, mapping):
+        if not text or not mapping:
+            return text
+        try:
+            values = json.loads(text)
+        except ValueError:
+            return text
+        if not isinstance(values, list):
+            return text
+        remapped = []
+        for value in values:
+            try:
+                new_id = mapping.get(int(value))
+            except (TypeError, ValueError):
+                new_id = None
+            remapped.append(value if new_id is None else type(value)(new_id))
+        return json.dumps(remapped)
+
+    for row in rows['phase_task']:
+        row['phase_id'] = phases.get(row['phase_id'], row['phase_id'])
+    for row in rows['progress_log']:
+        if row['phase_id'] is not None:
+            row['phase_id'] = phases.get(row['phase_id'], row['phase_id'])
+        row['tasks_completed'] = remap_list(row['tasks_completed'], tasks if is_multi_phase else items)
+        row['phase_tasks_completed'] = remap_list(row['phase_tasks_completed'], tasks)
+    for row in rows['progress_log_task']:
+        row['progress_log_id'] = logs.get(row['progress_log_id'], row['progress_log_id'])
+        mapping = tasks if row['is_phase_task'] else items
+        row['task_id'] = mapping.get(row['task_id'], row['task_id'])
+    for row in rows['activity_bitmap']:
+        # Phase 0 is the all-phases bitmap
+        if row['phase_id']:
+            row['phase_id'] = phases.get(row['phase_id'], row['phase_id'])
+
+
+def rehydrate_student(student) -> bool:
+    """
+    Restore an archived student's rows to the hot tables and commit.
+
+    Returns False if the student was not archived (or another request
+    restored them first).
+    """
+    from app import db, Student, StudentArchive
+
+    if student.archived_at is None:
+        return False
+    started = time.perf_counter()
+
+    # Release the claim first, so two concurrent logins cannot both restore
+    released = db.session.execute(
+        update(Student).where(Student.id == student.id, Student.archived_at.isnot(None)).values(
+            archived_at=None
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    archive = db.session.get(StudentArchive, student.id) if released else None
+    if archive is None:
+        db.session.commit()
+        db.session.refresh(student)
+        return False
+
+    rows = decode_payload(archive.payload)
+    row_count = archive.row_count
+    tables = _table_models()
+    taken = {}
+    next_ids = {}
+    for name in ('project_phase', 'phase_task', 'schedule_item', 'progress_log', 'activity_bitmap'):
+        table = tables[name]
+        ids = [row['id'] for row in rows[name]]
+        taken[name] = set(db.session.execute(
+            select(table.c.id).where(table.c.id.in_(ids))
+        ).scalars()) if ids else set()
+        if taken[name]:
+            highest = max(db.session.execute(select(func.max(table.c.id))).scalar() or 0, max(ids))
+            next_ids[name] = highest + 1
+    _remap_ids(rows, taken, next_ids, bool(student.is_multi_phase))
+
+    for name in TABLES:
+        if rows[name]:
+            db.session.execute(insert(tables[name]), rows[name])
+    db.session.delete(archive)
+    change_tracking.bump_schedule_versions([student.id])
+    db.session.commit()
+    db.session.refresh(student)
+
+    metrics.ARCHIVED_STUDENTS.inc(outcome='rehydrated')
+    logger.info(json.dumps({'event': 'rehydrate', 'student_id': student.id, 'rows': row_count,
+                            'duration_ms': round((time.perf_counter() - started) * 1000, 2)}))
+    return True
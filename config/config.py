@@ -13,6 +13,75 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@paperpacer.com')
+    
+    # Password hashing (see passwords.py). Hashes made with another method are
+    # upgraded on the user's next login; benchmark with
+    # scripts/benchmark_password_hashing.py before raising the cost.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_POOL_SIZE = int(os.environ.get('PASSWORD_HASH_POOL_SIZE', 0))  # processes per worker; 0 = inline
+    
+    # Public URL used for links in emails sent outside a request
+    APP_BASE_URL = os.environ.get('APP_BASE_URL', 'http://localhost:5000')
+    
+    # Metrics (Prometheus text format on /metrics). Set PAPERPACER_METRICS_DIR
+    # to a directory shared by all gunicorn workers to aggregate across them.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Server-Timing header and JSON timing log line per request
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING_LOG = os.environ.get('SERVER_TIMING_LOG', 'True').lower() == 'true'
+    
+    # Token for operational /admin endpoints (disabled when unset)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Sampling profiler (see profiler.py)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() == 'true'
+    PROFILER_INTERVAL = float(os.environ.get('PROFILER_INTERVAL', 0.01))  # seconds between samples
+    PROFILER_MAX_OVERHEAD = float(os.environ.get('PROFILER_MAX_OVERHEAD', 0.01))  # fraction of wall time
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')  # enables X-PaperPacer-Profile deep profiles
+    PROFILER_OUTPUT_DIR = os.environ.get('PROFILER_OUTPUT_DIR')  # defaults to instance/profiles
+    
+    # Worker memory tracking with tracemalloc (see memory_tracker.py)
+    MEMORY_TRACKING_ENABLED = os.environ.get('MEMORY_TRACKING_ENABLED', 'False').lower() == 'true'
+    MEMORY_TRACKING_FRAMES = int(os.environ.get('MEMORY_TRACKING_FRAMES', 10))
+    MEMORY_SNAPSHOT_EVERY = int(os.environ.get('MEMORY_SNAPSHOT_EVERY', 500))  # requests
+    MEMORY_SNAPSHOT_INTERVAL = float(os.environ.get('MEMORY_SNAPSHOT_INTERVAL', 300))  # seconds
+    
+    # Read-only engine for GET requests (see read_routing.py)
+    READ_ROUTING_ENABLED = os.environ.get('READ_ROUTING_ENABLED', 'True').lower() == 'true'
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('DATABASE_READ_URL')  # replica; defaults to SQLite mode=ro
+    
+    # Nightly overdue-task rollover (see rollover.py)
+    ROLLOVER_CHUNK_SIZE = int(os.environ.get('ROLLOVER_CHUNK_SIZE', 200))  # students per transaction
+    ROLLOVER_WINDOW_DAYS = int(os.environ.get('ROLLOVER_WINDOW_DAYS', 7))  # days overdue tasks spread over
+    ROLLOVER_LOCK_TTL = float(os.environ.get('ROLLOVER_LOCK_TTL', 900))  # seconds, renewed per chunk
+    
+    # Bulk legacy-to-multi-phase migration (see bulk_migration.py)
+    MIGRATION_CHUNK_SIZE = int(os.environ.get('MIGRATION_CHUNK_SIZE', 500))  # students per transaction
+    
+    # Cold archive of inactive students (see cold_archive.py)
+    ARCHIVE_INACTIVE_DAYS = int(os.environ.get('ARCHIVE_INACTIVE_DAYS', 180))  # days without deadlines or activity
+    ARCHIVE_CHUNK_SIZE = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 100))  # students per transaction
+    ARCHIVE_LOCK_TTL = float(os.environ.get('ARCHIVE_LOCK_TTL', 900))  # seconds, renewed per chunk
+    
+    # Per-worker cache of critical-path graphs (see dependencies.py)
+    CRITICAL_PATH_CACHE_SIZE = int(os.environ.get('CRITICAL_PATH_CACHE_SIZE', 256))  # students
+    
+    # Per-worker cache of rendered template fragments (see fragment_cache.py)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 1024))  # fragments; 0 disables
+    
+    # Live update events over Server-Sent Events (see live_events.py)
+    LIVE_EVENTS_URL = os.environ.get('LIVE_EVENTS_URL')  # e.g. /events behind nginx; unset disables live updates
+    LIVE_EVENTS_HOST = os.environ.get('LIVE_EVENTS_HOST', '127.0.0.1')  # event server address
+    LIVE_EVENTS_PORT = int(os.environ.get('LIVE_EVENTS_PORT', 8001))
+    LIVE_EVENTS_POLL_INTERVAL = float(os.environ.get('LIVE_EVENTS_POLL_INTERVAL', 1.0))  # seconds between event reads
+    LIVE_EVENTS_RETENTION = float(os.environ.get('LIVE_EVENTS_RETENTION', 600))  # seconds events stay replayable
+    
+    # Daily digest emails (see digest.py)
+    DIGEST_CHUNK_SIZE = int(os.environ.get('DIGEST_CHUNK_SIZE', 500))  # students per batch of queries
+    DIGEST_RATE_LIMIT = float(os.environ.get('DIGEST_RATE_LIMIT', 10))  # messages per second
+    DIGEST_OUTPUT_DIR = os.environ.get('DIGEST_OUTPUT_DIR')  # dry-run .eml files; defaults to instance/digests
+    DIGEST_LOCK_TTL = float(os.environ.get('DIGEST_LOCK_TTL', 900))  # seconds, renewed per chunk
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -28,6 +97,7 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # fast hashes keep the test suite quick
 
 # Configuration dictionary
 config = {
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+"""
+Task and Phase Dependencies for PaperPacer
+
+Some work can only happen after other work is done: an IRB application is
+submitted after the consent forms are drafted, and instruments are piloted
+after they are drafted. This module declares those edges once, between template
+tasks (``TASK_DEPENDENCIES``) and between phase types (``PHASE_DEPENDENCIES``).
+It resolves them against a student's stored tasks and runs a critical-path
+computation over the resulting graph.
+
+A task edge is finish-to-start: the dependent task goes on a later day than
+its prerequisite. A phase edge is finish-to-finish: phases may overlap, but a
+phase's last task comes after the last task of each prerequisite phase.
+Edges are matched to stored tasks by phase type and description, so tasks
+the student added or renamed simply have no edges.
+
+Critical path
+-------------
+Each incomplete task takes one day. The forward pass gives every task an
+earliest start: the later of its scheduled date (or today, if overdue) and
+the day after each prerequisite's earliest start. The backward pass gives a
+latest start: the earlier of its phase deadline and the day before each
+dependent's latest start. Slack is the difference in days. A negative slack
+means a chain of dependencies cannot finish by the deadline as scheduled. The
+tasks with the least slack form the critical path.
+
+Moving one task only changes the earliest starts of the tasks downstream of
+it, so ``CriticalPath.move`` updates just those. Graphs are cached per
+student and keyed by ``Student.schedule_version`` (see change_tracking.py).
+When a commit only moves tasks, the cached graph is updated in place instead
+of being rebuilt.
+"""
+
+import heapq
+from collections import OrderedDict
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Phase types whose last task must come after the prerequisite phases' last task
+PHASE_DEPENDENCIES = {
+    'research_question': ('literature_review',),
+    'methods_planning': ('research_question',),
+    'irb_proposal': ('methods_planning',),
+}
+
+# (phase type, prerequisite task) -> (phase type, dependent task)
+TASK_DEPENDENCIES = (
+    (('literature_review', "Set up note-taking system with template for articles"),
+     ('literature_review', "Skim and take detailed notes on 2 articles per day")),
+    (('literature_review', "Identify commonalities and literature gaps"),
+     ('literature_review', "Draft 2-3 potential research questions")),
+    (('literature_review', "Identify commonalities and literature gaps"),
+     ('research_question', "Refine research question based on literature gaps")),
+    (('research_question', "Draft one-paragraph research gap statement"),
+     ('research_question', "Refine research question based on literature gaps")),
+    (('research_question', "Develop theoretical framework outline"),
+     ('research_question', "Create research question justification document")),
+    (('methods_planning', "Choose primary research method"),
+     ('methods_planning', "Draft Methods section outline (sampling, procedure, instruments)")),
+    (('methods_planning', "Draft survey, interview guide, or observation plan"),
+     ('methods_planning', "Pilot instruments with 3-5 participants")),
+    (('methods_planning', "Pilot instruments with 3-5 participants"),
+     ('methods_planning', "Refine based on clarity and usefulness")),
+    (('methods_planning', "Finalize sampling criteria and recruitment methods"),
+     ('irb_proposal', "Draft consent forms and recruitment scripts")),
+    (('irb_proposal', "Complete CITI training or ethics certification"),
+     ('irb_proposal', "Submit IRB application")),
+    (('irb_proposal', "Draft informed consent forms"),
+     ('irb_proposal', "Submit IRB application")),
+    (('irb_proposal', "Draft consent forms and recruitment scripts"),
+     ('irb_proposal', "Submit IRB application")),
+    (('irb_proposal', "Get adviser feedback on IRB documents"),
+     ('irb_proposal', "Submit IRB application")),
+    (('irb_proposal', "Submit IRB application"),
+     ('irb_proposal', "Revise IRB materials based on feedback")),
+    (('irb_proposal', "Revise IRB materials based on feedback"),
+     ('irb_proposal', "Finalize all compliance documentation")),
+)
+
+TaskKey = Tuple[str, str]  # (phase type, description)
+Edge = Tuple[int, int]  # (prerequisite task id, dependent task id)
+
+
+class DependencyRules(NamedTuple):
+    """Validated dependency declarations (read-only)"""
+    task_prerequisites: Mapping[TaskKey, Tuple[TaskKey, ...]]
+    phase_prerequisites: Mapping[str, Tuple[str, ...]]  # Direct prerequisites per phase type
+
+
+def _phase_ancestors(phase_type: str, phase_prerequisites: Mapping[str, Sequence[str]], seen=()) -> set:
+    if phase_type in seen:
+        raise ValueError(f"Phase dependency cycle through {phase_type}")
+    ancestors = set()
+    for prerequisite in phase_prerequisites.get(phase_type, ()):
+        ancestors.add(prerequisite)
+        ancestors |= _phase_ancestors(prerequisite, phase_prerequisites, seen + (phase_type,))
+    return ancestors
+
+
+def compile_dependencies(phase_templates: Mapping[str, dict],
+                         task_dependencies: Iterable[Tuple[TaskKey, TaskKey]] = TASK_DEPENDENCIES,
+                         phase_dependencies: Mapping[str, Sequence[str]] = PHASE_DEPENDENCIES) -> DependencyRules:
+    """
+    Check dependency declarations against the phase templates.
+
+    Raises:
+        ValueError: for unknown phase types or tasks, an edge within a phase
+            that runs against template order, a cross-phase edge between
+            phases that are not ordered by ``phase_dependencies``, or a cycle
+    """
+    for phase_type, prerequisites in phase_dependencies.items():
+        for name in (phase_type,) + tuple(prerequisites):
+            if name not in phase_templates:
+                raise ValueError(f"Unknown phase type in dependencies: {name}")
+    ancestors = {phase_type: _phase_ancestors(phase_type, phase_dependencies) for phase_type in phase_templates}
+
+    positions = {
+        (phase_type, text): index
+        for phase_type, template in phase_templates.items()
+        for index, text in enumerate(template['task_templates'])
+    }
+    task_prerequisites = {}
+    for prerequisite, dependent in task_dependencies:
+        for key in (prerequisite, dependent):
+            if key not in positions:
+                raise ValueError(f"Unknown task in dependencies: {key[0]}: {key[1]}")
+        if prerequisite[0] == dependent[0]:
+            # Task order within a phase must stay a valid order for its edges
+            if positions[prerequisite] >= positions[dependent]:
+                raise ValueError(f"{dependent[1]!r} comes before its prerequisite {prerequisite[1]!r}")
+        elif prerequisite[0] not in ancestors[dependent[0]]:
+            raise ValueError(f"{dependent[0]} does not follow {prerequisite[0]}; "
+                             f"add a phase dependency before linking their tasks")
+        task_prerequisites.setdefault(dependent, []).append(prerequisite)
+
+    return DependencyRules(
+        MappingProxyType({key: tuple(value) for key, value in task_prerequisites.items()}),
+        MappingProxyType({key: tuple(value) for key, value in phase_dependencies.items()})
+    )
+
+
+def present_prerequisites(rules: DependencyRules, phase_type: str, present: Iterable[str]) -> List[str]:
+    """Nearest prerequisite phase types a student actually has, skipping absent ones"""
+    present = set(present)
+    found = []
+    pending = list(rules.phase_prerequisites.get(phase_type, ()))
+    seen = set()
+    while pending:
+        prerequisite = pending.pop(0)
+        if prerequisite in seen:
+            continue
+        seen.add(prerequisite)
+        if prerequisite in present:
+            found.append(prerequisite)
+        else:
+            pending.extend(rules.phase_prerequisites.get(prerequisite, ()))
+    return found
+
+
+class TaskNode(NamedTuple):
+    """One incomplete task in a student's dependency graph"""
+    task_id: int
+    phase_id: int
+    phase_type: str
+    description: str
+    date: date
+    deadline: date
+
+
+def resolve_edges(rules: DependencyRules, tasks: Sequence[TaskNode]) -> List[Edge]:
+    """
+    Match dependency rules to concrete tasks.
+
+    Only the given tasks take part: edges to tasks that are not listed
+    (usually completed ones) are dropped, since those no longer constrain
+    anything.
+    """
+    by_key = {}
+    last_in_phase = {}
+    phase_types = {}
+    for task in tasks:
+        by_key.setdefault((task.phase_id, task.description), task.task_id)
+        phase_types[task.phase_id] = task.phase_type
+        last = last_in_phase.get(task.phase_id)
+        if last is None or (task.date, task.task_id) > (last.date, last.task_id):
+            last_in_phase[task.phase_id] = task
+
+    phases_by_type = {}
+    for phase_id, phase_type in phase_types.items():
+        phases_by_type.setdefault(phase_type, []).append(phase_id)
+
+    edges = set()
+    for task in tasks:
+        for prerequisite_type, description in rules.task_prerequisites.get((task.phase_type, task.description), ()):
+            for phase_id in phases_by_type.get(prerequisite_type, ()):
+                prerequisite = by_key.get((phase_id, description))
+                if prerequisite is not None and prerequisite != task.task_id:
+                    edges.add((prerequisite, task.task_id))
+
+    for phase_id, phase_type in phase_types.items():
+        last = last_in_phase[phase_id]
+        for prerequisite_type in present_prerequisites(rules, phase_type, phases_by_type):
+            for prerequisite_phase in phases_by_type[prerequisite_type]:
+                edges.add((last_in_phase[prerequisite_phase].task_id, last.task_id))
+
+    return sorted(edges)
+
+
+def topological_order(task_ids: Iterable[int], edges: Iterable[Edge]) -> List[int]:
+    """
+    Order tasks so every prerequisite precedes its dependents (Kahn's algorithm).
+
+    Raises:
+        ValueError: if the edges contain a cycle
+    """
+    task_ids = list(task_ids)
+    successors = {task_id: [] for task_id in task_ids}
+    indegree = dict.fromkeys(task_ids, 0)
+    for prerequisite, dependent in edges:
+        if prerequisite in successors and dependent in successors:
+            successors[prerequisite].append(dependent)
+            indegree[dependent] += 1
+
+    ready = [task_id for task_id in task_ids if indegree[task_id] == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        task_id = heapq.heappop(ready)
+        order.append(task_id)
+        for dependent in successors[task_id]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                heapq.heappush(ready, dependent)
+
+    if len(order) != len(task_ids):
+        raise ValueError("Task dependencies contain a cycle")
+    return order
+
+
+class CriticalPath:
+    """Earliest/latest starts and slack for a student's incomplete tasks"""
+
+    def __init__(self, tasks: Sequence[TaskNode], edges: Iterable[Edge], today: date):
+        self.today = today
+        self.tasks = {task.task_id: task for task in tasks}
+        self.dates = {task.task_id: task.date for task in tasks}
+        self.predecessors = {task_id: [] for task_id in self.tasks}
+        self.successors = {task_id: [] for task_id in self.tasks}
+        for prerequisite, dependent in edges:
+            if prerequisite in self.tasks and dependent in self.tasks:
+                self.predecessors[dependent].append(prerequisite)
+                self.successors[prerequisite].append(dependent)
+
+        self.order = topological_order(self.tasks, edges)
+        self.rank = {task_id: i for i, task_id in enumerate(self.order)}
+
+        self.earliest_start = {}
+        for task_id in self.order:
+            self.earliest_start[task_id] = self._earliest(task_id)
+
+        self.latest_start = {}
+        for task_id in reversed(self.order):
+            latest = self.tasks[task_id].deadline
+            for dependent in self.successors[task_id]:
+                latest = min(latest, self.latest_start[dependent] - timedelta(days=1))
+            self.latest_start[task_id] = latest
+
+    def _earliest(self, task_id: int) -> date:
+        earliest = max(self.dates[task_id], self.today)
+        for prerequisite in self.predecessors[task_id]:
+            earliest = max(earliest, self.earliest_start[prerequisite] + timedelta(days=1))
+        return earliest
+
+    def move(self, task_id: int, new_date: date) -> List[int]:
+        """
+        Reschedule one task and update the earliest starts downstream of it.
+
+        Returns:
+            Ids of tasks whose earliest start changed
+        """
+        if task_id not in self.tasks:
+            return []
+        self.dates[task_id] = new_date
+
+        changed = []
+        pending = [(self.rank[task_id], task_id)]
+        queued = {task_id}
+        while pending:
+            _, current = heapq.heappop(pending)
+            earliest = self._earliest(current)
+            if earliest == self.earliest_start[current]:
+                continue
+            self.earliest_start[current] = earliest
+            changed.append(current)
+            for dependent in self.successors[current]:
+                if dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(pending, (self.rank[dependent], dependent))
+        return changed
+
+    def slack(self, task_id: int) -> int:
+        """Days a task can slip without pushing a dependent chain past a deadline"""
+        return (self.latest_start[task_id] - self.earliest_start[task_id]).days
+
+    def critical_tasks(self) -> List[int]:
+        """Tasks with the least slack, in dependency order"""
+        if not self.tasks:
+            return []
+        least = min(self.slack(task_id) for task_id in self.order)
+        return [task_id for task_id in self.order if self.slack(task_id) == least]
+
+    def phase_summary(self) -> Dict[int, Dict[str, any]]:
+        """Least slack, tasks at that slack and late tasks per phase"""
+        summary = {}
+        for task_id in self.order:
+            task = self.tasks[task_id]
+            slack = self.slack(task_id)
+            entry = summary.setdefault(task.phase_id, {'slack_days': slack, 'critical_tasks': [], 'late_tasks': 0})
+            if slack < entry['slack_days']:
+                entry['slack_days'] = slack
+                entry['critical_tasks'] = []
+            if slack == entry['slack_days']:
+                entry['critical_tasks'].append(task.description)
+            if slack < 0:
+                entry['late_tasks'] += 1
+        return summary
+
+
+def load_task_nodes(student, deadline_overrides: Dict[int, date] = None) -> List[TaskNode]:
+    """A student's incomplete tasks in active phases, ordered by phase and date (one query)"""
+    from app import db, PhaseTask, ProjectPhase
+
+    deadline_overrides = deadline_overrides or {}
+    rows = db.session.query(
+        PhaseTask.id, PhaseTask.phase_id, ProjectPhase.phase_type, PhaseTask.task_description,
+        PhaseTask.date, ProjectPhase.deadline
+    ).join(ProjectPhase, PhaseTask.phase_id == ProjectPhase.id).filter(
+        ProjectPhase.student_id == student.id,
+        ProjectPhase.is_active == True,
+        PhaseTask.completed == False
+    ).order_by(PhaseTask.phase_id, PhaseTask.date, PhaseTask.id).all()
+    return [
+        TaskNode(task_id, phase_id, phase_type, description, task_date,
+                 deadline_overrides.get(phase_id, deadline))
+        for task_id, phase_id, phase_type, description, task_date, deadline in rows
+    ]
+
+
+# student id -> (schedule version, day computed, CriticalPath), least recently used first
+_graph_cache: 'OrderedDict[int, Tuple[int, date, CriticalPath]]' = OrderedDict()
+
+
+def student_critical_path(student, today: date = None) -> CriticalPath:
+    """Cached critical path for a student's current schedule"""
+    from flask import current_app
+    from app import PHASE_DEPENDENCY_RULES
+
+    today = today or date.today()
+    version = student.schedule_version or 0
+    cached = _graph_cache.get(student.id)
+    if cached and cached[0] == version and cached[1] == today:
+        _graph_cache.move_to_end(student.id)
+        return cached[2]
+
+    tasks = load_task_nodes(student)
+    graph = CriticalPath(tasks, resolve_edges(PHASE_DEPENDENCY_RULES, tasks), today)
+    _graph_cache[student.id] = (version, today, graph)
+    _graph_cache.move_to_end(student.id)
+    while len(_graph_cache) > current_app.config.get('CRITICAL_PATH_CACHE_SIZE', 256):
+        _graph_cache.popitem(last=False)
+    return graph
+
+
+def apply_task_moves(student_id: int, new_version: int, moves: Mapping[int, date]):
+    """
+    Carry a cached graph over to the next schedule version after tasks moved.
+
+    Registered with change_tracking.on_tasks_moved. The cached graph is only
+    reused when it is exactly one version behind; otherwise it is dropped and
+    rebuilt on next use.
+    """
+    cached = _graph_cache.get(student_id)
+    if not cached:
+        return
+    version, day, graph = cached
+    if version != new_version - 1:
+        del _graph_cache[student_id]
+        return
+    for task_id, new_date in moves.items():
+        if task_id not in graph.tasks:
+            del _graph_cache[student_id]
+            return
+        graph.move(task_id, new_date)
+    _graph_cache[student_id] = (new_version, day, graph)
+
+
+def clear_cache(student_id: Optional[int] = None):
+    if student_id is None:
+        _graph_cache.clear()
+    else:
+        _graph_cache.pop(student_id, None)
@@ -13,9 +13,11 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
-# Restart workers after this many requests, to help prevent memory leaks
-max_requests = 1000
-max_requests_jitter = 100
+# Restart workers after this many requests as a guard against memory growth.
+# Enable MEMORY_TRACKING_ENABLED and check /admin/memory to see whether
+# workers actually grow; set GUNICORN_MAX_REQUESTS=0 to stop recycling.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 50))
 
 # Logging
 accesslog = "-"  # Log to stdout
@@ -23,6 +25,12 @@ errorlog = "-"   # Log to stderr
 loglevel = "info"
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
+# Metrics: every worker writes its samples here so /metrics can report
+# totals across all workers (see metrics.py). The scheduled jobs write to the
+# same directory (see the paperpacer-*.service units); /tmp would not do, as
+# each unit has PrivateTmp=true.
+os.environ.setdefault('PAPERPACER_METRICS_DIR', os.path.join(os.getcwd(), 'instance', 'metrics'))
+
 # Process naming
 proc_name = "paperpacer"
 
@@ -48,9 +56,9 @@ preload_app = True
 # Worker timeout for graceful shutdown
 graceful_timeout = 30
 
-# Enable worker recycling
-max_requests = 1000
-max_requests_jitter = 50
+def on_starting(server):
+    from metrics import clear_multiprocess_dir
+    clear_multiprocess_dir()
 
 def when_ready(server):
     server.log.info("PaperPacer server is ready. Listening on: %s", server.address)
@@ -63,9 +71,19 @@ def pre_fork(server, worker):
 
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+    from metrics import REGISTRY
+    REGISTRY.start_flusher()
 
 def post_worker_init(worker):
     worker.log.info("Worker initialized (pid: %s)", worker.pid)
 
 def worker_abort(worker):
-    worker.log.info("Worker aborted (pid: %s)", worker.pid)
\ No newline at end of file
+    worker.log.info("Worker aborted (pid: %s)", worker.pid)
+
+def worker_exit(server, worker):
+    from passwords import shutdown_pool
+    shutdown_pool()
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+Daily Digest Emails for PaperPacer
+
+This module emails every onboarded student a short morning digest: today's
+tasks, the number of overdue tasks and the next phase deadline. It runs as a
+scheduled job (see scripts/send_daily_digest.py).
+
+Students are streamed in keyset chunks. Each chunk is summarised with a fixed
+number of grouped queries (today's tasks, overdue counts and next deadlines
+for the whole chunk), so the run costs a few queries per few hundred students
+rather than several per student. Messages go out over one reused SMTP
+connection, paced to at most ``DIGEST_RATE_LIMIT`` messages per second. In
+dry-run mode nothing is sent; each message is written to disk as an .eml file.
+
+Each chunk ends by recording the date on the students whose digest was sent
+(``Student.digest_sent_on``) and committing. A rerun for the same date, after
+a crash or a lost lock, skips them, so at most the chunk in flight is sent
+twice.
+"""
+
+import json
+import logging
+import os
+import smtplib
+import time
+from datetime import date
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import job_lock
+import metrics
+
+LOCK_NAME = 'daily_digest'
+
+# Defaults when the app config does not set DIGEST_* values
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_RATE_LIMIT = 10.0
+
+logger = logging.getLogger('paperpacer.jobs')
+
+
+class DigestTask(NamedTuple):
+    description: str
+    phase_name: Optional[str]
+
+
+class Deadline(NamedTuple):
+    name: str
+    date: date
+
+
+class Digest(NamedTuple):
+    """Everything one student's digest shows"""
+    student_id: int
+    name: str
+    email: str
+    today_tasks: List[DigestTask]
+    overdue_count: int
+    next_deadline: Optional[Deadline]
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.today_tasks or self.overdue_count or self.next_deadline)
+
+
+# --- Gathering ------------------------------------------------------------
+
+def _student_chunks(chunk_size: int):
+    """Onboarded, unarchived students in id order, ``chunk_size`` at a time (keyset paging)"""
+    from app import Student
+
+    last_id = 0
+    while True:
+        chunk = Student.query.with_entities(
+            Student.id, Student.name, Student.email, Student.is_multi_phase, Student.lit_review_deadline,
+            Student.digest_sent_on
+        ).filter(
+            Student.id > last_id,
+            Student.onboarded == True,
+            Student.archived_at.is_(None)
+        ).order_by(Student.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def _chunk_digests(students, today: date) -> List[Digest]:
+    """Build the digests of one chunk of students with grouped queries"""
+    from app import db, PhaseTask, ProjectPhase, ScheduleItem
+
+    multi_ids = [s.id for s in students if s.is_multi_phase]
+    legacy_ids = [s.id for s in students if not s.is_multi_phase]
+
+    today_tasks = {}
+    overdue = {}
+    deadlines = {}
+
+    if multi_ids:
+        for student_id, description, phase_name in db.session.query(
+            ProjectPhase.student_id, PhaseTask.task_description, ProjectPhase.phase_name
+        ).join(PhaseTask.project_phase).filter(
+            ProjectPhase.student_id.in_(multi_ids),
+            PhaseTask.date == today,
+            PhaseTask.completed == False
+        ).order_by(ProjectPhase.student_id, PhaseTask.id):
+            today_tasks.setdefault(student_id, []).append(DigestTask(description, phase_name))
+
+        overdue.update(db.session.query(
+            ProjectPhase.student_id, db.func.count(PhaseTask.id)
+        ).join(PhaseTask.project_phase).filter(
+            ProjectPhase.student_id.in_(multi_ids),
+            PhaseTask.date < today,
+            PhaseTask.completed == False
+        ).group_by(ProjectPhase.student_id).all())
+
+        # Earliest upcoming deadline per student, joined back for the phase name
+        earliest = db.session.query(
+            ProjectPhase.student_id.label('student_id'),
+            db.func.min(ProjectPhase.deadline).label('deadline')
+        ).filter(
+            ProjectPhase.student_id.in_(multi_ids),
+            ProjectPhase.is_active == True,
+            ProjectPhase.deadline >= today
+        ).group_by(ProjectPhase.student_id).subquery()
+
+        for student_id, phase_name, deadline in db.session.query(
+            ProjectPhase.student_id, ProjectPhase.phase_name, ProjectPhase.deadline
+        ).join(earliest, db.and_(
+            ProjectPhase.student_id == earliest.c.student_id,
+            ProjectPhase.deadline == earliest.c.deadline
+        )).filter(ProjectPhase.is_active == True).order_by(
+            ProjectPhase.student_id, ProjectPhase.order_index
+        ):
+            deadlines.setdefault(student_id, Deadline(phase_name, deadline))
+
+    if legacy_ids:
+        for student_id, description in db.session.query(
+            ScheduleItem.student_id, ScheduleItem.task_description
+        ).filter(
+            ScheduleItem.student_id.in_(legacy_ids),
+            ScheduleItem.date == today,
+            ScheduleItem.completed == False
+        ).order_by(ScheduleItem.student_id, ScheduleItem.id):
+            today_tasks.setdefault(student_id, []).append(DigestTask(description, None))
+
+        overdue.update(db.session.query(
+            ScheduleItem.student_id, db.func.count(ScheduleItem.id)
+        ).filter(
+            ScheduleItem.student_id.in_(legacy_ids),
+            ScheduleItem.date < today,
+            ScheduleItem.completed == False
+        ).group_by(ScheduleItem.student_id).all())
+
+        for student in students:
+            if not student.is_multi_phase and student.lit_review_deadline and student.lit_review_deadline >= today:
+                deadlines[student.id] = Deadline('Literature Review', student.lit_review_deadline)
+
+    return [
+        Digest(student.id, student.name, student.email, today_tasks.get(student.id, []),
+               overdue.get(student.id, 0), deadlines.get(student.id))
+        for student in students
+    ]
+
+
+def iter_digests(today: Optional[date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Digest]:
+    """Yield a digest for every onboarded student with something to report"""
+    today = today or date.today()
+    for students in _student_chunks(chunk_size):
+        for digest in _chunk_digests(students, today):
+            if not digest.is_empty:
+                yield digest
+
+
+# --- Rendering and sending --------------------------------------------------
+
+def build_digest_email(digest: Digest, today: date):
+    """Render one digest into a MIME message"""
+    from app import app, build_email
+
+    context = {
+        'digest': digest,
+        'today': today,
+        'dashboard_url': app.config.get('APP_BASE_URL', '').rstrip('/') + '/dashboard'
+    }
+    body_text = app.jinja_env.get_template('email/daily_digest.txt').render(context)
+    body_html = app.jinja_env.get_template('email/daily_digest.html').render(context)
+    subject = f"PaperPacer - Your plan for {today.strftime('%A, %B %d')}"
+    return build_email(digest.email, subject, body_text, body_html)
+
+
+class DigestSender:
+    """
+    Deliver messages over a single SMTP connection at a bounded rate.
+
+    With ``output_dir`` set (dry run) messages are written there as .eml
+    files instead. Use as a context manager so the connection is closed.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, output_dir: Optional[str] = None,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.output_dir = output_dir
+        self._sleep = sleep
+        self._clock = clock
+        self._next_send = None
+        self._server = None
+
+    @property
+    def dry_run(self) -> bool:
+        return self.output_dir is not None
+
+    def __enter__(self):
+        if self.dry_run:
+            os.makedirs(self.output_dir, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            self._server = None
+
+    def _wait_for_slot(self):
+        now = self._clock()
+        if self._next_send is not None and now < self._next_send:
+            self._sleep(self._next_send - now)
+            now = self._next_send
+        self._next_send = now + self.interval
+
+    def _connection(self):
+        from app import open_smtp_connection
+
+        if self._server is None:
+            self._server = open_smtp_connection()
+        return self._server
+
+    def send(self, msg, filename: str) -> str:
+        """Send (or write) one message; returns the email outcome label"""
+        if self.dry_run:
+            with open(os.path.join(self.output_dir, filename), 'wb') as handle:
+                handle.write(msg.as_bytes())
+            return 'dry_run'
+
+        self._wait_for_slot()
+        try:
+            try:
+                self._connection().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle or long-lived connection; reconnect once
+                self._server = None
+                self._connection().send_message(msg)
+            return 'sent'
+        except smtplib.SMTPRecipientsRefused as e:
+            logger.warning(f"Digest to {msg['To']} refused: {e}")
+            return 'failed'
+        except (smtplib.SMTPException, OSError) as e:
+            # Drop the connection so the next message starts a fresh one
+            logger.warning(f"Failed to send digest to {msg['To']}: {e}")
+            self.close()
+            return 'failed'
+
+
+def _mark_sent(student_ids: List[int], today: date):
+    """Record today's digest as sent and commit, so a rerun skips these students"""
+    from sqlalchemy import update
+    from app import db, Student
+
+    if student_ids:
+        db.session.execute(update(Student).where(Student.id.in_(student_ids)).values(digest_sent_on=today))
+    db.session.commit()
+
+
+def run_digest(today: Optional[date] = None, dry_run: bool = False,
+               output_dir: Optional[str] = None) -> Dict[str, any]:
+    """
+    Send today's digest to every student. Call inside an app context.
+
+    Returns a summary of the run. ``status`` is 'ok', 'disabled' when mail
+    is off and this is not a dry run, or 'skipped' when another process is
+    already sending. ``already_sent`` counts students skipped because an
+    earlier run sent their digest for this date (dry runs skip nobody).
+    """
+    from app import app
+
+    today = today or date.today()
+    chunk_size = app.config.get('DIGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    if dry_run:
+        output_dir = os.path.join(
+            output_dir or app.config.get('DIGEST_OUTPUT_DIR') or os.path.join(app.instance_path, 'digests'),
+            today.isoformat()
+        )
+    else:
+        output_dir = None
+
+    summary = {'job': LOCK_NAME, 'date': today.isoformat(), 'status': 'ok', 'dry_run': dry_run,
+               'students': 0, 'messages': 0, 'failed': 0, 'already_sent': 0, 'output_dir': output_dir}
+    if not dry_run and not app.config.get('MAIL_ENABLED', False):
+        summary['status'] = 'disabled'
+        return summary
+
+    lock_ttl = app.config.get('DIGEST_LOCK_TTL', job_lock.DEFAULT_TTL)
+    started = time.perf_counter()
+    outcome = 'failed'
+    try:
+        with job_lock.job_lock(LOCK_NAME, ttl=lock_ttl) as holder, \
+                DigestSender(app.config.get('DIGEST_RATE_LIMIT', DEFAULT_RATE_LIMIT), output_dir) as sender:
+            for students in _student_chunks(chunk_size):
+                summary['students'] += len(students)
+                if not dry_run:
+                    pending = [student for student in students if student.digest_sent_on != today]
+                    summary['already_sent'] += len(students) - len(pending)
+                    students = pending
+
+                sent = []
+                for digest in _chunk_digests(students, today):
+                    if digest.is_empty:
+                        continue
+                    result = sender.send(build_digest_email(digest, today), f"{digest.student_id}.eml")
+                    metrics.EMAILS.inc(outcome=result)
+                    summary['failed' if result == 'failed' else 'messages'] += 1
+                    if result == 'sent':
+                        sent.append(digest.student_id)
+                if not dry_run:
+                    _mark_sent(sent, today)
+
+                if not job_lock.renew(LOCK_NAME, holder, lock_ttl):
+                    raise RuntimeError("Lost the digest lock; stopping")
+        outcome = 'ok'
+    except job_lock.LockNotAcquired:
+        outcome = 'skipped'
+    finally:
+        duration = time.perf_counter() - started
+        summary['status'] = outcome
+        summary['duration_ms'] = round(duration * 1000, 2)
+        metrics.JOB_DURATION.observe(duration, job=LOCK_NAME, outcome=outcome)
+        logger.info(json.dumps({'event': 'job_run', **summary}))
+
+    return summary
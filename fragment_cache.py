@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""
+Template Fragment Cache for PaperPacer
+
+The phase tabs, progress panel and calendar data on the dashboard, and the
+phase cards and critical path on the timeline, only change when the
+student's schedule does or the day rolls over. Rendering them still costs a
+progress query per phase and a loop over every task. Wrapping such a block
+in a cache tag renders it once and serves the stored HTML afterwards::
+
+    {% cache 'phase_tabs' %} ... {% endcache %}
+
+Fragments are stored per (student, fragment name) together with the
+student's ``schedule_version`` (see change_tracking.py) and the date they
+were rendered for. A fragment is only served while both still match, so a
+change to any phase or task re-renders it on the next view. The student
+comes from the template's ``student`` variable (else ``current_user``) and
+the date from ``today`` (else ``date.today()``). Without a student the block
+is always rendered.
+
+Only cache blocks that depend on nothing else: progress logs and legacy
+``ScheduleItem`` rows do not move ``schedule_version``.
+
+The default backend is a per-worker LRU of ``FRAGMENT_CACHE_SIZE`` entries.
+Any object with the same ``get``/``set``/``clear`` methods, such as a shared
+store, can replace it in ``app.extensions['fragment_cache']``.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class LRUBackend:
+    """Bounded in-process store, least recently used entries dropped first"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache 'name' %}...{% endcache %}``, keyed by student, schedule version and date"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression(), nodes.ContextReference()]
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, context, caller):
+        backend = _backend()
+        student = context.get('student')
+        if student is None:
+            student = _current_student()
+        if backend is None or student is None or getattr(student, 'id', None) is None:
+            return caller()
+
+        # created_at tells apart a new student who was given a deleted student's id
+        stamp = (student.schedule_version or 0, context.get('today') or date.today(),
+                 getattr(student, 'created_at', None))
+        key = (student.id, name)
+        cached = backend.get(key)
+        if cached is not None and cached[0] == stamp:
+            _count('hit')
+            return Markup(cached[1])
+
+        _count('miss')
+        html = caller()
+        backend.set(key, (stamp, str(html)))
+        return html
+
+
+class LazyData:
+    """Template data computed on first lookup, so fully cached pages never build it"""
+    __slots__ = ('_load', '_data')
+
+    def __init__(self, load):
+        self._load = load
+        self._data = None
+
+    def __getitem__(self, key):
+        if self._data is None:
+            self._data = self._load()
+        return self._data[key]
+
+
+def _backend():
+    from flask import current_app, has_app_context
+
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('fragment_cache')
+
+
+def _current_student():
+    from flask import has_request_context
+    from flask_login import current_user
+
+    if has_request_context() and current_user.is_authenticated:
+        return current_user
+    return None
+
+
+def _count(outcome: str):
+    import metrics
+
+    metrics.FRAGMENT_CACHE_LOOKUPS.inc(outcome=outcome)
+
+
+def clear_cache():
+    backend = _backend()
+    if backend is not None:
+        backend.clear()
+
+
+def init_app(app):
+    """Register the cache tag and an LRU backend sized by ``FRAGMENT_CACHE_SIZE``"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    size = app.config.get('FRAGMENT_CACHE_SIZE', 1024)
+    app.extensions['fragment_cache'] = LRUBackend(size) if size > 0 else None
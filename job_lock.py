@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Background Job Locks for PaperPacer
+
+Scheduled jobs (such as the nightly overdue-task rollover) may be started by
+a timer on every application node. This module keeps a lease per job name in
+the ``job_lock`` table so only one process runs a job at a time:
+
+- A lease is taken by inserting the job's row, or by taking over a row whose
+  lease has expired (the previous holder crashed or hung).
+- Long jobs renew their lease between chunks of work; a job that fails to
+  renew has lost its lease and should stop.
+- The holder deletes the row when it finishes.
+
+Both the insert and the conditional takeover are single statements, so two
+processes racing for the same lease cannot both win.
+"""
+
+import os
+import socket
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+# Lease length when the caller does not pass one (seconds)
+DEFAULT_TTL = 900
+
+
+class LockNotAcquired(Exception):
+    """Another process holds the job's lease"""
+
+
+def holder_id() -> str:
+    """Identify this process as ``host:pid``"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire(name: str, holder: str, ttl: float = DEFAULT_TTL) -> bool:
+    """Take the lease for ``name``; return False if another holder has it"""
+    from app import db, JobLock
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+
+    taken_over = JobLock.query.filter(
+        JobLock.name == name,
+        db.or_(JobLock.expires_at < now, JobLock.holder == holder)
+    ).update({'holder': holder, 'acquired_at': now, 'expires_at': expires_at},
+             synchronize_session=False)
+    if taken_over:
+        db.session.commit()
+        return True
+
+    try:
+        db.session.add(JobLock(name=name, holder=holder, acquired_at=now, expires_at=expires_at))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def renew(name: str, holder: str, ttl: float = DEFAULT_TTL) -> bool:
+    """Extend a lease we hold; return False if it was lost"""
+    from app import db, JobLock
+
+    renewed = JobLock.query.filter_by(name=name, holder=holder).update(
+        {'expires_at': datetime.utcnow() + timedelta(seconds=ttl)},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return bool(renewed)
+
+
+def release(name: str, holder: str):
+    """Give up a lease we hold"""
+    from app import db, JobLock
+
+    JobLock.query.filter_by(name=name, holder=holder).delete(synchronize_session=False)
+    db.session.commit()
+
+
+@contextmanager
+def job_lock(name: str, ttl: float = DEFAULT_TTL, holder: str = None):
+    """
+    Hold the lease for ``name`` for the duration of the block.
+
+    Yields the holder id (needed for ``renew``). Raises LockNotAcquired when
+    another process holds the lease.
+    """
+    holder = holder or holder_id()
+    if not acquire(name, holder, ttl):
+        raise LockNotAcquired(name)
+    try:
+        yield holder
+    finally:
+        from app import db
+
+        db.session.rollback()
+        release(name, holder)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+"""
+Live Update Events for PaperPacer
+
+Students often keep the dashboard open on more than one device. This module
+tells those pages when the student's schedule or progress changes, so they
+can refresh straight away rather than waiting for a manual reload.
+
+- Writers append a ``LiveEvent`` row in the same transaction as the change.
+  ``schedule`` events come from the schedule version bumps in
+  change_tracking.py and carry the new version. ``progress`` events come from
+  progress log changes. Event ids come from an AUTOINCREMENT key. With
+  SQLite's single writer they also become visible in id order, so a reader
+  that has seen id n has seen everything before it. Nothing is written
+  unless ``LIVE_EVENTS_URL`` is set.
+- A separate event server (see scripts/serve_live_events.py) streams the
+  events to browsers as Server-Sent Events. It is a single asyncio process,
+  so thousands of open streams cost one socket each, and no gunicorn sync
+  worker is held by a connection. One loop reads new rows from the event
+  table (``id > cursor``) for every worker's writes. That one shared cursor
+  feeds every connection, so the number of polls does not grow with the
+  number of open pages.
+- Browsers connect through nginx at ``LIVE_EVENTS_URL``. The Flask session
+  cookie identifies the student. Pages are rendered with the latest event id
+  and connect with it as ``?after=``, so events written between the render
+  and the connection are replayed and earlier ones (such as the page's own
+  change) are not. After a reconnect, ``Last-Event-ID`` replays what was
+  missed. Replays reach back as far as ``LIVE_EVENTS_RETENTION``; the server
+  prunes older events.
+
+An event only says that something changed. Pages then fetch the details,
+for example from ``/api/changes`` (see change_tracking.py).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookies import CookieError, SimpleCookie
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger('paperpacer.events')
+
+SCHEDULE, PROGRESS = 'schedule', 'progress'
+
+HEARTBEAT_INTERVAL = 15.0  # seconds between keep-alive comments on idle streams
+RETRY_MS = 3000  # browser reconnect delay
+PRUNE_INTERVAL = 60.0  # seconds between deletes of expired events
+POLL_LIMIT = 1000  # events read per poll
+QUEUE_SIZE = 100  # undelivered events before a slow stream is dropped (it reconnects and replays)
+MAX_HEADER_BYTES = 8192
+
+
+def _enabled() -> bool:
+    from flask import current_app, has_app_context
+
+    return has_app_context() and bool(current_app.config.get('LIVE_EVENTS_URL'))
+
+
+def record_events(connection, events: List[Tuple[int, str, Optional[int]]]):
+    """Append ``(student_id, kind, version)`` events inside the caller's transaction"""
+    from sqlalchemy import insert
+    from app import LiveEvent
+
+    if events and _enabled():
+        now = datetime.utcnow()
+        connection.execute(insert(LiveEvent.__table__), [
+            {'student_id': student_id, 'kind': kind, 'version': version, 'created_at': now}
+            for student_id, kind, version in events
+        ])
+
+
+def _schedule_events(connection, versions: Dict[int, int]):
+    record_events(connection, [(student_id, SCHEDULE, version) for student_id, version in sorted(versions.items())])
+
+
+def install_session_hooks():
+    """Record progress events on flush; schedule events come from change_tracking"""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if getattr(install_session_hooks, 'installed', False):
+        return
+    install_session_hooks.installed = True
+
+    @event.listens_for(Session, 'after_flush')
+    def _progress_events(session, flush_context):
+        from app import ProgressLog
+
+        students = {obj.student_id for obj in list(session.new) + list(session.deleted)
+                    if isinstance(obj, ProgressLog)}
+        students.update(obj.student_id for obj in session.dirty
+                        if isinstance(obj, ProgressLog) and session.is_modified(obj))
+        if students:
+            record_events(session.connection(), [(student_id, PROGRESS, None) for student_id in sorted(students)])
+
+
+def latest_event_id() -> int:
+    from sqlalchemy import func, select
+    from app import db, LiveEvent
+
+    return db.session.execute(select(func.max(LiveEvent.id))).scalar() or 0
+
+
+def events_after(event_id: int, student_id: Optional[int] = None,
+                 limit: int = POLL_LIMIT) -> List[Tuple[int, int, str, Optional[int]]]:
+    """``(id, student_id, kind, version)`` of events after ``event_id``, oldest first"""
+    from sqlalchemy import select
+    from app import db, LiveEvent
+
+    query = select(LiveEvent.id, LiveEvent.student_id, LiveEvent.kind, LiveEvent.version).where(
+        LiveEvent.id > event_id
+    )
+    if student_id is not None:
+        query = query.where(LiveEvent.student_id == student_id)
+    return [tuple(row) for row in db.session.execute(query.order_by(LiveEvent.id).limit(limit))]
+
+
+def prune_events(retention: float) -> int:
+    from sqlalchemy import delete
+    from app import db, LiveEvent
+
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    result = db.session.execute(delete(LiveEvent).where(LiveEvent.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+def session_student_id(app, cookie_header: Optional[str]) -> Optional[int]:
+    """The logged-in student's id from a Flask session cookie, or None"""
+    from itsdangerous import BadSignature
+
+    cookie = SimpleCookie()
+    try:
+        cookie.load(cookie_header or '')
+    except CookieError:
+        return None
+    morsel = cookie.get(app.config.get('SESSION_COOKIE_NAME', 'session'))
+    serializer = app.session_interface.get_signing_serializer(app)
+    if morsel is None or serializer is None:
+        return None
+    try:
+        data = serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        return int(data['_user_id'])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def format_event(event_id: int, kind: str, version: Optional[int]) -> bytes:
+    data = json.dumps({'version': version} if version is not None else {})
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n".encode()
+
+
+class _Stream:
+    """One open connection's undelivered events"""
+    __slots__ = ('queue', 'closed')
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.closed = False
+
+
+class EventServer:
+    """Streams each student's events to their open pages over Server-Sent Events"""
+
+    def __init__(self, app, poll_interval: Optional[float] = None, retention: Optional[float] = None,
+                 heartbeat: float = HEARTBEAT_INTERVAL):
+        self.app = app
+        self.path = urlsplit(app.config.get('LIVE_EVENTS_URL') or '/events').path
+        self.poll_interval = poll_interval or app.config.get('LIVE_EVENTS_POLL_INTERVAL', 1.0)
+        self.retention = retention or app.config.get('LIVE_EVENTS_RETENTION', 600)
+        self.heartbeat = heartbeat
+        self.cursor = 0
+        self.subscribers: Dict[int, Set[_Stream]] = {}
+        # All database work happens on this one thread, off the event loop
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix='live-events-db')
+        self._server = None
+        self._poller = None
+
+    async def _query(self, func, *args):
+        def run():
+            from app import db
+
+            with self.app.app_context():
+                try:
+                    return func(*args)
+                finally:
+                    db.session.remove()
+        return await asyncio.get_running_loop().run_in_executor(self._db, run)
+
+    async def start(self, host: str, port: int):
+        self.cursor = await self._query(latest_event_id)
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._poller = asyncio.create_task(self._poll_forever())
+        logger.info(json.dumps({'event': 'live_events_started', 'port': self.port, 'cursor': self.cursor}))
+        return self._server
+
+    @property
+    def port(self) -> Optional[int]:
+        return self._server.sockets[0].getsockname()[1] if self._server else None
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._db.shutdown(wait=True)
+
+    async def serve_forever(self, host: str, port: int):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _poll_forever(self):
+        last_prune = time.monotonic()
+        while True:
+            events = []
+            try:
+                events = await self._query(events_after, self.cursor)
+                if events:
+                    self.cursor = events[-1][0]
+                    self._dispatch(events)
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL:
+                    last_prune = time.monotonic()
+                    await self._query(prune_events, self.retention)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reading live events failed")
+            # A full page means more are waiting
+            if len(events) < POLL_LIMIT:
+                await asyncio.sleep(self.poll_interval)
+
+    def _dispatch(self, events):
+        # Only the latest event of each kind matters to a page
+        latest = {}
+        for event_id, student_id, kind, version in events:
+            if student_id in self.subscribers:
+                latest[(student_id, kind)] = (event_id, kind, version)
+        for (student_id, _), event in sorted(latest.items(), key=lambda item: item[1][0]):
+            for stream in list(self.subscribers.get(student_id, ())):
+                try:
+                    stream.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    stream.closed = True
+                    self._unsubscribe(student_id, stream)
+
+    def _unsubscribe(self, student_id, stream):
+        streams = self.subscribers.get(student_id)
+        if streams is not None:
+            streams.discard(stream)
+            if not streams:
+                del self.subscribers[student_id]
+
+    async def _handle(self, reader, writer):
+        student_id = stream = None
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            if len(head) > MAX_HEADER_BYTES:
+                return await self._reply(writer, '431 Request Header Fields Too Large')
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            parts = request_line.split(' ')
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(':')
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+            if len(parts) != 3 or parts[1].split('?')[0] != self.path:
+                return await self._reply(writer, '404 Not Found')
+            if parts[0] != 'GET':
+                return await self._reply(writer, '405 Method Not Allowed')
+            student_id = session_student_id(self.app, headers.get('cookie'))
+            if student_id is None:
+                return await self._reply(writer, '401 Unauthorized')
+
+            stream = _Stream()
+            self.subscribers.setdefault(student_id, set()).add(stream)
+            writer.write(b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: text/event-stream\r\n'
+                         b'Cache-Control: no-cache\r\n'
+                         b'Connection: close\r\n'
+                         b'X-Accel-Buffering: no\r\n\r\n' +
+                         f"retry: {RETRY_MS}\n\n".encode())
+            await writer.drain()
+
+            last_event_id = headers.get('last-event-id') or parse_qs(urlsplit(parts[1]).query).get('after', [''])[0]
+            if last_event_id.isdigit():
+                for event_id, _, kind, version in await self._query(events_after, int(last_event_id), student_id):
+                    writer.write(format_event(event_id, kind, version))
+                await writer.drain()
+
+            while not stream.closed:
+                try:
+                    event = await asyncio.wait_for(stream.queue.get(), timeout=self.heartbeat)
+                    writer.write(format_event(*event))
+                except asyncio.TimeoutError:
+                    writer.write(b': keepalive\n\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if stream is not None:
+                self._unsubscribe(student_id, stream)
+            writer.close()
+
+    async def _reply(self, writer, status: str):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+
+    def connections(self) -> int:
+        return sum(len(streams) for streams in self.subscribers.values())
+
+
+def init_app(app):
+    """Record schedule and progress events for the event server and give pages its cursor"""
+    import change_tracking
+
+    install_session_hooks()
+    change_tracking.on_versions_bumped(_schedule_events)
+
+    @app.context_processor
+    def inject_live_event_cursor():
+        # Called by the page only when live events are on
+        return {'live_event_cursor': latest_event_id}
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+"""
+Worker Memory Tracking for PaperPacer
+
+This module records how much memory each gunicorn worker uses as it serves
+requests. It samples the resident set size (RSS) against the request count
+and, using tracemalloc, takes periodic allocation snapshots so the sites
+whose allocations keep growing can be identified.
+
+Reports are served per worker from the /admin/memory endpoint and a one-line
+summary is printed whenever a snapshot is taken. tracemalloc slows
+allocation-heavy code noticeably, so tracking is opt-in
+(MEMORY_TRACKING_ENABLED).
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Dict, List, Optional
+
+from admin import admin_token_required
+
+# Allocation traces from these files are noise for leak hunting
+_IGNORED_TRACE_FILES = (
+    tracemalloc.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+)
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Return the resident set size of this process in bytes, if available"""
+    try:
+        with open('/proc/self/statm') as handle:
+            resident_pages = int(handle.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is the peak, reported in KiB on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class MemoryTracker:
+    """
+    Tracks RSS per request count and allocation growth for one process.
+
+    An allocation snapshot is taken every ``snapshot_every`` requests or
+    ``snapshot_interval`` seconds, whichever comes first. The first snapshot
+    is the baseline that later ones are compared against.
+    """
+
+    def __init__(self, frames: int = 10, snapshot_every: int = 500,
+                 snapshot_interval: float = 300.0, rss_every: int = 25,
+                 history_size: int = 1000):
+        self.frames = frames
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.rss_every = rss_every
+
+        self.request_count = 0
+        self.rss_history = deque(maxlen=history_size)
+        self._baseline = None
+        self._previous = None
+        self._latest = None
+        self._last_snapshot_at = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start tracing in this process (each forked worker tracks itself)"""
+        if self._pid == os.getpid() and tracemalloc.is_tracing():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and tracemalloc.is_tracing():
+                return
+            self._pid = os.getpid()
+            self.request_count = 0
+            self.rss_history.clear()
+            self._baseline = self._previous = self._latest = None
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+
+        self.take_snapshot()
+
+    def record_request(self):
+        """Count a finished request and sample memory when due"""
+        self.request_count += 1
+
+        if self.request_count % self.rss_every == 0:
+            self._record_rss()
+
+        due_by_count = self.snapshot_every and self.request_count % self.snapshot_every == 0
+        due_by_time = (self._last_snapshot_at is not None and
+                       time.monotonic() - self._last_snapshot_at >= self.snapshot_interval)
+        if due_by_count or due_by_time:
+            self.take_snapshot()
+            print(self.summary_line())
+
+    def _record_rss(self):
+        traced_current, _ = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        self.rss_history.append({
+            'requests': self.request_count,
+            'rss_bytes': current_rss_bytes(),
+            'traced_bytes': traced_current,
+            'timestamp': time.time()
+        })
+
+    def take_snapshot(self):
+        """Take an allocation snapshot, keeping the baseline and previous one"""
+        if not tracemalloc.is_tracing():
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_TRACE_FILES]
+        )
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = snapshot
+            self._previous = self._latest
+            self._latest = snapshot
+            self._last_snapshot_at = time.monotonic()
+        self._record_rss()
+        return snapshot
+
+    @staticmethod
+    def _top_growth(newer, older, limit: int) -> List[Dict[str, any]]:
+        if newer is None or older is None:
+            return []
+
+        growth = []
+        for stat in newer.compare_to(older, 'lineno'):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            growth.append({
+                'site': f"{frame.filename}:{frame.lineno}",
+                'size_diff_bytes': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size_bytes': stat.size
+            })
+            if len(growth) >= limit:
+                break
+        return growth
+
+    def report(self, top: int = 20) -> Dict[str, any]:
+        """Build the memory report for this worker"""
+        traced_current, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+        return {
+            'pid': os.getpid(),
+            'tracing': tracemalloc.is_tracing(),
+            'requests': self.request_count,
+            'rss_bytes': current_rss_bytes(),
+            'traced_current_bytes': traced_current,
+            'traced_peak_bytes': traced_peak,
+            'rss_history': list(self.rss_history),
+            'top_growth_since_baseline': self._top_growth(self._latest, self._baseline, top),
+            'top_growth_since_previous': self._top_growth(self._latest, self._previous, top)
+        }
+
+    def summary_line(self) -> str:
+        """One-line summary for the worker log"""
+        rss = current_rss_bytes()
+        growth = self._top_growth(self._latest, self._baseline, 1)
+        top_site = f"{growth[0]['site']} +{growth[0]['size_diff_bytes']}B" if growth else 'none'
+        return (f"Memory: pid={os.getpid()} requests={self.request_count} "
+                f"rss_bytes={rss} top_growth={top_site}")
+
+
+# Process-wide tracker used by the Flask integration
+tracker = None
+
+
+def init_app(app):
+    """Register request hooks and the /admin/memory endpoints"""
+    from flask import jsonify, request
+
+    global tracker
+    tracker = MemoryTracker(
+        frames=app.config.get('MEMORY_TRACKING_FRAMES', 10),
+        snapshot_every=app.config.get('MEMORY_SNAPSHOT_EVERY', 500),
+        snapshot_interval=app.config.get('MEMORY_SNAPSHOT_INTERVAL', 300.0)
+    )
+
+    @app.before_request
+    def _memory_before_request():
+        if app.config.get('MEMORY_TRACKING_ENABLED', False):
+            tracker.ensure_started()
+
+    @app.teardown_request
+    def _memory_teardown_request(exc):
+        if app.config.get('MEMORY_TRACKING_ENABLED', False):
+            tracker.record_request()
+
+    @app.route('/admin/memory')
+    @admin_token_required
+    def memory_report():
+        """RSS history and top allocation growth for this worker"""
+        if not app.config.get('MEMORY_TRACKING_ENABLED', False):
+            return jsonify({'error': 'Memory tracking is disabled'}), 400
+        return jsonify(tracker.report(top=request.args.get('top', 20, type=int)))
+
+    @app.route('/admin/memory/snapshot', methods=['POST'])
+    @admin_token_required
+    def memory_snapshot():
+        """Take an allocation snapshot now and return the updated report"""
+        if not app.config.get('MEMORY_TRACKING_ENABLED', False):
+            return jsonify({'error': 'Memory tracking is disabled'}), 400
+        tracker.ensure_started()
+        tracker.take_snapshot()
+        return jsonify(tracker.report(top=request.args.get('top', 20, type=int)))
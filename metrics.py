@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+
+"""
+Metrics Registry for PaperPacer
+
+This module provides a small in-process metrics registry that renders the
+Prometheus text exposition format on /metrics. It covers route latency and
+status counts, database time per request, connection pool and SQLite busy
+counters, task generation durations and email outcomes.
+
+Gunicorn runs several worker processes, so each process only sees its own
+requests. When the PAPERPACER_METRICS_DIR environment variable is set, every
+process writes its samples to its own file in that directory: a daemon thread,
+started in each process after the fork, does so every ``FLUSH_INTERVAL``
+seconds (and once more at exit), so an idle worker's samples are never more
+than that old. The /metrics view merges all files, so a scrape of any worker
+reports totals for the whole server.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Environment variable naming the shared directory used by all workers
+MULTIPROC_DIR_ENV = 'PAPERPACER_METRICS_DIR'
+
+# Seconds between writes of this process's samples to the shared directory
+FLUSH_INTERVAL = 1.0
+
+# Default histogram buckets (seconds), tuned for web request latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    """Base class for a named metric with a fixed set of label names"""
+
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional['MetricsRegistry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Validate labels and return them as a tuple ordered by labelnames"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        """Drop all recorded samples"""
+        with self._lock:
+            self._values = {}
+
+    def dump(self) -> List:
+        """Return samples as JSON-serialisable [label_values, value] pairs"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """A monotonically increasing count"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down, summed across live processes"""
+
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 registry: Optional['MetricsRegistry'] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[key] = state
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def dump(self) -> List:
+        with self._lock:
+            return [[list(key), [list(state[0]), state[1], state[2]]]
+                    for key, state in self._values.items()]
+
+
+class MetricsRegistry:
+    """Holds all metrics of this process and merges samples across workers"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._flusher_pid = None
+        self._flusher_stop = threading.Event()
+
+    def register(self, metric: Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def reset(self):
+        """Drop all samples, e.g. in a freshly forked worker"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+        self._last_flush = 0.0
+
+    def dump(self) -> Dict[str, Dict]:
+        """Snapshot all samples of this process in a JSON-serialisable form"""
+        return {
+            metric.name: {'type': metric.metric_type, 'samples': metric.dump()}
+            for metric in list(self._metrics.values())
+        }
+
+    # Multi-process support
+
+    @staticmethod
+    def multiprocess_dir() -> Optional[str]:
+        return os.environ.get(MULTIPROC_DIR_ENV) or None
+
+    def flush(self, force: bool = False):
+        """Write this process's samples to the shared directory (throttled)"""
+        directory = self.multiprocess_dir()
+        if not directory:
+            return
+
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+
+        # The flush thread and a request thread may both get here
+        with self._flush_lock:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"worker_{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as handle:
+                json.dump(self.dump(), handle)
+            os.replace(tmp_path, path)
+
+    def start_flusher(self, interval: float = FLUSH_INTERVAL):
+        """
+        Flush every ``interval`` seconds from a daemon thread.
+
+        Threads do not survive a fork, so this starts one per process; calling
+        it again in the same process does nothing.
+        """
+        if not self.multiprocess_dir() or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher_stop = threading.Event()
+        threading.Thread(target=self._flush_forever, args=(interval, self._flusher_stop),
+                         name='metrics-flush', daemon=True).start()
+
+    def stop_flusher(self):
+        self._flusher_stop.set()
+        self._flusher_pid = None
+
+    def _flush_forever(self, interval: float, stop: threading.Event):
+        while not stop.wait(interval):
+            try:
+                self.flush(force=True)
+            except OSError:
+                # e.g. the directory went away; try again next interval
+                continue
+
+    def collect(self) -> Dict[str, Dict]:
+        """Return merged samples from all processes (or just this one)"""
+        directory = self.multiprocess_dir()
+        if not directory:
+            return self.dump()
+
+        self.flush(force=True)
+        merged = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as handle:
+                    _merge_samples(merged, json.load(handle))
+            except (OSError, ValueError):
+                # A worker may be replacing its file right now; skip it this scrape
+                continue
+        return merged
+
+    def render(self) -> str:
+        """Render merged samples in the Prometheus text exposition format"""
+        samples_by_name = self.collect()
+        lines = []
+
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            data = samples_by_name.get(metric.name, {'samples': []})
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+
+            for label_values, value in sorted(data['samples'], key=lambda s: s[0]):
+                labels = list(zip(metric.labelnames, label_values))
+                if metric.metric_type == 'histogram':
+                    bucket_counts, total, count = value
+                    cumulative = 0
+                    bounds = [_format_value(b) for b in metric.buckets] + ['+Inf']
+                    for bound, bucket_count in zip(bounds, bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(
+                            f"{metric.name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}"
+                        )
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def mark_process_dead(pid: int):
+    """
+    Drop gauge samples of a worker that exited.
+
+    Counters and histograms are kept so totals never go backwards when
+    gunicorn replaces a worker. Call this from gunicorn's child_exit hook.
+    """
+    directory = MetricsRegistry.multiprocess_dir()
+    if not directory:
+        return
+
+    path = os.path.join(directory, f"worker_{pid}.json")
+    try:
+        with open(path) as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return
+
+    for entry in data.values():
+        if entry.get('type') == 'gauge':
+            entry['samples'] = []
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def clear_multiprocess_dir():
+    """Remove samples left over from a previous server run"""
+    directory = MetricsRegistry.multiprocess_dir()
+    if not directory or not os.path.isdir(directory):
+        return
+
+    for filename in os.listdir(directory):
+        if filename.startswith('worker_'):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def _merge_samples(merged: Dict[str, Dict], data: Dict[str, Dict]):
+    """Add the samples of one process into the merged view"""
+    for name, entry in data.items():
+        target = merged.setdefault(name, {'type': entry['type'], 'samples': []})
+        index = {tuple(labels): i for i, (labels, _) in enumerate(target['samples'])}
+
+        for labels, value in entry['samples']:
+            key = tuple(labels)
+            if key not in index:
+                index[key] = len(target['samples'])
+                if entry['type'] == 'histogram':
+                    value = [list(value[0]), value[1], value[2]]
+                target['samples'].append([list(labels), value])
+                continue
+
+            existing = target['samples'][index[key]]
+            if entry['type'] == 'histogram':
+                existing[1][0] = [a + b for a, b in zip(existing[1][0], value[0])]
+                existing[1][1] += value[1]
+                existing[1][2] += value[2]
+            else:
+                existing[1] += value
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    rendered = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + rendered + '}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+# Global registry and the metrics PaperPacer records
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    'paperpacer_http_request_duration_seconds',
+    'Time spent handling HTTP requests, by route',
+    ('method', 'route')
+)
+HTTP_REQUESTS = Counter(
+    'paperpacer_http_requests_total',
+    'HTTP responses, by route and status code',
+    ('method', 'route', 'status')
+)
+DB_REQUEST_DURATION = Histogram(
+    'paperpacer_db_request_duration_seconds',
+    'Total time spent executing SQL per HTTP request, by route',
+    ('route',)
+)
+DB_QUERIES = Counter(
+    'paperpacer_db_queries_total',
+    'SQL statements executed while handling HTTP requests, by route',
+    ('route',)
+)
+DB_POOL_CHECKOUTS = Counter(
+    'paperpacer_db_pool_checkouts_total',
+    'Connections checked out of the SQLAlchemy pool'
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'paperpacer_db_pool_connections_in_use',
+    'Connections currently checked out of the SQLAlchemy pool'
+)
+DB_POOL_CONNECTS = Counter(
+    'paperpacer_db_pool_connects_total',
+    'New DBAPI connections opened by the SQLAlchemy pool'
+)
+SQLITE_BUSY = Counter(
+    'paperpacer_sqlite_busy_total',
+    'Statements that failed because the SQLite database was locked or busy'
+)
+TASK_GENERATION_DURATION = Histogram(
+    'paperpacer_task_generation_duration_seconds',
+    'Time spent generating tasks for a phase, by phase type',
+    ('phase_type',)
+)
+JOB_DURATION = Histogram(
+    'paperpacer_job_duration_seconds',
+    'Wall-clock duration of background job runs, by job and outcome',
+    ('job', 'outcome'),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+)
+ROLLOVER_TASKS = Counter(
+    'paperpacer_rollover_tasks_total',
+    'Overdue tasks handled by the rollover job, by outcome (moved, unplaced)',
+    ('outcome',)
+)
+ARCHIVED_STUDENTS = Counter(
+    'paperpacer_archived_students_total',
+    'Students moved to or restored from the cold archive, by outcome (archived, rehydrated)',
+    ('outcome',)
+)
+FRAGMENT_CACHE_LOOKUPS = Counter(
+    'paperpacer_fragment_cache_lookups_total',
+    'Cached template fragment lookups, by outcome (hit, miss)',
+    ('outcome',)
+)
+EMAILS = Counter(
+    'paperpacer_emails_total',
+    'Email send attempts, by outcome (sent, failed, disabled, dry_run)',
+    ('outcome',)
+)
+
+
+def _route_label() -> str:
+    """Return the URL rule of the current request (keeps label cardinality low)"""
+    from flask import request
+
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+def install_sqlalchemy_hooks():
+    """Time every SQL statement and count pool activity for all engines"""
+    from flask import g, has_request_context
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+
+    if getattr(install_sqlalchemy_hooks, 'installed', False):
+        return
+    install_sqlalchemy_hooks.installed = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context():
+            g.db_time = g.get('db_time', 0.0) + elapsed
+            g.db_queries = g.get('db_queries', 0) + 1
+
+    @event.listens_for(Engine, 'handle_error')
+    def _handle_error(context):
+        starts = context.connection.info.get('metrics_query_start') if context.connection else None
+        if starts:
+            starts.pop()
+        message = str(context.original_exception).lower()
+        if 'database is locked' in message or 'database is busy' in message:
+            SQLITE_BUSY.inc()
+
+    @event.listens_for(Pool, 'connect')
+    def _pool_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTS.inc()
+
+    @event.listens_for(Pool, 'checkout')
+    def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(Pool, 'checkin')
+    def _pool_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def init_app(app):
+    """Register request hooks and the /metrics endpoint on a Flask app"""
+    from flask import Response, g, request
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    install_sqlalchemy_hooks()
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.db_time = 0.0
+        g.db_queries = 0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.get('request_started')
+        if started is None or request.endpoint == 'metrics':
+            return response
+
+        route = _route_label()
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+        DB_REQUEST_DURATION.observe(g.get('db_time', 0.0), route=route)
+        DB_QUERIES.inc(g.get('db_queries', 0), route=route)
+
+        # No-op once this worker's flush thread runs (gunicorn starts it in post_fork)
+        REGISTRY.start_flusher()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def _reset_after_fork():
+    # With preload_app the master imports the app before forking; samples it
+    # recorded (e.g. pool checkouts during init_db) must not be counted again
+    # by every worker.
+    REGISTRY.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(lambda: REGISTRY.flush(force=True))
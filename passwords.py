@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Password Hashing for PaperPacer
+
+Password hashes are deliberately expensive, and on sync gunicorn workers a
+burst of logins (e.g. at the start of term) keeps workers busy hashing while
+other requests queue behind them. This module makes the cost tunable:
+
+- ``PASSWORD_HASH_METHOD`` selects the Werkzeug hash method and cost, e.g.
+  ``pbkdf2:sha256:600000`` (Werkzeug's default) or ``scrypt:32768:8:1``. Use
+  scripts/benchmark_password_hashing.py to see logins per second per core at
+  each setting.
+- Stored hashes record the method they were made with. After a successful
+  login, a hash made with a different method is replaced with one made with
+  the configured method, so changing the setting migrates users as they log
+  in.
+- ``PASSWORD_HASH_POOL_SIZE`` > 0 runs hashing in a small per-worker process
+  pool. Hashing is then capped at that many cores per worker, and threaded
+  workers keep serving other requests while a hash is computed.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+# Seconds to wait for the pool before giving up on a hash
+POOL_TIMEOUT = 30
+
+_pool = None
+_pool_pid = None
+
+
+def _config(name: str, default):
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def hash_method() -> str:
+    return _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD) or DEFAULT_METHOD
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method: str) -> str:
+    """
+    The prefix Werkzeug stores for ``method``, with default costs filled in
+    (``'scrypt'`` is stored as ``'scrypt:32768:8:1'``)
+    """
+    return generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+
+
+def stored_method(password_hash: Optional[str]) -> Optional[str]:
+    if not password_hash or '$' not in password_hash:
+        return None
+    return password_hash.split('$', 1)[0]
+
+
+def needs_rehash(password_hash: Optional[str], method: Optional[str] = None) -> bool:
+    """True if the stored hash was not made with the configured method and cost"""
+    return stored_method(password_hash) != method_prefix(method or hash_method())
+
+
+def _get_pool(size: int) -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+
+    # Gunicorn forks workers after loading the app; each worker needs its own pool
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=size)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(func, *args):
+    size = _config('PASSWORD_HASH_POOL_SIZE', 0)
+    if size and size > 0:
+        return _get_pool(size).submit(func, *args).result(timeout=POOL_TIMEOUT)
+    return func(*args)
+
+
+def hash_password(password: str, method: Optional[str] = None) -> str:
+    return _run(generate_password_hash, password, method or hash_method())
+
+
+def verify_password(password_hash: Optional[str], password: str) -> bool:
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def shutdown_pool():
+    """Stop this process's hashing pool, if one was started"""
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False)
+    _pool = None
+    _pool_pid = None
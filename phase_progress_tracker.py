@@ -13,6 +13,11 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 
+from activity_bitmap import get_streaks, record_activity
+from read_routing import read_only
+from schedule_snapshot import PhaseRecord, ScheduleSnapshot, refresh_snapshot
+from server_timing import timed, timed_methods
+
 # Import models inside functions to avoid circular imports
 
 
@@ -62,24 +67,34 @@ class PhaseProgressSummary:
     completion_prediction: Optional[datetime]
 
 
+@timed_methods('service')
 class PhaseProgressTracker:
     """
     Tracks progress across phases with milestone detection and celebration features.
     """
     
+    @read_only()
     def __init__(self, student_id: int):
         """Initialize tracker for a specific student"""
-        from app import db, Student, ProjectPhase, PhaseTask, ProgressLog
+        from app import Student
         
         self.student_id = student_id
         self.student = Student.query.get(student_id)
         if not self.student or not self.student.is_multi_phase:
             raise ValueError("Student not found or not using multi-phase system")
         
-        self.phases = ProjectPhase.query.filter_by(
-            student_id=student_id,
-            is_active=True
-        ).order_by(ProjectPhase.order_index).all()
+        self._snapshot = None
+    
+    @property
+    def snapshot(self) -> ScheduleSnapshot:
+        """The student's phases and tasks (see schedule_snapshot.py), reloaded after schedule changes"""
+        self._snapshot = refresh_snapshot(self._snapshot, self.student)
+        return self._snapshot
+    
+    @property
+    def phases(self) -> List[PhaseRecord]:
+        """Active phases in order"""
+        return self.snapshot.active_phases
     
     def log_phase_progress(self, phase_id: int, completed_task_ids: List[int], 
                           notes: str = "", date: datetime = None) -> Dict[str, any]:
@@ -95,23 +110,23 @@ class PhaseProgressTracker:
         Returns:
             Dictionary with progress info and any milestones achieved
         """
-        from app import db, ProjectPhase, PhaseTask, ProgressLog
+        from app import db, PhaseTask, ProgressLog, ProjectPhase
         
         if date is None:
             date = datetime.now().date()
         
         # Verify phase belongs to student
-        phase = ProjectPhase.query.get(phase_id)
-        if not phase or phase.student_id != self.student_id:
+        phase = self.snapshot.phase(phase_id)
+        if phase is None:
             raise ValueError("Phase not found or access denied")
         
         # Calculate current progress
-        total_tasks = PhaseTask.query.filter_by(phase_id=phase_id).count()
-        completed_tasks = PhaseTask.query.filter_by(phase_id=phase_id, completed=True).count()
+        total_tasks = phase.total_tasks
+        completed_tasks = phase.completed_tasks
         progress_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
         # Check for milestones
-        milestones = self._check_milestones(phase_id, progress_percentage, completed_tasks, total_tasks)
+        milestones = self._check_milestones(phase, progress_percentage, completed_tasks, total_tasks)
         
         # Create progress log entry
         progress_log = ProgressLog(
@@ -124,8 +139,20 @@ class PhaseProgressTracker:
             phase_progress_percentage=progress_percentage,
             milestone_achieved=milestones[0].milestone_type.value if milestones else None
         )
+        # Only the student's own tasks are linked to the log
+        task_ids = []
+        for task_id in completed_task_ids:
+            try:
+                task_ids.append(int(task_id))
+            except (TypeError, ValueError):
+                continue
+        owned_tasks = [row.id for row in db.session.query(PhaseTask.id).join(ProjectPhase).filter(
+            PhaseTask.id.in_(task_ids), ProjectPhase.student_id == self.student_id
+        )] if task_ids else []
+        progress_log.add_completed_tasks(owned_tasks, is_phase_task=True)
         
         db.session.add(progress_log)
+        record_activity(self.student_id, date, phase_id)
         db.session.commit()
         
         return {
@@ -144,48 +171,44 @@ class PhaseProgressTracker:
             'phase_name': phase.phase_name
         }
     
-    def get_phase_progress_summary(self, phase_id: int) -> PhaseProgressSummary:
+    @read_only()
+    def get_phase_progress_summary(self, phase_id: int, log_summary=None) -> PhaseProgressSummary:
         """
         Get comprehensive progress summary for a phase.
         
         Args:
             phase_id: ID of the phase
+            log_summary: Preloaded ``_progress_log_summary`` covering the phase
             
         Returns:
             PhaseProgressSummary object with detailed progress information
         """
-        from app import db, ProjectPhase, PhaseTask, ProgressLog
-        
-        phase = ProjectPhase.query.get(phase_id)
-        if not phase or phase.student_id != self.student_id:
+        phase = self.snapshot.phase(phase_id)
+        if phase is None:
             raise ValueError("Phase not found or access denied")
+        if log_summary is None:
+            log_summary = self._progress_log_summary([phase_id])
         
         # Get task statistics
-        total_tasks = PhaseTask.query.filter_by(phase_id=phase_id).count()
-        completed_tasks = PhaseTask.query.filter_by(phase_id=phase_id, completed=True).count()
+        total_tasks = phase.total_tasks
+        completed_tasks = phase.completed_tasks
         progress_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
-        # Get progress logs for this phase
-        progress_logs = ProgressLog.query.filter_by(
-            student_id=self.student_id,
-            phase_id=phase_id
-        ).order_by(ProgressLog.date).all()
+        # First day progress was logged for this phase
+        first_log_date, milestones = log_summary.get(phase_id, (None, []))
         
         # Calculate activity metrics
         today = datetime.now().date()
-        start_date = progress_logs[0].date if progress_logs else today
-        days_active = (today - start_date).days + 1 if progress_logs else 0
+        start_date = first_log_date or today
+        days_active = (today - start_date).days + 1 if first_log_date else 0
         days_remaining = (phase.deadline - today).days
         
-        # Calculate streaks
-        current_streak, longest_streak = self._calculate_streaks(progress_logs)
+        # Streaks come from the phase's activity bitmap
+        current_streak, longest_streak = get_streaks(self.student_id, phase_id, today)
         
         # Calculate average tasks per day
         average_tasks_per_day = completed_tasks / days_active if days_active > 0 else 0
         
-        # Get milestones achieved
-        milestones = self._get_achieved_milestones(phase_id)
-        
         # Predict completion date
         completion_prediction = self._predict_completion_date(
             phase, completed_tasks, total_tasks, average_tasks_per_day
@@ -215,6 +238,7 @@ class PhaseProgressTracker:
             completion_prediction=completion_prediction
         )
     
+    @read_only()
     def get_overall_progress_summary(self) -> Dict[str, any]:
         """
         Get overall progress summary across all phases.
@@ -228,8 +252,10 @@ class PhaseProgressTracker:
         total_milestones = 0
         phases_on_track = 0
         
+        # First log dates and milestones of every phase in two queries
+        log_summary = self._progress_log_summary([phase.id for phase in self.phases])
         for phase in self.phases:
-            summary = self.get_phase_progress_summary(phase.id)
+            summary = self.get_phase_progress_summary(phase.id, log_summary)
             phase_summaries.append(summary)
             
             total_tasks += summary.total_tasks
@@ -272,6 +298,7 @@ class PhaseProgressTracker:
             ]
         }
     
+    @read_only()
     def detect_phase_completion(self, phase_id: int) -> Optional[Dict[str, any]]:
         """
         Check if a phase has been completed and generate celebration data.
@@ -282,14 +309,12 @@ class PhaseProgressTracker:
         Returns:
             Celebration data if phase is complete, None otherwise
         """
-        from app import PhaseTask, ProjectPhase
-        
-        phase = ProjectPhase.query.get(phase_id)
-        if not phase or phase.student_id != self.student_id:
+        phase = self.snapshot.phase(phase_id)
+        if phase is None:
             return None
         
-        total_tasks = PhaseTask.query.filter_by(phase_id=phase_id).count()
-        completed_tasks = PhaseTask.query.filter_by(phase_id=phase_id, completed=True).count()
+        total_tasks = phase.total_tasks
+        completed_tasks = phase.completed_tasks
         
         if total_tasks > 0 and completed_tasks == total_tasks:
             # Phase is complete!
@@ -311,13 +336,13 @@ class PhaseProgressTracker:
         
         return None
     
-    def _check_milestones(self, phase_id: int, progress_percentage: float, 
+    def _check_milestones(self, phase, progress_percentage: float, 
                          completed_tasks: int, total_tasks: int) -> List[ProgressMilestone]:
         """Check for newly achieved milestones"""
-        from app import ProjectPhase, ProgressLog
+        from app import ProgressLog
         
         milestones = []
-        phase = ProjectPhase.query.get(phase_id)
+        phase_id = phase.id
         
         # Get previous progress to see what's new
         previous_log = ProgressLog.query.filter_by(
@@ -388,35 +413,49 @@ class PhaseProgressTracker:
         
         return current_streak, longest_streak
     
-    def _get_achieved_milestones(self, phase_id: int) -> List[ProgressMilestone]:
-        """Get all milestones achieved for a phase"""
-        from app import ProgressLog
-        
-        milestone_logs = ProgressLog.query.filter_by(
-            student_id=self.student_id,
-            phase_id=phase_id
-        ).filter(ProgressLog.milestone_achieved.isnot(None)).all()
-        
-        milestones = []
-        for log in milestone_logs:
+    def _progress_log_summary(self, phase_ids: List[int]) -> Dict[int, Tuple]:
+        """First progress log date and achieved milestones per phase, in two column queries"""
+        from app import db, ProgressLog
+        
+        summary = {phase_id: (None, []) for phase_id in phase_ids}
+        if not summary:
+            return summary
+        
+        for phase_id, first_log_date in db.session.execute(
+            db.select(ProgressLog.phase_id, db.func.min(ProgressLog.date)).where(
+                ProgressLog.student_id == self.student_id,
+                ProgressLog.phase_id.in_(phase_ids)
+            ).group_by(ProgressLog.phase_id)
+        ):
+            summary[phase_id] = (first_log_date, summary[phase_id][1])
+        
+        for phase_id, milestone_achieved, created_at, percentage, tasks_completed in db.session.execute(
+            db.select(ProgressLog.phase_id, ProgressLog.milestone_achieved, ProgressLog.created_at,
+                      ProgressLog.phase_progress_percentage, ProgressLog.completed_task_count).where(
+                ProgressLog.student_id == self.student_id,
+                ProgressLog.phase_id.in_(phase_ids),
+                ProgressLog.milestone_achieved.isnot(None)
+            ).order_by(ProgressLog.id)
+        ):
             try:
-                milestone_type = MilestoneType(log.milestone_achieved)
-                milestones.append(ProgressMilestone(
-                    milestone_type=milestone_type,
-                    phase_id=phase_id,
-                    phase_name=log.phase.phase_name,
-                    achievement_date=log.created_at,
-                    description=f"Achieved {milestone_type.value}",
-                    celebration_message="Milestone achieved!",
-                    progress_percentage=log.phase_progress_percentage,
-                    tasks_completed=0,  # Would need to calculate from JSON
-                    total_tasks=0
-                ))
+                milestone_type = MilestoneType(milestone_achieved)
             except ValueError:
                 # Skip invalid milestone types
                 continue
-        
-        return milestones
+            phase = self.snapshot.phase(phase_id)
+            summary[phase_id][1].append(ProgressMilestone(
+                milestone_type=milestone_type,
+                phase_id=phase_id,
+                phase_name=phase.phase_name if phase else "",
+                achievement_date=created_at,
+                description=f"Achieved {milestone_type.value}",
+                celebration_message="Milestone achieved!",
+                progress_percentage=percentage,
+                tasks_completed=tasks_completed,
+                total_tasks=0
+            ))
+        
+        return summary
     
     def _predict_completion_date(self, phase, completed_tasks: int, total_tasks: int, 
                                average_tasks_per_day: float) -> Optional[datetime]:
@@ -500,11 +539,11 @@ class PhaseProgressTracker:
             badges.append("Time Master ⏰")
         
         # Add streak-based badges
-        summary = self.get_phase_progress_summary(phase_id)
-        if summary.longest_streak >= 7:
+        _, longest_streak = get_streaks(self.student_id, phase_id)
+        if longest_streak >= 7:
             badges.append("Consistency Champion 🔥")
         
-        if summary.longest_streak >= 14:
+        if longest_streak >= 14:
             badges.append("Dedication Master 💎")
         
         return badges
@@ -525,6 +564,8 @@ class PhaseProgressTracker:
         return None
 
 
+@timed('service')
+@read_only()
 def create_progress_visualization_data(student_id: int) -> Dict[str, any]:
     """
     Create data structure for progress visualization in the frontend.
@@ -540,8 +581,9 @@ def create_progress_visualization_data(student_id: int) -> Dict[str, any]:
     
     # Get detailed summaries for each phase
     detailed_summaries = []
+    log_summary = tracker._progress_log_summary([phase.id for phase in tracker.phases])
     for phase in tracker.phases:
-        summary = tracker.get_phase_progress_summary(phase.id)
+        summary = tracker.get_phase_progress_summary(phase.id, log_summary)
         detailed_summaries.append({
             'phase_id': summary.phase_id,
             'phase_name': summary.phase_name,
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+"""
+Sampling Profiler for PaperPacer
+
+This module provides an opt-in, low-overhead sampling profiler that can run
+continuously in production. A background thread periodically captures the
+stack of every thread that is currently serving a request and aggregates the
+stacks per route. The aggregated profile can be dumped on demand in the
+collapsed-stack format (for flamegraph.pl / speedscope) or as a speedscope
+JSON file.
+
+The sampler measures the time it spends capturing stacks and backs off its
+sampling interval whenever that time exceeds the configured overhead budget.
+
+A single request can also be profiled in full with cProfile by sending the
+X-PaperPacer-Profile header with the configured PROFILER_TOKEN.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from admin import admin_token_required, token_matches
+
+PROFILE_REQUEST_HEADER = 'X-PaperPacer-Profile'
+PROFILE_OUTPUT_HEADER = 'X-Profile-Output'
+
+# Deepest stack recorded; deeper frames are dropped from the root side
+MAX_STACK_DEPTH = 128
+
+# Distinct stacks kept per route before new ones are folded together
+MAX_STACKS_PER_ROUTE = 5000
+TRUNCATED_STACK = '[truncated]'
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the stacks of threads that are handling requests.
+
+    The sampling interval starts at ``interval`` seconds. After every sample
+    the profiler compares the time spent sampling with the elapsed wall time;
+    if the ratio exceeds ``max_overhead`` the interval is doubled (up to
+    ``max_interval``), and it is halved again once the overhead is well
+    within budget.
+    """
+
+    def __init__(self, interval: float = 0.01, max_overhead: float = 0.01,
+                 max_interval: float = 1.0):
+        self.base_interval = interval
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_interval = max_interval
+
+        self._active_routes = {}  # thread ident -> route being served
+        self._stacks = {}  # route -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+        self._started_at = None
+        self._sampling_time = 0.0
+        self._samples = 0
+
+    # Request bookkeeping
+
+    def enter_route(self, route: str):
+        """Mark the current thread as serving ``route``"""
+        self._active_routes[threading.get_ident()] = route
+
+    def exit_route(self):
+        """Mark the current thread as idle"""
+        self._active_routes.pop(threading.get_ident(), None)
+
+    # Lifecycle
+
+    def ensure_started(self):
+        """Start the sampler thread in this process if it is not running"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+
+            # Threads do not survive fork; a worker starts its own sampler
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._started_at = time.perf_counter()
+            self._sampling_time = 0.0
+            self._samples = 0
+            self._thread = threading.Thread(
+                target=self._run, name='paperpacer-sampling-profiler', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def reset(self):
+        """Discard all aggregated stacks"""
+        with self._lock:
+            self._stacks = {}
+
+    def _run(self):
+        own_ident = threading.get_ident()
+
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            self.sample(exclude_ident=own_ident)
+            spent = time.perf_counter() - started
+
+            self._sampling_time += spent
+            self._samples += 1
+            self._adjust_interval()
+
+    def _adjust_interval(self):
+        overhead = self.overhead()
+        if overhead > self.max_overhead and self.interval < self.max_interval:
+            self.interval = min(self.max_interval, self.interval * 2)
+        elif overhead < self.max_overhead / 4 and self.interval > self.base_interval:
+            self.interval = max(self.base_interval, self.interval / 2)
+
+    # Sampling
+
+    def sample(self, exclude_ident: Optional[int] = None):
+        """Capture the stacks of all threads currently serving a route"""
+        if not self._active_routes:
+            return
+
+        frames = sys._current_frames()
+        for ident, route in list(self._active_routes.items()):
+            if ident == exclude_ident:
+                continue
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            self._record(route, collapse_stack(frame))
+
+    def _record(self, route: str, stack: str):
+        with self._lock:
+            counts = self._stacks.setdefault(route, Counter())
+            if stack not in counts and len(counts) >= MAX_STACKS_PER_ROUTE:
+                stack = TRUNCATED_STACK
+            counts[stack] += 1
+
+    # Reporting
+
+    def overhead(self) -> float:
+        """Fraction of wall time spent taking samples since the sampler started"""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._started_at
+        return self._sampling_time / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            routes = {route: sum(counts.values()) for route, counts in self._stacks.items()}
+
+        return {
+            'pid': os.getpid(),
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval_seconds': self.interval,
+            'base_interval_seconds': self.base_interval,
+            'max_overhead': self.max_overhead,
+            'measured_overhead': round(self.overhead(), 6),
+            'samples_taken': self._samples,
+            'average_sample_seconds': self._sampling_time / self._samples if self._samples else 0.0,
+            'samples_per_route': routes
+        }
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """
+        Render stacks in the collapsed format: ``route;frame;frame count``.
+
+        Args:
+            route: Only include this route (all routes when None)
+        """
+        lines = []
+        with self._lock:
+            for route_name, counts in sorted(self._stacks.items()):
+                if route is not None and route_name != route:
+                    continue
+                for stack, count in counts.most_common():
+                    lines.append(f"{route_name};{stack} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def speedscope(self, route: Optional[str] = None) -> Dict[str, any]:
+        """Render stacks as a speedscope file with one sampled profile per route"""
+        frame_index = {}
+        frames = []
+        profiles = []
+
+        with self._lock:
+            snapshot = {name: Counter(counts) for name, counts in self._stacks.items()}
+
+        for route_name, counts in sorted(snapshot.items()):
+            if route is not None and route_name != route:
+                continue
+
+            samples = []
+            weights = []
+            for stack, count in counts.most_common():
+                indices = []
+                for name in stack.split(';'):
+                    if name not in frame_index:
+                        frame_index[name] = len(frames)
+                        frames.append({'name': name})
+                    indices.append(frame_index[name])
+                samples.append(indices)
+                weights.append(count)
+
+            profiles.append({
+                'type': 'sampled',
+                'name': route_name,
+                'unit': 'none',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': profiles,
+            'name': f'PaperPacer worker {os.getpid()}',
+            'exporter': 'paperpacer-sampling-profiler'
+        }
+
+    def write_dump(self, directory: str, fmt: str = 'collapsed', route: Optional[str] = None) -> str:
+        """Write the current profile to ``directory`` and return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        if fmt == 'speedscope':
+            path = os.path.join(directory, f'profile_{os.getpid()}_{stamp}.speedscope.json')
+            with open(path, 'w') as handle:
+                json.dump(self.speedscope(route), handle)
+        else:
+            path = os.path.join(directory, f'profile_{os.getpid()}_{stamp}.collapsed')
+            with open(path, 'w') as handle:
+                handle.write(self.collapsed(route))
+
+        return path
+
+
+def collapse_stack(frame) -> str:
+    """Turn a frame into a ``outer;...;inner`` string of function labels"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+# Process-wide profiler used by the Flask integration
+profiler = None
+
+
+def init_app(app):
+    """Register sampling hooks, the deep-profile header and admin endpoints"""
+    from flask import g, jsonify, request, Response
+
+    global profiler
+    profiler = SamplingProfiler(
+        interval=app.config.get('PROFILER_INTERVAL', 0.01),
+        max_overhead=app.config.get('PROFILER_MAX_OVERHEAD', 0.01)
+    )
+
+    def output_dir():
+        return app.config.get('PROFILER_OUTPUT_DIR') or os.path.join(app.instance_path, 'profiles')
+
+    @app.before_request
+    def _profiler_before_request():
+        if app.config.get('PROFILER_ENABLED', False):
+            profiler.ensure_started()
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            profiler.enter_route(rule)
+
+        # One-off deep profile of this request
+        if token_matches(app.config.get('PROFILER_TOKEN'), request.headers.get(PROFILE_REQUEST_HEADER)):
+            g.request_profile = cProfile.Profile()
+            g.request_profile.enable()
+
+    @app.after_request
+    def _profiler_after_request(response):
+        request_profile = g.pop('request_profile', None)
+        if request_profile is not None:
+            request_profile.disable()
+            os.makedirs(output_dir(), exist_ok=True)
+            endpoint = request.endpoint or 'unmatched'
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            filename = f'request_{endpoint}_{os.getpid()}_{stamp}.prof'
+            request_profile.dump_stats(os.path.join(output_dir(), filename))
+            response.headers[PROFILE_OUTPUT_HEADER] = filename
+        return response
+
+    @app.teardown_request
+    def _profiler_teardown_request(exc):
+        profiler.exit_route()
+
+    @app.route('/admin/profiler')
+    @admin_token_required
+    def profiler_stats():
+        """Sampler status and measured overhead for this worker"""
+        return jsonify(profiler.stats())
+
+    @app.route('/admin/profiler/dump', methods=['POST'])
+    @admin_token_required
+    def profiler_dump():
+        """Write the aggregated profile of this worker to disk and return it"""
+        fmt = request.args.get('format', 'collapsed')
+        if fmt not in ('collapsed', 'speedscope'):
+            return jsonify({'error': 'format must be collapsed or speedscope'}), 400
+
+        route = request.args.get('route') or None
+        path = profiler.write_dump(output_dir(), fmt=fmt, route=route)
+
+        if request.args.get('reset') == 'true':
+            profiler.reset()
+
+        with open(path) as handle:
+            body = handle.read()
+        mimetype = 'application/json' if fmt == 'speedscope' else 'text/plain'
+        response = Response(body, mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={os.path.basename(path)}'
+        response.headers[PROFILE_OUTPUT_HEADER] = os.path.basename(path)
+        return response
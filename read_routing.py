@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Read-Only Connection Routing for PaperPacer
+
+Most requests only read: the dashboard, timeline, day views and the JSON
+APIs. This module sends their queries to a separate read-only engine, so
+they never queue behind a writer and can later move to a read replica.
+
+- With SQLite, the primary database is switched to WAL journaling. The read
+  engine then opens the same file with ``mode=ro``. Under WAL, readers see
+  the last committed state without waiting for the writer's lock.
+- Setting ``SQLALCHEMY_READ_DATABASE_URI`` points the read engine at a
+  replica instead. Without either (e.g. an in-memory database), everything
+  keeps using the primary engine.
+
+Reads are routed while ``read_only()`` is active. This is automatic for
+GET, HEAD and OPTIONS requests, and the coordinator and tracker wrap their
+read paths in it. Only SELECTs are routed. As soon as a session flushes or
+runs any other statement, the rest of its transaction stays on the primary.
+Reads after a write therefore always see that write, even inside a GET
+handler that happens to write.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# Request methods whose handlers are routed to the read engine
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_engine_lock = threading.Lock()
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the read engine while ``read_only()`` is active"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not getattr(clause, 'is_select', False):
+                # Pin the rest of this transaction to the primary
+                self.info['wrote'] = True
+            elif self.info.get('read_only') and not self.info.get('wrote'):
+                engine = read_engine(self._db)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _unpin(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+def read_url(app, primary_url):
+    """URL of the read-only engine, or None to keep reads on the primary"""
+    configured = app.config.get('SQLALCHEMY_READ_DATABASE_URI')
+    if configured:
+        return make_url(configured)
+    if primary_url.get_backend_name() != 'sqlite':
+        return None
+    database = primary_url.database
+    if not database or database == ':memory:' or database.startswith('file:'):
+        return None
+    return primary_url.set(database=f"file:{quote(database)}",
+                           query={**primary_url.query, 'mode': 'ro', 'uri': 'true'})
+
+
+def read_engine(db):
+    """This process's read-only engine for the current app (created on first use)"""
+    from flask import current_app
+
+    state = current_app.extensions['read_routing']
+    if not state['enabled']:
+        return None
+    if 'engine' not in state:
+        with _engine_lock:
+            if 'engine' not in state:
+                url = read_url(current_app, db.engine.url)
+                state['engine'] = create_engine(url) if url is not None else None
+                if state['engine'] is None:
+                    state['enabled'] = False
+    return state['engine']
+
+
+@contextmanager
+def read_only():
+    """Route the session's SELECTs to the read engine; also usable as a decorator"""
+    from app import db
+
+    info = db.session.info
+    previous = info.get('read_only', False)
+    info['read_only'] = True
+    try:
+        yield
+    finally:
+        info['read_only'] = previous
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+    except sqlite3.OperationalError:
+        # Another connection holds a lock; a later connect switches the mode
+        pass
+    finally:
+        cursor.close()
+
+
+def init_app(app, db):
+    """Put the primary SQLite database in WAL mode and route safe requests to the read engine"""
+    from flask import request
+
+    enabled = app.config.get('READ_ROUTING_ENABLED', True)
+    app.extensions['read_routing'] = {'enabled': enabled}
+    if not enabled:
+        return
+
+    with app.app_context():
+        primary = db.engine
+    if primary.url.get_backend_name() == 'sqlite' and read_url(app, primary.url) is not None \
+            and not app.config.get('SQLALCHEMY_READ_DATABASE_URI'):
+        event.listen(primary, 'connect', _enable_wal)
+
+    @app.before_request
+    def _route_reads():
+        if request.method in SAFE_METHODS and request.endpoint != 'static':
+            db.session.info['read_only'] = True
+
+    @app.teardown_request
+    def _stop_routing(exc):
+        db.session.info.pop('read_only', None)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+"""
+Overdue Task Rollover for PaperPacer
+
+Incomplete tasks left on past dates pile up in the overdue list. This module
+moves them forward onto upcoming work days as a scheduled background job (see
+scripts/rollover_overdue_tasks.py), so no page view pays for the reflow.
+
+For each student the job:
+
+1. Finds the work days from today up to the tasks' deadline (each active
+   phase's own deadline, or the student's for legacy schedules) and the spare
+   capacity of each (the intensity's day capacity minus tasks already there).
+   Phases are planned in deadline order; each sees the days the earlier ones
+   filled.
+2. Picks the shortest run of those days, at least ``window_days`` long, whose
+   spare capacity covers the overdue tasks.
+3. Splits the overdue tasks across that run with the regular weighted
+   apportionment (heavy days take twice as many), oldest tasks first.
+
+Students are processed in chunks: each chunk costs a fixed number of queries
+(deadlines, overdue task ids and existing day loads are fetched for the whole
+chunk at once), the moves are written with one bulk UPDATE per task table,
+and the chunk is committed on its own. A job lock (see job_lock.py) keeps a
+second worker or node from running the job concurrently. Tasks that cannot be
+placed (no work days or no capacity before the deadline) stay where they are.
+"""
+
+import json
+import logging
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import update
+
+import change_tracking
+import job_lock
+import metrics
+from apportionment import apportion, intensity_capacity, intensity_weight
+
+LOCK_NAME = 'overdue_rollover'
+
+# Defaults when the app config does not set ROLLOVER_* values
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_WINDOW_DAYS = 7
+
+logger = logging.getLogger('paperpacer.jobs')
+
+
+def available_days(work_days: Optional[str], start: date, end: Optional[date]) -> List[Tuple[date, str]]:
+    """(date, intensity) for each work day from ``start`` through ``end``"""
+    preferences = json.loads(work_days) if work_days else {}
+    days = []
+    if end is None:
+        return days
+    current = start
+    while current <= end:
+        intensity = preferences.get(current.strftime('%A').lower(), 'none')
+        if intensity != 'none':
+            days.append((current, intensity))
+        current += timedelta(days=1)
+    return days
+
+
+def plan_rollover(task_count: int, days: Sequence[Tuple[date, str]], existing: Dict[date, int],
+                  window_days: int = DEFAULT_WINDOW_DAYS,
+                  capacities: Dict[str, int] = None) -> List[Tuple[date, str, int]]:
+    """
+    Decide where ``task_count`` overdue tasks go.
+
+    Args:
+        task_count: Number of overdue tasks to move
+        days: Candidate (date, intensity) work days in date order
+        existing: Tasks already scheduled per date
+        window_days: Calendar days the tasks are spread over at minimum
+        capacities: Optional per-intensity day capacity overrides
+
+    Returns:
+        (date, intensity, count) for every day that receives tasks. The
+        counts sum to fewer than ``task_count`` when capacity runs out.
+    """
+    if task_count <= 0 or not days:
+        return []
+
+    window_end = days[0][0] + timedelta(days=window_days)
+    spare = []
+    total = 0
+    for day, intensity in days:
+        if day >= window_end and total >= task_count:
+            break
+        spare.append(max(0, intensity_capacity(intensity, capacities) - existing.get(day, 0)))
+        total += spare[-1]
+
+    chosen = days[:len(spare)]
+    counts = apportion(task_count, [intensity_weight(intensity) for _, intensity in chosen], spare)
+    return [(day, intensity, count) for (day, intensity), count in zip(chosen, counts) if count]
+
+
+def _student_chunks(chunk_size: int):
+    """Onboarded, unarchived students in id order, ``chunk_size`` at a time (keyset paging)"""
+    from app import Student
+
+    last_id = 0
+    while True:
+        chunk = Student.query.with_entities(
+            Student.id, Student.is_multi_phase, Student.work_days, Student.lit_review_deadline
+        ).filter(
+            Student.id > last_id,
+            Student.onboarded == True,
+            Student.archived_at.is_(None)
+        ).order_by(Student.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def _rollover_chunk(students, today: date, window_days: int,
+                    capacities: Dict[str, int] = None) -> Tuple[int, int]:
+    """Move the overdue tasks of one chunk of students; returns (moved, unplaced)"""
+    from app import db, PhaseTask, ProjectPhase, ScheduleItem
+
+    multi_ids = [s.id for s in students if s.is_multi_phase]
+    legacy_ids = [s.id for s in students if not s.is_multi_phase]
+
+    overdue = {}  # student id -> {group key: (deadline, [task ids])}, in deadline order
+    existing = {}
+
+    if multi_ids:
+        # Each phase's tasks stay within that phase's deadline
+        for student_id, phase_id, deadline, task_id in db.session.query(
+            ProjectPhase.student_id, ProjectPhase.id, ProjectPhase.deadline, PhaseTask.id
+        ).join(PhaseTask.project_phase).filter(
+            ProjectPhase.student_id.in_(multi_ids),
+            ProjectPhase.is_active == True,
+            PhaseTask.completed == False,
+            PhaseTask.date < today
+        ).order_by(ProjectPhase.student_id, ProjectPhase.deadline, ProjectPhase.id, PhaseTask.date, PhaseTask.id):
+            overdue.setdefault(student_id, {}).setdefault(phase_id, (deadline, []))[1].append(task_id)
+
+        for student_id, day, count in db.session.query(
+            ProjectPhase.student_id, PhaseTask.date, db.func.count(PhaseTask.id)
+        ).join(PhaseTask.project_phase).filter(
+            ProjectPhase.student_id.in_(multi_ids),
+            PhaseTask.date >= today
+        ).group_by(ProjectPhase.student_id, PhaseTask.date):
+            existing.setdefault(student_id, {})[day] = count
+
+    if legacy_ids:
+        deadlines = {s.id: s.lit_review_deadline for s in students if not s.is_multi_phase}
+        for student_id, task_id in db.session.query(ScheduleItem.student_id, ScheduleItem.id).filter(
+            ScheduleItem.student_id.in_(legacy_ids),
+            ScheduleItem.completed == False,
+            ScheduleItem.date < today
+        ).order_by(ScheduleItem.student_id, ScheduleItem.date, ScheduleItem.id):
+            overdue.setdefault(student_id, {}).setdefault(None, (deadlines[student_id], []))[1].append(task_id)
+
+        for student_id, day, count in db.session.query(
+            ScheduleItem.student_id, ScheduleItem.date, db.func.count(ScheduleItem.id)
+        ).filter(
+            ScheduleItem.student_id.in_(legacy_ids),
+            ScheduleItem.date >= today
+        ).group_by(ScheduleItem.student_id, ScheduleItem.date):
+            existing.setdefault(student_id, {})[day] = count
+
+    moves = {True: [], False: []}
+    changed = {}  # multi-phase student id -> moved task ids
+    moved = unplaced = 0
+    for student in students:
+        student_existing = existing.setdefault(student.id, {})
+        for deadline, task_ids in overdue.get(student.id, {}).values():
+            days = available_days(student.work_days, today, deadline)
+            plan = plan_rollover(len(task_ids), days, student_existing, window_days, capacities)
+
+            position = 0
+            for day, intensity, count in plan:
+                for task_id in task_ids[position:position + count]:
+                    moves[bool(student.is_multi_phase)].append(
+                        {'id': task_id, 'date': day, 'day_intensity': intensity}
+                    )
+                position += count
+                # Later phases see the days this one filled
+                student_existing[day] = student_existing.get(day, 0) + count
+            if position and student.is_multi_phase:
+                changed.setdefault(student.id, []).extend(task_ids[:position])
+            moved += position
+            unplaced += len(task_ids) - position
+
+    # Bulk UPDATE by primary key: one executemany per task table
+    if moves[True]:
+        db.session.execute(update(PhaseTask), moves[True])
+        change_tracking.bump_schedule_versions(changed, changed_tasks=changed)
+    if moves[False]:
+        db.session.execute(update(ScheduleItem), moves[False])
+    db.session.commit()
+
+    return moved, unplaced
+
+
+def run_rollover(today: Optional[date] = None, chunk_size: Optional[int] = None,
+                 window_days: Optional[int] = None, lock_ttl: Optional[float] = None) -> Dict[str, any]:
+    """
+    Roll every student's overdue tasks forward. Call inside an app context.
+
+    Returns a summary of the run. ``status`` is 'ok', or 'skipped' when
+    another process holds the rollover lock.
+    """
+    from app import app
+
+    today = today or date.today()
+    chunk_size = chunk_size or app.config.get('ROLLOVER_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    if window_days is None:
+        window_days = app.config.get('ROLLOVER_WINDOW_DAYS', DEFAULT_WINDOW_DAYS)
+    lock_ttl = lock_ttl or app.config.get('ROLLOVER_LOCK_TTL', job_lock.DEFAULT_TTL)
+
+    summary = {'job': LOCK_NAME, 'date': today.isoformat(), 'status': 'ok', 'chunks': 0,
+               'students': 0, 'moved': 0, 'unplaced': 0, 'max_chunk_ms': 0.0}
+    started = time.perf_counter()
+    outcome = 'failed'
+
+    try:
+        with job_lock.job_lock(LOCK_NAME, ttl=lock_ttl) as holder:
+            for students in _student_chunks(chunk_size):
+                chunk_started = time.perf_counter()
+                moved, unplaced = _rollover_chunk(students, today, window_days)
+
+                summary['chunks'] += 1
+                summary['students'] += len(students)
+                summary['moved'] += moved
+                summary['unplaced'] += unplaced
+                summary['max_chunk_ms'] = max(summary['max_chunk_ms'],
+                                              round((time.perf_counter() - chunk_started) * 1000, 2))
+
+                if not job_lock.renew(LOCK_NAME, holder, lock_ttl):
+                    raise RuntimeError("Lost the rollover lock; stopping")
+        outcome = 'ok'
+    except job_lock.LockNotAcquired:
+        summary['status'] = outcome = 'skipped'
+    finally:
+        duration = time.perf_counter() - started
+        summary['duration_ms'] = round(duration * 1000, 2)
+        if outcome == 'failed':
+            summary['status'] = 'failed'
+        metrics.JOB_DURATION.observe(duration, job=LOCK_NAME, outcome=outcome)
+        metrics.ROLLOVER_TASKS.inc(summary['moved'], outcome='moved')
+        metrics.ROLLOVER_TASKS.inc(summary['unplaced'], outcome='unplaced')
+        logger.info(json.dumps({'event': 'job_run', **summary}))
+
+    return summary
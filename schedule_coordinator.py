@@ -12,6 +12,15 @@ from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from sqlalchemy import update
+
+import change_tracking
+from dependencies import present_prerequisites, student_critical_path
+from redistribution import load_student_problem, plan_redistribution
+from read_routing import read_only
+from schedule_snapshot import PhaseRecord, ScheduleSnapshot, refresh_snapshot
+from server_timing import timed, timed_methods
+
 # Import models inside functions to avoid circular imports
 
 
@@ -53,6 +62,45 @@ class PhaseMetrics:
     buffer_days: int
 
 
+def phase_criticality(days_remaining: int, total_tasks: int, completed_tasks: int) -> CriticalityLevel:
+    """Criticality of a phase from its time left and progress"""
+    if not total_tasks:
+        return CriticalityLevel.LOW
+    
+    progress_percentage = (completed_tasks / total_tasks) * 100
+    
+    # Critical if deadline is very close
+    if days_remaining <= 3:
+        return CriticalityLevel.CRITICAL
+    elif days_remaining <= 7:
+        return CriticalityLevel.HIGH
+    
+    # Critical if far behind schedule
+    expected_progress = max(0, 100 - (days_remaining / 30 * 100))  # Rough estimate
+    if progress_percentage < expected_progress - 30:
+        return CriticalityLevel.CRITICAL
+    elif progress_percentage < expected_progress - 15:
+        return CriticalityLevel.HIGH
+    elif progress_percentage < expected_progress:
+        return CriticalityLevel.MEDIUM
+    
+    return CriticalityLevel.LOW
+
+
+def phase_buffer_days(deadline, next_deadlines: List, thesis_deadline=None) -> int:
+    """Days between a phase deadline and the next phase's (or the thesis) deadline"""
+    if next_deadlines:
+        buffer_days = (min(next_deadlines) - deadline).days
+    elif thesis_deadline:
+        # Use thesis deadline as final buffer
+        buffer_days = (thesis_deadline - deadline).days
+    else:
+        buffer_days = 0
+    
+    return max(0, buffer_days)
+
+
+@timed_methods('service')
 class ScheduleCoordinator:
     """
     Coordinates scheduling across multiple phases of a research project.
@@ -60,10 +108,11 @@ class ScheduleCoordinator:
     Provides timeline management, automatic task redistribution, and critical path analysis.
     """
     
+    @read_only()
     def __init__(self, student_id: int):
         """Initialize coordinator for a specific student"""
         from flask import current_app
-        from app import Student, ProjectPhase
+        from app import Student
         
         self.student_id = student_id
         db = current_app.extensions['sqlalchemy'].db
@@ -72,11 +121,20 @@ class ScheduleCoordinator:
         if not self.student or not self.student.is_multi_phase:
             raise ValueError("Student not found or not using multi-phase system")
         
-        self.phases = db.session.query(ProjectPhase).filter_by(
-            student_id=student_id,
-            is_active=True
-        ).order_by(ProjectPhase.order_index).all()
+        self._snapshot = None
     
+    @property
+    def snapshot(self) -> ScheduleSnapshot:
+        """The student's phases and tasks (see schedule_snapshot.py), reloaded after schedule changes"""
+        self._snapshot = refresh_snapshot(self._snapshot, self.student)
+        return self._snapshot
+    
+    @property
+    def phases(self) -> List[PhaseRecord]:
+        """Active phases in order"""
+        return self.snapshot.active_phases
+    
+    @read_only()
     def get_integrated_timeline(self) -> List[TimelineEvent]:
         """
         Generate an integrated timeline showing all phases and their key events.
@@ -119,6 +177,7 @@ class ScheduleCoordinator:
         events.sort(key=lambda x: x.date)
         return events
     
+    @read_only()
     def get_phase_metrics(self) -> List[PhaseMetrics]:
         """
         Calculate comprehensive metrics for all phases.
@@ -130,11 +189,8 @@ class ScheduleCoordinator:
         today = datetime.now().date()
         
         for phase in self.phases:
-            from app import PhaseTask
-            tasks = PhaseTask.query.filter_by(phase_id=phase.id).all()
-            
-            total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t.completed])
+            total_tasks = phase.total_tasks
+            completed_tasks = phase.completed_tasks
             remaining_tasks = total_tasks - completed_tasks
             
             progress_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
@@ -181,6 +237,9 @@ class ScheduleCoordinator:
         """
         Automatically redistribute tasks when a phase deadline changes.
         
+        All of the student's incomplete tasks are re-planned together (see
+        redistribution.py) and only the tasks whose date changes are written.
+        
         Args:
             phase_id: ID of the phase with changed deadline
             new_deadline: New deadline for the phase
@@ -194,57 +253,51 @@ class ScheduleCoordinator:
         if not phase or phase.student_id != self.student_id:
             raise ValueError("Phase not found or access denied")
         
-        old_deadline = phase.deadline
         phase.deadline = new_deadline
         
-        # Get all incomplete tasks for this phase
-        incomplete_tasks = PhaseTask.query.filter_by(
-            phase_id=phase_id,
-            completed=False
-        ).order_by(PhaseTask.date).all()
-        
-        if not incomplete_tasks:
-            db.session.commit()
-            return {
-                'success': True,
-                'message': 'Deadline updated successfully. No tasks to redistribute.',
-                'tasks_moved': 0,
-                'warnings': []
-            }
-        
-        # Calculate new distribution
+        # Re-plan every incomplete task across phases within day capacities
         today = datetime.now().date()
-        available_days = self._get_available_work_days(today, new_deadline)
+        tasks, days, edges = load_student_problem(self.student, today, {phase_id: new_deadline})
+        plan = plan_redistribution(tasks, days, edges)
         
         warnings = []
-        tasks_moved = 0
-        
-        if len(incomplete_tasks) > len(available_days):
-            warnings.append(f"Not enough work days ({len(available_days)}) for all tasks ({len(incomplete_tasks)})")
-        
-        # Redistribute tasks across available days
-        for i, task in enumerate(incomplete_tasks):
-            if i < len(available_days):
-                old_date = task.date
-                task.date = available_days[i]
-                if old_date != task.date:
-                    tasks_moved += 1
-            else:
-                # If we run out of days, stack tasks on the last available day
-                task.date = available_days[-1] if available_days else new_deadline
-                tasks_moved += 1
-                warnings.append(f"Task '{task.task_description}' scheduled on deadline day due to time constraints")
+        if plan.unplaced:
+            warnings.append(f"{len(plan.unplaced)} tasks have no work day before their phase deadline")
+        for day in plan.overbooked_days:
+            warnings.append(f"{day.strftime('%Y-%m-%d')} is over capacity; not enough work days before the deadline")
+        if plan.broken_dependencies:
+            warnings.append(f"{len(plan.broken_dependencies)} task dependencies cannot be met before the deadline")
+        
+        # Write only the tasks that move
+        if plan.moves:
+            db.session.execute(update(PhaseTask), [
+                {'id': move.task_id, 'date': move.new_date, 'day_intensity': move.intensity}
+                for move in plan.moves
+            ])
+            change_tracking.bump_schedule_versions(
+                [self.student_id], {self.student_id: [move.task_id for move in plan.moves]}
+            )
         
         # Check for conflicts with other phases
         conflicts = self._check_phase_conflicts(phase_id, new_deadline)
         warnings.extend(conflicts)
         
+        tasks_moved = len(plan.moves)
         try:
             db.session.commit()
+            if not tasks:
+                message = 'Deadline updated successfully. No tasks to redistribute.'
+            else:
+                message = f'Deadline updated and {tasks_moved} tasks redistributed.'
             return {
                 'success': True,
-                'message': f'Deadline updated and {tasks_moved} tasks redistributed.',
+                'message': message,
                 'tasks_moved': tasks_moved,
+                'moves': [
+                    {'task_id': move.task_id, 'phase_id': move.phase_id,
+                     'from': move.old_date.isoformat(), 'to': move.new_date.isoformat()}
+                    for move in plan.moves
+                ],
                 'warnings': warnings
             }
         except Exception as e:
@@ -256,38 +309,57 @@ class ScheduleCoordinator:
                 'warnings': warnings
             }
     
+    @read_only()
     def get_critical_path(self) -> List[Dict[str, any]]:
         """
         Identify the critical path through all phases.
         
+        Phase dependencies and slack come from the task dependency graph
+        (see dependencies.py), cached per schedule version.
+        
         Returns:
             List of critical path elements with timing and dependencies
         """
+        from app import PHASE_DEPENDENCY_RULES
+        
         critical_path = []
+        metrics = {m.phase_id: m for m in self.get_phase_metrics()}
+        graph = student_critical_path(self.student)
+        slack_by_phase = graph.phase_summary()
+        phases_by_type = {}
+        for phase in self.phases:
+            phases_by_type.setdefault(phase.phase_type, []).append(phase)
         
-        for i, phase in enumerate(self.phases):
-            metrics = self.get_phase_metrics()
-            phase_metric = next((m for m in metrics if m.phase_id == phase.id), None)
+        for phase in self.phases:
+            phase_metric = metrics.get(phase.id)
             
             if not phase_metric:
                 continue
             
+            slack = slack_by_phase.get(phase.id)
+            slack_days = slack['slack_days'] if slack else None
+            
             # Determine if this phase is on the critical path
             is_critical = (
                 phase_metric.criticality in [CriticalityLevel.HIGH, CriticalityLevel.CRITICAL] or
                 phase_metric.buffer_days < 7 or
-                not phase_metric.is_on_track
+                not phase_metric.is_on_track or
+                (slack_days is not None and slack_days <= 0)
             )
+            criticality_reason = self._get_criticality_reason(phase_metric)
+            if slack and slack['late_tasks']:
+                criticality_reason = f"{slack['late_tasks']} dependent tasks cannot finish before the deadline"
             
-            # Calculate dependencies
-            dependencies = []
-            if i > 0:
-                prev_phase = self.phases[i-1]
-                dependencies.append({
-                    'phase_id': prev_phase.id,
-                    'phase_name': prev_phase.phase_name,
+            # Explicit prerequisites among the student's phases
+            dependencies = [
+                {
+                    'phase_id': prerequisite.id,
+                    'phase_name': prerequisite.phase_name,
                     'relationship': 'prerequisite'
-                })
+                }
+                for phase_type in present_prerequisites(PHASE_DEPENDENCY_RULES, phase.phase_type, phases_by_type)
+                for prerequisite in phases_by_type[phase_type]
+            ]
             
             critical_path.append({
                 'phase_id': phase.id,
@@ -296,8 +368,10 @@ class ScheduleCoordinator:
                 'deadline': phase_metric.deadline.isoformat() if hasattr(phase_metric.deadline, 'isoformat') else str(phase_metric.deadline),
                 'duration_days': (phase_metric.deadline - phase_metric.start_date).days,
                 'buffer_days': phase_metric.buffer_days,
+                'slack_days': slack_days,
+                'critical_tasks': slack['critical_tasks'] if slack else [],
                 'is_critical': is_critical,
-                'criticality_reason': self._get_criticality_reason(phase_metric),
+                'criticality_reason': criticality_reason,
                 'dependencies': dependencies,
                 'progress_percentage': phase_metric.progress_percentage,
                 'tasks_remaining': phase_metric.remaining_tasks
@@ -307,69 +381,22 @@ class ScheduleCoordinator:
     
     def _calculate_phase_criticality(self, phase) -> CriticalityLevel:
         """Calculate criticality level for a phase"""
-        from flask import current_app
-        from app import PhaseTask
-        
         today = datetime.now().date()
         days_remaining = (phase.deadline - today).days
         
-        db = current_app.extensions['sqlalchemy'].db
-        tasks = db.session.query(PhaseTask).filter_by(phase_id=phase.id).all()
-        if not tasks:
-            return CriticalityLevel.LOW
-        
-        completed_tasks = len([t for t in tasks if t.completed])
-        progress_percentage = (completed_tasks / len(tasks)) * 100
-        
-        # Critical if deadline is very close
-        if days_remaining <= 3:
-            return CriticalityLevel.CRITICAL
-        elif days_remaining <= 7:
-            return CriticalityLevel.HIGH
-        
-        # Critical if far behind schedule
-        expected_progress = max(0, 100 - (days_remaining / 30 * 100))  # Rough estimate
-        if progress_percentage < expected_progress - 30:
-            return CriticalityLevel.CRITICAL
-        elif progress_percentage < expected_progress - 15:
-            return CriticalityLevel.HIGH
-        elif progress_percentage < expected_progress:
-            return CriticalityLevel.MEDIUM
-        
-        return CriticalityLevel.LOW
+        record = self.snapshot.phase(phase.id)
+        if record is None:
+            return phase_criticality(days_remaining, 0, 0)
+        return phase_criticality(days_remaining, record.total_tasks, record.completed_tasks)
     
     def _calculate_buffer_days(self, phase) -> int:
         """Calculate buffer days available for a phase"""
-        today = datetime.now().date()
-        
-        # Find the next phase deadline
-        next_phases = [p for p in self.phases if p.order_index > phase.order_index]
-        if next_phases:
-            next_deadline = min(p.deadline for p in next_phases)
-            buffer_days = (next_deadline - phase.deadline).days
-        else:
-            # Use thesis deadline as final buffer
-            if self.student.thesis_deadline:
-                buffer_days = (self.student.thesis_deadline - phase.deadline).days
-            else:
-                buffer_days = 0
-        
-        return max(0, buffer_days)
+        next_deadlines = [p.deadline for p in self.phases if p.order_index > phase.order_index]
+        return phase_buffer_days(phase.deadline, next_deadlines, self.student.thesis_deadline)
     
     def _get_task_clusters(self, phase) -> Dict[datetime, int]:
         """Get task clusters (multiple tasks on same day) for a phase"""
-        from flask import current_app
-        from app import PhaseTask
-        
-        db = current_app.extensions['sqlalchemy'].db
-        tasks = db.session.query(PhaseTask).filter_by(phase_id=phase.id).all()
-        clusters = {}
-        
-        for task in tasks:
-            if task.date in clusters:
-                clusters[task.date] += 1
-            else:
-                clusters[task.date] = 1
+        clusters = self.snapshot.tasks_per_day(phase.id)
         
         # Only return days with multiple tasks
         return {date: count for date, count in clusters.items() if count > 1}
@@ -459,6 +486,8 @@ class ScheduleCoordinator:
             return "On track"
 
 
+@timed('service')
+@read_only()
 def create_timeline_visualization_data(student_id: int) -> Dict[str, any]:
     """
     Create data structure for timeline visualization in the frontend.
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""
+Compact Schedule Snapshots for PaperPacer
+
+The coordinator and the progress tracker only need a few fields of each
+task: its phase, date, completion and status. Loading full ``PhaseTask`` ORM
+objects costs an identity-map entry, instance state and a dict per task,
+repeated for every phase they look at. ``ScheduleSnapshot`` reads one
+student's phases and tasks with a single Core query, and holds the tasks
+column-wise in ``array`` buffers:
+
+- task ids, dates (as ordinals), completion flags, and status and intensity
+  as small-int codes, a few bytes per task in total;
+- phases as ``__slots__`` records. Tasks are grouped by phase and sorted by
+  date, so a phase's tasks are the ``start:stop`` slice of every array.
+  Completed counts are tallied while loading.
+
+A snapshot is never updated. Callers keep it alongside the student's
+``schedule_version`` (see change_tracking.py) and load a new one when the
+version moves on.
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+STATUSES = ('not_started', 'in_progress', 'completed', 'deferred')
+INTENSITIES = ('none', 'light', 'heavy')
+
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+INTENSITY_CODES = {name: code for code, name in enumerate(INTENSITIES)}
+
+# Code stored for a missing or unrecognised status or intensity
+UNKNOWN = -1
+
+
+class PhaseRecord:
+    """One phase of a snapshot; its tasks are positions ``start`` to ``stop``"""
+    __slots__ = ('id', 'phase_type', 'phase_name', 'deadline', 'order_index', 'is_active', 'created_at',
+                 'start', 'stop', 'completed_tasks')
+
+    def __init__(self, id, phase_type, phase_name, deadline, order_index, is_active, created_at, start):
+        self.id = id
+        self.phase_type = phase_type
+        self.phase_name = phase_name
+        self.deadline = deadline
+        self.order_index = order_index or 0
+        self.is_active = bool(is_active)
+        self.created_at = created_at
+        self.start = start
+        self.stop = start
+        self.completed_tasks = 0
+
+    @property
+    def total_tasks(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self):
+        return f"<PhaseRecord {self.id} {self.phase_type} tasks={self.total_tasks}>"
+
+
+class ScheduleSnapshot:
+    """Column-wise, read-only copy of one student's phases and tasks"""
+    __slots__ = ('student_id', 'version', 'phases', 'active_phases', 'task_ids', 'dates', 'completed',
+                 'status', 'intensity', '_phases_by_id')
+
+    def __init__(self, student_id: int, version: Optional[int] = None):
+        self.student_id = student_id
+        self.version = version
+        self.phases: List[PhaseRecord] = []
+        self.active_phases: List[PhaseRecord] = []
+        self.task_ids = array('q')
+        self.dates = array('i')  # date.toordinal()
+        self.completed = array('b')
+        self.status = array('b')  # STATUS_CODES
+        self.intensity = array('b')  # INTENSITY_CODES
+        self._phases_by_id: Dict[int, PhaseRecord] = {}
+
+    @classmethod
+    def load(cls, student_id: int, version: Optional[int] = None) -> 'ScheduleSnapshot':
+        """Read every phase and task of a student with one query"""
+        from app import db, PhaseTask, ProjectPhase
+
+        snapshot = cls(student_id, version)
+        rows = db.session.execute(
+            select(ProjectPhase.id, ProjectPhase.phase_type, ProjectPhase.phase_name, ProjectPhase.deadline,
+                   ProjectPhase.order_index, ProjectPhase.is_active, ProjectPhase.created_at,
+                   PhaseTask.id, PhaseTask.date, PhaseTask.completed, PhaseTask.status, PhaseTask.day_intensity)
+            .select_from(ProjectPhase)
+            .outerjoin(PhaseTask, PhaseTask.phase_id == ProjectPhase.id)
+            .where(ProjectPhase.student_id == student_id)
+            .order_by(ProjectPhase.order_index, ProjectPhase.id, PhaseTask.date, PhaseTask.id)
+        )
+
+        phase = None
+        task_ids, dates, completed = snapshot.task_ids, snapshot.dates, snapshot.completed
+        status, intensity = snapshot.status, snapshot.intensity
+        for (phase_id, phase_type, phase_name, deadline, order_index, is_active, created_at,
+             task_id, task_date, is_completed, task_status, task_intensity) in rows:
+            if phase is None or phase.id != phase_id:
+                phase = PhaseRecord(phase_id, phase_type, phase_name, deadline, order_index, is_active,
+                                    created_at, len(task_ids))
+                snapshot.phases.append(phase)
+                snapshot._phases_by_id[phase_id] = phase
+            if task_id is None:
+                continue
+            task_ids.append(task_id)
+            dates.append(task_date.toordinal())
+            completed.append(1 if is_completed else 0)
+            status.append(STATUS_CODES.get(task_status, UNKNOWN))
+            intensity.append(INTENSITY_CODES.get(task_intensity, UNKNOWN))
+            phase.stop += 1
+            if is_completed:
+                phase.completed_tasks += 1
+
+        snapshot.active_phases = [p for p in snapshot.phases if p.is_active]
+        return snapshot
+
+    def phase(self, phase_id: int) -> Optional[PhaseRecord]:
+        """The student's phase with this id, or None"""
+        return self._phases_by_id.get(phase_id)
+
+    def tasks_per_day(self, phase_id: int) -> Dict[date, int]:
+        """Number of tasks on each date of a phase, in date order"""
+        phase = self._phases_by_id.get(phase_id)
+        counts = {}
+        if phase is None:
+            return counts
+        dates = self.dates
+        position = phase.start
+        while position < phase.stop:
+            ordinal = dates[position]
+            run_end = position + 1
+            while run_end < phase.stop and dates[run_end] == ordinal:
+                run_end += 1
+            counts[date.fromordinal(ordinal)] = run_end - position
+            position = run_end
+        return counts
+
+    def nbytes(self) -> int:
+        """Bytes held by the task arrays"""
+        return sum(column.itemsize * len(column)
+                   for column in (self.task_ids, self.dates, self.completed, self.status, self.intensity))
+
+
+def refresh_snapshot(snapshot: Optional[ScheduleSnapshot], student) -> ScheduleSnapshot:
+    """``snapshot`` if it is still current for the student, else a freshly loaded one"""
+    from app import db
+
+    # Pending task changes count, as they would for a query's autoflush
+    db.session.flush()
+    version = student.schedule_version
+    if snapshot is None or snapshot.version != version:
+        snapshot = ScheduleSnapshot.load(student.id, version)
+    return snapshot
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Move inactive students' phases, tasks and progress logs into the cold archive
+Meant to run weekly from a timer (see deployment/paperpacer-archive.timer);
+students are restored automatically when they log in again
+
+Usage: Run from the project root directory:
+    python scripts/archive_inactive_students.py [YYYY-MM-DD]
+"""
+
+import sys
+import os
+import logging
+from datetime import datetime
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+import metrics
+from cold_archive import run_archive
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    today = datetime.strptime(sys.argv[1], '%Y-%m-%d').date() if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        summary = run_archive(today)
+
+    # Hand this run's samples to /metrics when workers share a metrics directory
+    metrics.REGISTRY.flush(force=True)
+
+    if summary['status'] == 'skipped':
+        print("Archive already running elsewhere; skipped")
+    else:
+        print(f"✓ Archived {summary['rows']} rows for {summary['students']} students inactive since "
+              f"{summary['cutoff']} ({summary['raw_bytes']} bytes stored as {summary['stored_bytes']}) "
+              f"in {summary['duration_ms']} ms")
+    return 0 if summary['status'] != 'failed' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Backfill activity bitmaps from existing progress logs
+Rebuilds the per-student, per-year bitmaps used for streaks and heatmaps
+
+Usage: Run from the project root directory:
+    python scripts/backfill_activity_bitmaps.py [student_id]
+"""
+
+import sys
+import os
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from activity_bitmap import backfill_from_progress_logs
+
+
+def main():
+    student_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        db.create_all()
+        scope = f"student {student_id}" if student_id is not None else "all students"
+        print(f"Backfilling activity bitmaps for {scope}...")
+        rows = backfill_from_progress_logs(student_id)
+        print(f"✓ Wrote {rows} activity bitmap rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark password hashing settings
+Reports milliseconds per login check and logins per second per core for each
+PASSWORD_HASH_METHOD candidate, to choose a cost the servers can sustain
+
+Usage: Run from the project root directory:
+    python scripts/benchmark_password_hashing.py [method ...] [--rounds N]
+"""
+
+import sys
+import os
+import argparse
+import time
+# Add parent directory to path so we can import passwords
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import DEFAULT_METHOD, method_prefix
+from werkzeug.security import check_password_hash, generate_password_hash
+
+CANDIDATES = [
+    DEFAULT_METHOD,
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:100000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+]
+
+
+def benchmark(method, rounds):
+    """Seconds per check_password_hash call (a login) on one core"""
+    stored = generate_password_hash('correct horse battery staple', method)
+    check_password_hash(stored, 'warm-up')
+    started = time.perf_counter()
+    for _ in range(rounds):
+        check_password_hash(stored, 'correct horse battery staple')
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing settings")
+    parser.add_argument('methods', nargs='*', help=f"methods to compare (default: {', '.join(CANDIDATES)})")
+    parser.add_argument('--rounds', type=int, default=20, help="logins timed per method")
+    args = parser.parse_args()
+
+    print(f"{'Method':<26} {'ms/login':>10} {'logins/s/core':>15}")
+    for method in args.methods or CANDIDATES:
+        seconds = benchmark(method, args.rounds)
+        print(f"{method_prefix(method):<26} {seconds * 1000:>10.1f} {1 / seconds:>15.1f}")
+    print(f"\n{os.cpu_count()} cores: multiply logins/s/core by the cores serving requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Migration script to normalize completed-task lists of progress logs
+Copies the JSON tasks_completed/phase_tasks_completed ids into the
+progress_log_task table. Safe to run more than once.
+
+Usage: Run from the project root directory:
+    python scripts/migrate_progress_log_tasks.py [student_id]
+"""
+
+import sys
+import os
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, MigrationService
+
+
+def main():
+    student_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        db.create_all()
+        print("Migrating progress log task lists...")
+        result = MigrationService.migrate_progress_log_tasks(student_id)
+        print(f"✓ Linked {result['migrated_links']} completed tasks "
+              f"from {result['migrated_logs']} progress logs")
+
+
+if __name__ == '__main__':
+    main()
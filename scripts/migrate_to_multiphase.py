@@ -1,84 +1,56 @@
 #!/usr/bin/env python3
 """
 Migration script to add multi-phase support to existing PaperPacer database
-This script safely migrates existing users to the new multi-phase system
+This script safely migrates existing users to the new multi-phase system.
+Students are migrated in chunks with set-based SQL (see bulk_migration.py);
+an interrupted run picks up after the last committed chunk
 
 Usage: Run from the project root directory:
-    python scripts/migrate_to_multiphase.py
+    python scripts/migrate_to_multiphase.py [--dry-run] [--chunk-size N] [--restart]
 """
 
 import sys
 import os
+import argparse
+import logging
 # Add parent directory to path so we can import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db, Student, ScheduleItem, ProjectPhase, PhaseTask, PhaseType
-from datetime import datetime
-import json
+from app import app, Student, ScheduleItem, ProjectPhase, PhaseTask
+from bulk_migration import run_bulk_migration
+import metrics
 
-def migrate_existing_students():
+def report_progress(summary):
+    """Print running totals and throughput after each chunk"""
+    verb = "Would migrate" if summary['dry_run'] else "Migrated"
+    print(f"  {verb} {summary['students']} students / {summary['tasks']} tasks "
+          f"({summary['students_per_second']} students/s, {summary['tasks_per_second']} tasks/s)")
+
+def migrate_existing_students(chunk_size=None, dry_run=False, restart=False):
     """Migrate existing students to multi-phase system"""
-    print("Starting migration to multi-phase system...")
+    print("Starting migration to multi-phase system..." if not dry_run else "Migration dry run (no changes)...")
     
     with app.app_context():
-        # Get all existing students who haven't been migrated yet
-        students_to_migrate = Student.query.filter_by(is_multi_phase=False).all()
-        
-        print(f"Found {len(students_to_migrate)} students to migrate")
-        
-        for student in students_to_migrate:
-            try:
-                migrate_student_to_multiphase(student)
-                print(f"✓ Migrated student: {student.name} ({student.email})")
-            except Exception as e:
-                print(f"✗ Failed to migrate student {student.name}: {str(e)}")
-                # Continue with other students rather than failing completely
-                continue
-        
-        db.session.commit()
-        print("Migration completed successfully!")
-
-def migrate_student_to_multiphase(student):
-    """Migrate a single student to multi-phase system"""
-    
-    # Only migrate if student has been onboarded and has a lit review deadline
-    if not student.onboarded or not student.lit_review_deadline:
-        print(f"Skipping {student.name} - not fully onboarded")
-        return
+        summary = run_bulk_migration(chunk_size=chunk_size, dry_run=dry_run, restart=restart,
+                                     progress=report_progress)
     
-    # Create Literature Review phase using existing deadline
-    lit_review_phase = ProjectPhase(
-        student_id=student.id,
-        phase_type=PhaseType.LITERATURE_REVIEW.value,
-        phase_name="Literature Review",
-        deadline=student.lit_review_deadline,
-        is_active=True,
-        order_index=1,
-        created_at=datetime.utcnow()
-    )
+    # Hand this run's samples to /metrics when workers share a metrics directory
+    metrics.REGISTRY.flush(force=True)
     
-    db.session.add(lit_review_phase)
-    db.session.flush()  # Get the phase ID
-    
-    # Migrate existing ScheduleItem tasks to PhaseTask
-    existing_tasks = ScheduleItem.query.filter_by(student_id=student.id).all()
-    
-    for task in existing_tasks:
-        phase_task = PhaseTask(
-            phase_id=lit_review_phase.id,
-            date=task.date,
-            task_description=task.task_description,
-            task_type='reading',  # Default to reading for literature review
-            day_intensity=task.day_intensity,
-            completed=task.completed,
-            created_at=task.created_at
-        )
-        db.session.add(phase_task)
-    
-    # Mark student as migrated
-    student.is_multi_phase = True
-    
-    print(f"  - Created Literature Review phase with {len(existing_tasks)} tasks")
+    if summary['status'] == 'skipped':
+        print("Migration already running elsewhere; skipped")
+        return summary
+    if summary['resumed_from']:
+        print(f"Resumed after student id {summary['resumed_from']}")
+    if dry_run:
+        print(f"Would migrate {summary['students']} students and {summary['tasks']} tasks "
+              f"({summary['completed_tasks']} completed)")
+        for task_type, count in sorted(summary['task_types'].items()):
+            print(f"  - {task_type}: {count}")
+    else:
+        print(f"Migration completed successfully! {summary['students']} students and {summary['tasks']} tasks "
+              f"in {summary['duration_ms']} ms")
+    return summary
 
 def create_backup():
     """Create a backup of the current database before migration"""
@@ -117,17 +89,29 @@ def verify_migration():
         print(f"Original schedule items: {total_schedule_items}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migrate legacy students to the multi-phase system")
+    parser.add_argument('--dry-run', action='store_true', help="report what would be migrated without writing")
+    parser.add_argument('--chunk-size', type=int, help="students per chunk (default: MIGRATION_CHUNK_SIZE)")
+    parser.add_argument('--restart', action='store_true', help="ignore the saved checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     print("PaperPacer Multi-Phase Migration Tool")
     print("=====================================")
     
+    if args.dry_run:
+        migrate_existing_students(args.chunk_size, dry_run=True, restart=args.restart)
+        sys.exit(0)
+    
     # Create backup first
     create_backup()
     
     # Run migration
-    migrate_existing_students()
+    summary = migrate_existing_students(args.chunk_size, restart=args.restart)
     
     # Verify results
     verify_migration()
     
     print("\nMigration complete! Existing users will now have Literature Review phase.")
-    print("They can add additional phases through the settings page.")
\ No newline at end of file
+    print("They can add additional phases through the settings page.")
+    sys.exit(0 if summary['status'] != 'failed' else 1)
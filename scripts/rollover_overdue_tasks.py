@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Roll overdue incomplete tasks forward onto upcoming work days
+Meant to run nightly from a timer (see deployment/paperpacer-rollover.timer);
+only one process runs the rollover at a time
+
+Usage: Run from the project root directory:
+    python scripts/rollover_overdue_tasks.py [YYYY-MM-DD]
+"""
+
+import sys
+import os
+import logging
+from datetime import datetime
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+import metrics
+from rollover import run_rollover
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    today = datetime.strptime(sys.argv[1], '%Y-%m-%d').date() if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        summary = run_rollover(today)
+
+    # Hand this run's samples to /metrics when workers share a metrics directory
+    metrics.REGISTRY.flush(force=True)
+
+    if summary['status'] == 'skipped':
+        print("Rollover already running elsewhere; skipped")
+    else:
+        print(f"✓ Moved {summary['moved']} overdue tasks for {summary['students']} students "
+              f"in {summary['duration_ms']} ms ({summary['unplaced']} could not be placed)")
+    return 0 if summary['status'] != 'failed' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Send the daily digest email to every onboarded student
+Meant to run each morning from a timer (see deployment/paperpacer-digest.timer);
+with --dry-run, messages are written to disk as .eml files instead of sent
+
+Usage: Run from the project root directory:
+    python scripts/send_daily_digest.py [--dry-run] [--output DIR] [--date YYYY-MM-DD]
+"""
+
+import sys
+import os
+import argparse
+import logging
+from datetime import datetime
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+import metrics
+from digest import run_digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the PaperPacer daily digest")
+    parser.add_argument('--dry-run', action='store_true', help="write .eml files instead of sending")
+    parser.add_argument('--output', help="directory for dry-run messages (default: instance/digests)")
+    parser.add_argument('--date', help="digest date as YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    today = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+
+    with app.app_context():
+        summary = run_digest(today, dry_run=args.dry_run, output_dir=args.output)
+
+    # Hand this run's samples to /metrics when workers share a metrics directory
+    metrics.REGISTRY.flush(force=True)
+
+    if summary['status'] == 'disabled':
+        print("Email sending disabled (MAIL_ENABLED=false); use --dry-run to preview digests")
+    elif summary['status'] == 'skipped':
+        print("Digest already running elsewhere; skipped")
+    elif summary['dry_run']:
+        print(f"✓ Wrote {summary['messages']} digests to {summary['output_dir']} in {summary['duration_ms']} ms")
+    else:
+        print(f"✓ Sent {summary['messages']} digests ({summary['failed']} failed, "
+              f"{summary['already_sent']} already sent today) in {summary['duration_ms']} ms")
+    return 1 if summary['status'] == 'failed' else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
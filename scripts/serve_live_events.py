@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Stream schedule and progress change events to open pages (Server-Sent Events)
+Runs as its own long-lived service next to gunicorn (see
+deployment/paperpacer-events.service); nginx routes LIVE_EVENTS_URL here
+
+Usage: Run from the project root directory:
+    python scripts/serve_live_events.py [PORT]
+"""
+
+import sys
+import os
+import asyncio
+import logging
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from live_events import EventServer
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    host = app.config['LIVE_EVENTS_HOST']
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else app.config['LIVE_EVENTS_PORT']
+
+    if not app.config.get('LIVE_EVENTS_URL'):
+        print("⚠️  LIVE_EVENTS_URL is not set, so the app records no events to stream")
+
+    print(f"✓ Serving live events on {host}:{port}")
+    try:
+        asyncio.run(EventServer(app).serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""
+Server-Timing Instrumentation for PaperPacer
+
+This module breaks the time of each request down into SQL, service code
+(ScheduleCoordinator, PhaseManager and friends) and Jinja rendering. The
+breakdown is sent to the browser in a Server-Timing header, so it shows up
+in the dev tools network panel, and written as one JSON log line per request
+to the ``paperpacer.timing`` logger.
+
+Segments are inclusive and may overlap: service time includes the SQL it
+issues, and render time includes helpers that templates call.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger('paperpacer.timing')
+
+SEGMENT_DESCRIPTIONS = {
+    'db': 'SQL',
+    'service': 'Service code',
+    'render': 'Template rendering',
+    'total': 'Total'
+}
+
+
+@contextmanager
+def segment(name: str):
+    """
+    Time the wrapped block as part of segment ``name`` for this request.
+
+    Nested blocks of the same segment are only counted once, so a service
+    method calling another service method does not double its time.
+    """
+    from flask import g, has_request_context
+
+    if not has_request_context():
+        yield
+        return
+
+    depths = g.setdefault('timing_depths', {})
+    depth = depths.get(name, 0)
+    depths[name] = depth + 1
+    start = time.perf_counter() if depth == 0 else None
+    try:
+        yield
+    finally:
+        depths[name] -= 1
+        if start is not None:
+            _add(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator form of :func:`segment`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with segment(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_methods(name: str):
+    """
+    Class decorator that times every public method (and __init__) as segment
+    ``name``. Static and class methods keep their descriptor type.
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_') and attr != '__init__':
+                continue
+            if isinstance(value, staticmethod):
+                setattr(cls, attr, staticmethod(timed(name)(value.__func__)))
+            elif isinstance(value, classmethod):
+                setattr(cls, attr, classmethod(timed(name)(value.__func__)))
+            elif callable(value):
+                setattr(cls, attr, timed(name)(value))
+        return cls
+    return decorator
+
+
+def _add(name: str, seconds: float):
+    from flask import g
+
+    segments = g.setdefault('timing_segments', {})
+    segments[name] = segments.get(name, 0.0) + seconds
+
+
+def collect() -> dict:
+    """Return the segment durations (seconds) recorded for this request"""
+    from flask import g
+
+    segments = dict(g.get('timing_segments', {}))
+    segments['db'] = g.get('db_time', 0.0)
+    started = g.get('timing_started')
+    if started is not None:
+        segments['total'] = time.perf_counter() - started
+    return segments
+
+
+def format_header(segments: dict, db_queries: int = 0) -> str:
+    """Render segments as a Server-Timing header value (durations in ms)"""
+    parts = []
+    for name in ('db', 'service', 'render', 'total'):
+        if name not in segments:
+            continue
+        description = SEGMENT_DESCRIPTIONS[name]
+        if name == 'db':
+            description = f"{description} ({db_queries} queries)"
+        parts.append(f'{name};dur={segments[name] * 1000:.1f};desc="{description}"')
+    return ', '.join(parts)
+
+
+def init_app(app):
+    """Register request hooks and template render timing on a Flask app"""
+    from flask import before_render_template, g, request, template_rendered
+
+    import metrics
+
+    # SQL time per request is collected by the metrics SQLAlchemy hooks
+    metrics.install_sqlalchemy_hooks()
+
+    if app.config.get('SERVER_TIMING_LOG', True) and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    @app.before_request
+    def _start_timing():
+        g.timing_started = time.perf_counter()
+
+    def _template_starting(sender, template, context, **extra):
+        g.setdefault('render_starts', []).append(time.perf_counter())
+
+    def _template_finished(sender, template, context, **extra):
+        starts = g.get('render_starts')
+        if starts:
+            _add('render', time.perf_counter() - starts.pop())
+
+    # Receivers are local functions, so blinker must hold strong references
+    before_render_template.connect(_template_starting, app, weak=False)
+    template_rendered.connect(_template_finished, app, weak=False)
+
+    @app.after_request
+    def _emit_timing(response):
+        if g.get('timing_started') is None or request.endpoint == 'metrics':
+            return response
+
+        segments = collect()
+        db_queries = g.get('db_queries', 0)
+
+        if app.config.get('SERVER_TIMING_ENABLED', True):
+            response.headers['Server-Timing'] = format_header(segments, db_queries)
+
+        if app.config.get('SERVER_TIMING_LOG', True):
+            logger.info(json.dumps({
+                'event': 'request_timing',
+                'method': request.method,
+                'route': request.url_rule.rule if request.url_rule is not None else 'unmatched',
+                'status': response.status_code,
+                'total_ms': round(segments.get('total', 0.0) * 1000, 2),
+                'db_ms': round(segments.get('db', 0.0) * 1000, 2),
+                'db_queries': db_queries,
+                'service_ms': round(segments.get('service', 0.0) * 1000, 2),
+                'render_ms': round(segments.get('render', 0.0) * 1000, 2)
+            }))
+
+        return response
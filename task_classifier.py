@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Task Classifier for PaperPacer
+
+This module assigns a task type and a keyword-based priority to task
+descriptions. Each keyword table is compiled once into a single regex, so a
+description is scanned in one pass rather than once per keyword. Results are
+memoized per distinct description, since generated and migrated tasks reuse
+the same few dozen template strings.
+
+Rules are checked in the order they are listed: when a description contains
+keywords from several rules, the earliest rule wins.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# (task type, keywords), in precedence order
+TASK_TYPE_RULES = [
+    # Documentation/compliance tasks (check first for specificity)
+    ('documentation', ['irb', 'consent', 'compliance', 'ethics', 'submit']),
+    # Meeting/consultation tasks (check before writing to avoid conflicts)
+    ('consultation', ['meet', 'discuss', 'adviser', 'advisor', 'feedback']),
+    ('writing', ['draft', 'write', 'document methodology', 'outline']),
+    ('reading', ['read', 'skim', 'article', 'source', 'literature']),
+    ('research', ['research', 'identify', 'collect', 'find', 'search']),
+    ('analysis', ['analyze', 'synthesis', 'organize', 'compare', 'evaluate']),
+    ('design', ['design', 'plan', 'create', 'develop', 'method']),
+]
+
+DEFAULT_TASK_TYPE = 'general'
+
+# (priority, keywords), in precedence order
+PRIORITY_RULES = [
+    ('high', ['deadline', 'urgent', 'critical', 'important', 'due', 'submit',
+              'approval', 'irb', 'ethics', 'committee', 'proposal', 'defense']),
+    ('low', ['optional', 'extra', 'additional', 'supplementary', 'bonus',
+             'explore', 'consider', 'maybe', 'if time']),
+]
+
+
+class KeywordMatcher:
+    """
+    Single-pass substring matcher over an ordered list of keyword rules.
+
+    The pattern is a lookahead at every position, ``(?=(kw1|kw2|...))``, so
+    overlapping keywords are all found. Alternatives are listed in rule
+    order, which means that where several keywords start at the same
+    position the highest-precedence one is reported.
+    """
+
+    def __init__(self, rules: List[Tuple[str, List[str]]]):
+        self.labels = []
+        self._rank = {}
+        alternatives = []
+        for rank, (label, keywords) in enumerate(rules):
+            self.labels.append(label)
+            for keyword in keywords:
+                # A keyword listed under two rules belongs to the earlier one
+                if keyword not in self._rank:
+                    self._rank[keyword] = rank
+                    alternatives.append(re.escape(keyword))
+        self._pattern = re.compile('(?=(' + '|'.join(alternatives) + '))')
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the label of the highest-precedence rule found in ``text``"""
+        best = None
+        for found in self._pattern.finditer(text):
+            rank = self._rank[found.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return self.labels[best] if best is not None else None
+
+
+_task_type_matcher = KeywordMatcher(TASK_TYPE_RULES)
+_priority_matcher = KeywordMatcher(PRIORITY_RULES)
+
+
+@lru_cache(maxsize=4096)
+def classify_task_type(description: str) -> str:
+    """Return the task type for a task description"""
+    return _task_type_matcher.match(description.lower()) or DEFAULT_TASK_TYPE
+
+
+@lru_cache(maxsize=4096)
+def keyword_priority(description: str) -> Optional[str]:
+    """Return 'high' or 'low' if the description has a priority keyword, else None"""
+    return _priority_matcher.match(description.lower())
+
+
+def task_priority(description: str, task_index: int, total_tasks: int) -> str:
+    """Keyword priority if any, otherwise priority from position in the timeline"""
+    priority = keyword_priority(description)
+    if priority:
+        return priority
+
+    # First 20% of tasks are high priority (foundational work)
+    # Last 20% of tasks are high priority (final deliverables)
+    # Middle 60% are medium priority
+    position_ratio = task_index / max(1, total_tasks - 1)
+
+    if position_ratio <= 0.2 or position_ratio >= 0.8:
+        return 'high'
+
+    return 'medium'
+
+
+# Tasks containing these keywords count double when weighing workload
+HEAVY_TASK_KEYWORDS = ['draft', 'write', 'create', 'complete']
+
+_heavy_task_matcher = KeywordMatcher([('heavy', HEAVY_TASK_KEYWORDS)])
+
+
+@lru_cache(maxsize=4096)
+def task_weight(description: str) -> int:
+    """Return 2 for drafting/writing/creating tasks, 1 otherwise"""
+    return 2 if _heavy_task_matcher.match(description.lower()) else 1
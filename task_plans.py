@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+"""
+Precompiled Task Plans for PaperPacer
+
+The phase task templates and the legacy 12-week task table never change at
+runtime, so each is compiled once at import into an immutable plan: a tuple of
+PlanTask entries holding an interned description id, the task type, the
+priority and the workload weight. Schedule generators then only have to
+assign dates.
+
+PLAN_VERSION hashes the template text together with the classification rules.
+Generated tasks store it, so it is possible to tell which plan produced a
+stored task after the templates or rules change.
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Sequence, Tuple
+
+from task_classifier import (
+    HEAVY_TASK_KEYWORDS, PRIORITY_RULES, TASK_TYPE_RULES,
+    classify_task_type, task_priority, task_weight
+)
+
+# Interned description text; a description id is an index into this list
+_descriptions: List[str] = []
+_description_ids: Dict[str, int] = {}
+
+
+def intern_description(text: str) -> int:
+    """Return the id for a description, adding it to the table if new"""
+    description_id = _description_ids.get(text)
+    if description_id is None:
+        description_id = len(_descriptions)
+        _descriptions.append(text)
+        _description_ids[text] = description_id
+    return description_id
+
+
+def description_text(description_id: int) -> str:
+    return _descriptions[description_id]
+
+
+class PlanTask(NamedTuple):
+    description_id: int
+    task_type: str
+    priority: str
+    weight: int
+
+    @property
+    def description(self) -> str:
+        return _descriptions[self.description_id]
+
+
+TaskPlan = Tuple[PlanTask, ...]
+
+
+def compile_task_list(descriptions: Sequence[str], priority: str = None) -> TaskPlan:
+    """
+    Compile task descriptions into a plan.
+
+    Args:
+        descriptions: Task descriptions in timeline order
+        priority: Fixed priority for every task; by default priority comes
+            from keywords and position in the list
+
+    Returns:
+        Tuple of PlanTask in the same order
+    """
+    total = len(descriptions)
+    return tuple(
+        PlanTask(
+            description_id=intern_description(text),
+            task_type=classify_task_type(text),
+            priority=priority or task_priority(text, index, total),
+            weight=task_weight(text)
+        )
+        for index, text in enumerate(descriptions)
+    )
+
+
+def compile_phase_plans(phase_templates: Mapping[str, dict]) -> Mapping[str, TaskPlan]:
+    """Compile the task templates of every phase type (read-only mapping)"""
+    return MappingProxyType({
+        phase_type: compile_task_list(template['task_templates'])
+        for phase_type, template in phase_templates.items()
+    })
+
+
+class LegacyPlan:
+    """Compiled 12-week task table and ongoing tasks for legacy schedules"""
+
+    def __init__(self, weekly_tasks: Mapping[int, Sequence[str]], ongoing_tasks: Sequence[str]):
+        # Legacy schedule items have always used the column default priority
+        self.weeks = MappingProxyType({
+            week: compile_task_list([f"Week {week}: {task}" for task in tasks], priority='medium')
+            for week, tasks in weekly_tasks.items()
+        })
+        self.ongoing = compile_task_list([f"Ongoing: {task}" for task in ongoing_tasks],
+                                         priority='medium')
+        self.last_week = max(self.weeks) if self.weeks else 0
+        self.task_queue = lru_cache(maxsize=None)(self._task_queue)
+
+    def _task_queue(self, total_weeks: int) -> TaskPlan:
+        """Tasks for the weeks that fit in ``total_weeks``, then the ongoing tasks"""
+        weeks = min(self.last_week, max(0, total_weeks))
+        queue = []
+        for week in range(1, weeks + 1):
+            queue.extend(self.weeks.get(week, ()))
+        queue.extend(self.ongoing)
+        return tuple(queue)
+
+
+def plan_version(phase_templates: Mapping[str, dict], weekly_tasks: Mapping[int, Sequence[str]],
+                 ongoing_tasks: Sequence[str]) -> str:
+    """Short hash of the task text and classification rules behind the plans"""
+    source = {
+        'phases': {key: list(value['task_templates']) for key, value in phase_templates.items()},
+        'weekly': {str(week): list(tasks) for week, tasks in weekly_tasks.items()},
+        'ongoing': list(ongoing_tasks),
+        'task_types': TASK_TYPE_RULES,
+        'priorities': PRIORITY_RULES,
+        'heavy': HEAVY_TASK_KEYWORDS
+    }
+    encoded = json.dumps(source, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:12]
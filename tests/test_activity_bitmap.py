@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for activity bitmaps (streaks and heatmaps)
+"""
+
+import unittest
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, ActivityBitmap, ProgressLog, Student
+from activity_bitmap import (
+    ALL_PHASES, active_indexes, backfill_from_progress_logs, get_heatmap, get_streaks,
+    leading_run, longest_run, record_activity, run_ending_at
+)
+from werkzeug.security import generate_password_hash
+
+
+def reference_streaks(days, today):
+    """Walk sorted distinct days, as the tracker used to"""
+    days = sorted(set(days))
+    longest = run = 0
+    runs = {}
+    for i, day in enumerate(days):
+        run = run + 1 if i and (day - days[i - 1]).days == 1 else 1
+        runs[day] = run
+        longest = max(longest, run)
+    current = runs.get(today) or runs.get(today - timedelta(days=1)) or 0
+    return current, longest
+
+
+class TestBitOperations(unittest.TestCase):
+    def test_runs(self):
+        bits = 0b0111011110
+        self.assertEqual(run_ending_at(bits, 4), 4)
+        self.assertEqual(run_ending_at(bits, 3), 3)
+        self.assertEqual(run_ending_at(bits, 5), 0)
+        self.assertEqual(run_ending_at(bits, 8), 3)
+        self.assertEqual(longest_run(bits), 4)
+        self.assertEqual(leading_run(bits), 0)
+        self.assertEqual(leading_run(0b0111), 3)
+        self.assertEqual(run_ending_at(0b0111, 2), 3)
+        self.assertEqual(longest_run(0), 0)
+
+    def test_active_indexes(self):
+        self.assertEqual(active_indexes(0b100101), [0, 2, 5])
+        self.assertEqual(active_indexes(0), [])
+
+
+class TestActivityBitmap(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.student = Student(
+            name="Bitmap User",
+            email=f"bitmap-{random.random()}@example.com",
+            password_hash=generate_password_hash("password"),
+            onboarded=True,
+            is_multi_phase=True
+        )
+        db.session.add(self.student)
+        db.session.commit()
+
+    def tearDown(self):
+        ActivityBitmap.query.filter_by(student_id=self.student.id).delete()
+        ProgressLog.query.filter_by(student_id=self.student.id).delete()
+        Student.query.filter_by(id=self.student.id).delete()
+        db.session.commit()
+        self.app_context.pop()
+
+    def test_streaks_match_reference(self):
+        rng = random.Random(11)
+        today = date(2025, 1, 3)
+        days = set()
+        # Dense activity across the new year, so runs cross year boundaries
+        start = date(2024, 11, 1)
+        for offset in range(70):
+            if rng.random() < 0.8:
+                days.add(start + timedelta(days=offset))
+        days.update([today, today - timedelta(days=1)])
+
+        for day in sorted(days, key=lambda _: rng.random()):
+            record_activity(self.student.id, day)
+        db.session.commit()
+
+        self.assertEqual(get_streaks(self.student.id, today=today), reference_streaks(days, today))
+        for check_day in (date(2024, 12, 31), date(2025, 1, 10), date(2024, 11, 15)):
+            self.assertEqual(get_streaks(self.student.id, today=check_day)[0],
+                             reference_streaks([d for d in days if d <= check_day], check_day)[0])
+
+    def test_phase_bitmap_is_separate(self):
+        today = date(2025, 3, 10)
+        record_activity(self.student.id, today, phase_id=42)
+        record_activity(self.student.id, today - timedelta(days=1))
+        db.session.commit()
+
+        self.assertEqual(get_streaks(self.student.id, today=today), (2, 2))
+        self.assertEqual(get_streaks(self.student.id, phase_id=42, today=today), (1, 1))
+
+    def test_recording_twice_is_idempotent(self):
+        day = date(2025, 5, 1)
+        record_activity(self.student.id, day)
+        record_activity(self.student.id, day)
+        db.session.commit()
+
+        self.assertEqual(ActivityBitmap.query.filter_by(student_id=self.student.id).count(), 1)
+        self.assertEqual(get_streaks(self.student.id, today=day), (1, 1))
+
+    def test_heatmap(self):
+        for day in (date(2024, 2, 28), date(2024, 2, 29), date(2024, 12, 31)):
+            record_activity(self.student.id, day)
+        db.session.commit()
+
+        heatmap = get_heatmap(self.student.id, 2024)
+        self.assertEqual(heatmap['active_days'], ['2024-02-28', '2024-02-29', '2024-12-31'])
+        self.assertEqual(heatmap['total_active_days'], 3)
+        self.assertEqual(heatmap['longest_streak_in_year'], 2)
+        self.assertEqual(get_heatmap(self.student.id, 2023)['active_days'], [])
+
+    def test_backfill_matches_incremental(self):
+        rng = random.Random(12)
+        days = sorted({date(2024, 12, 1) + timedelta(days=rng.randint(0, 60)) for _ in range(40)})
+        for day in days:
+            db.session.add(ProgressLog(student_id=self.student.id, date=day, tasks_completed='[]',
+                                       phase_id=7 if day.day % 2 else None))
+        db.session.commit()
+
+        written = backfill_from_progress_logs(self.student.id)
+        self.assertGreater(written, 0)
+        backfilled = {(row.phase_id, row.year): (row.bits, row.longest_streak)
+                      for row in ActivityBitmap.query.filter_by(student_id=self.student.id)}
+
+        ActivityBitmap.query.filter_by(student_id=self.student.id).delete()
+        for day in days:
+            record_activity(self.student.id, day, phase_id=7 if day.day % 2 else None)
+        db.session.commit()
+        incremental = {(row.phase_id, row.year): (row.bits, row.longest_streak)
+                       for row in ActivityBitmap.query.filter_by(student_id=self.student.id)}
+
+        self.assertEqual(backfilled, incremental)
+        self.assertEqual(get_streaks(self.student.id, today=days[-1])[1],
+                         reference_streaks(days, days[-1])[1])
+        self.assertIn((ALL_PHASES, 2025), backfilled)
+
+
+if __name__ == '__main__':
+    unittest.main()
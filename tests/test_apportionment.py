@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Unit and property tests for task apportionment
+"""
+
+import unittest
+import os
+import random
+import sys
+from datetime import date, timedelta
+from fractions import Fraction
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from apportionment import apportion, DAY_CAPACITY, INTENSITY_WEIGHTS
+from app import app, db, PhaseTask, PhaseTaskGenerator, ProjectPhase, Student
+from werkzeug.security import generate_password_hash
+
+
+def make_days(intensities, start=date(2025, 1, 6)):
+    return [
+        {'date': start + timedelta(days=i), 'intensity': intensity}
+        for i, intensity in enumerate(intensities)
+    ]
+
+
+class TestApportion(unittest.TestCase):
+    def test_weighted_split(self):
+        # light, heavy, light with 8 tasks: quotas 2, 4, 2
+        self.assertEqual(apportion(8, [1, 2, 1], [4, 8, 4]), [2, 4, 2])
+
+    def test_fewer_tasks_than_days(self):
+        # Heavy days win ties, then earlier days
+        self.assertEqual(apportion(2, [1, 1, 2, 1, 2], [4] * 5), [0, 0, 1, 0, 1])
+        self.assertEqual(apportion(2, [1, 1, 1, 1], [4] * 4), [1, 1, 0, 0])
+
+    def test_caps_are_hard(self):
+        self.assertEqual(apportion(6, [1, 2], [4, 3]), [3, 3])
+        self.assertEqual(apportion(20, [1, 2], [4, 3]), [4, 3])
+
+    def test_only_light_days(self):
+        self.assertEqual(apportion(7, [1, 1, 1], [4, 4, 4]), [3, 2, 2])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            apportion(3, [1, 2], [4])
+        with self.assertRaises(ValueError):
+            apportion(3, [0, 2], [4, 4])
+
+
+class TestApportionProperties(unittest.TestCase):
+    """Randomized checks over many seeded inputs"""
+
+    CASES = 2000
+
+    def random_cases(self, seed):
+        rng = random.Random(seed)
+        for _ in range(self.CASES):
+            days = rng.randint(1, 40)
+            weights = [rng.choice([1, 2, 3]) for _ in range(days)]
+            caps = [rng.randint(0, 8) for _ in range(days)]
+            total = rng.randint(-3, sum(caps) + 10)
+            yield total, weights, caps
+
+    def test_totals_and_caps(self):
+        for total, weights, caps in self.random_cases(1):
+            counts = apportion(total, weights, caps)
+            self.assertEqual(len(counts), len(weights))
+            self.assertEqual(sum(counts), min(max(total, 0), sum(caps)))
+            for count, cap in zip(counts, caps):
+                self.assertGreaterEqual(count, 0)
+                self.assertLessEqual(count, cap)
+
+    def test_counts_stay_within_one_of_capped_quota(self):
+        for total, weights, caps in self.random_cases(2):
+            if not 0 < total < sum(caps):
+                continue
+            counts = apportion(total, weights, caps)
+            # Every count is within one task of its quota min(cap, λ·w), so
+            # (count - 1) / w < λ for every day and λ < (count + 1) / w for
+            # days below their cap
+            upper = min(Fraction(c + 1, w) for c, w, cap in zip(counts, weights, caps) if c < cap)
+            lower = max(Fraction(c - 1, w) for c, w in zip(counts, weights))
+            self.assertLess(lower, upper)
+
+    def test_deterministic(self):
+        for total, weights, caps in self.random_cases(3):
+            self.assertEqual(apportion(total, weights, caps), apportion(total, weights, caps))
+
+    def test_monotonic_in_total(self):
+        rng = random.Random(4)
+        for _ in range(200):
+            days = rng.randint(1, 20)
+            weights = [rng.choice([1, 2]) for _ in range(days)]
+            caps = [DAY_CAPACITY['light'] if w == 1 else DAY_CAPACITY['heavy'] for w in weights]
+            previous = [0] * days
+            for total in range(sum(caps) + 1):
+                counts = apportion(total, weights, caps)
+                self.assertEqual(sum(counts), total)
+                # Adding a task never takes a task away from another day
+                self.assertTrue(all(c >= p for c, p in zip(counts, previous)))
+                previous = counts
+
+
+class TestTaskDistribution(unittest.TestCase):
+    def test_more_days_than_tasks_does_not_overassign(self):
+        days = make_days(['light', 'heavy'] * 10)
+        distribution, overflow = PhaseTaskGenerator._calculate_task_distribution(5, days)
+
+        self.assertEqual(sum(d['task_count'] for d in distribution), 5)
+        self.assertEqual(overflow, 0)
+
+    def test_only_light_days_terminates(self):
+        days = make_days(['light'] * 3)
+        distribution, overflow = PhaseTaskGenerator._calculate_task_distribution(50, days)
+
+        # 12 fit; the other 38 spill over from the last day backwards
+        self.assertEqual([d['task_count'] for d in distribution], [16, 17, 17])
+        self.assertEqual(overflow, 38)
+
+    def test_overflow_goes_to_the_last_days(self):
+        days = make_days(['heavy', 'light', 'light'])
+        distribution, overflow = PhaseTaskGenerator._calculate_task_distribution(18, days)
+
+        self.assertEqual([d['task_count'] for d in distribution], [8, 5, 5])
+        self.assertEqual(overflow, PhaseTaskGenerator.capacity_overflow(18, days))
+        self.assertEqual(overflow, 2)
+
+    def test_distribution_is_sorted_and_respects_caps(self):
+        rng = random.Random(5)
+        for _ in range(300):
+            intensities = [rng.choice(['light', 'heavy']) for _ in range(rng.randint(1, 30))]
+            days = make_days(intensities)
+            total = rng.randint(0, 120)
+            distribution, overflow = PhaseTaskGenerator._calculate_task_distribution(total, days)
+
+            # Every task is scheduled; overflow adds at most an even share to each day
+            capacity = sum(DAY_CAPACITY[i] for i in intensities)
+            spill = -(-max(0, total - capacity) // len(days))
+            self.assertEqual(sum(d['task_count'] for d in distribution), total)
+            self.assertEqual(overflow, max(0, total - capacity))
+            self.assertEqual([d['date'] for d in distribution],
+                             sorted(d['date'] for d in distribution))
+            for d in distribution:
+                self.assertGreater(d['task_count'], 0)
+                self.assertLessEqual(d['task_count'], DAY_CAPACITY[d['intensity']] + spill)
+
+    def test_heavy_days_get_more_tasks(self):
+        days = make_days(['light', 'heavy', 'light', 'heavy'])
+        distribution, _ = PhaseTaskGenerator._calculate_task_distribution(12, days)
+        counts = {d['date']: d['task_count'] for d in distribution}
+
+        for day in days:
+            expected = 12 * INTENSITY_WEIGHTS[day['intensity']] // 6
+            self.assertEqual(counts[day['date']], expected)
+
+
+
+class TestCapacityOverflowNotice(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        student = Student(name="Short Deadline", email="short@example.com",
+                          password_hash=generate_password_hash("password"), onboarded=True, is_multi_phase=True)
+        db.session.add(student)
+        db.session.flush()
+        self.phase = ProjectPhase(student_id=student.id, phase_type='literature_review',
+                                  phase_name='Literature Review', deadline=date.today() + timedelta(days=1),
+                                  order_index=1)
+        db.session.add(self.phase)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_create_and_save_reports_overflow(self):
+        tasks, overflow = PhaseTaskGenerator.create_and_save_tasks_for_phase(
+            self.phase, {day: 'light' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                                                  'saturday', 'sunday')})
+
+        # Two light days hold 8 of the phase's tasks; the rest are still scheduled
+        self.assertEqual(overflow, len(tasks) - 2 * DAY_CAPACITY['light'])
+        self.assertEqual(PhaseTask.query.count(), len(tasks))
+
+    def test_regenerating_flashes_overflow(self):
+        client = app.test_client()
+        client.post('/login', data={'email': "short@example.com", 'password': "password"})
+        form = {'project_title': "Thesis", 'thesis_deadline': (date.today() + timedelta(days=90)).isoformat()}
+        form.update({f'{day}_intensity': 'light' for day in ('monday', 'tuesday', 'wednesday', 'thursday',
+                                                             'friday', 'saturday', 'sunday')})
+        client.post('/update_settings', data=form)
+
+        with client.session_transaction() as session:
+            messages = [message for _, message in session.get('_flashes', [])]
+        self.assertTrue(any("did not fit your daily capacity" in message and "Literature Review" in message
+                            for message in messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the set-based bulk migration to multi-phase
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, JobCheckpoint, MigrationService, PhaseTask, ProjectPhase, ScheduleItem, Student
+import bulk_migration
+from task_classifier import classify_task_type
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+DESCRIPTIONS = ["Week 1: Begin wide reading to orient toward topic",
+                "Week 1: Set up note-taking system with template for articles",
+                "Week 2: Meet with adviser to discuss promising directions"]
+
+
+class TestBulkMigration(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        self.legacy_ids = []
+        for i in range(5):
+            student = Student(name=f"Legacy {i}", email=f"legacy{i}@example.com",
+                              password_hash=generate_password_hash("password"), onboarded=True,
+                              lit_review_deadline=TODAY + timedelta(days=30))
+            db.session.add(student)
+            db.session.flush()
+            self.legacy_ids.append(student.id)
+            for j, text in enumerate(DESCRIPTIONS):
+                db.session.add(ScheduleItem(student_id=student.id, date=TODAY + timedelta(days=j),
+                                            task_description=text, completed=(j == 0), priority='high'))
+        # Not onboarded, and already multi-phase: both left alone
+        db.session.add(Student(name="New", email="new@example.com", password_hash="x", onboarded=False,
+                               lit_review_deadline=TODAY))
+        db.session.add(Student(name="Multi", email="multi@example.com", password_hash="x", onboarded=True,
+                               is_multi_phase=True, lit_review_deadline=TODAY))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_migrates_in_chunks(self):
+        summary = bulk_migration.run_bulk_migration(chunk_size=2)
+
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual((summary['chunks'], summary['students'], summary['tasks']), (3, 5, 15))
+        self.assertIn('tasks_per_second', summary)
+
+        for student_id in self.legacy_ids:
+            student = db.session.get(Student, student_id)
+            self.assertTrue(student.is_multi_phase)
+            self.assertEqual(student.schedule_version, 1)
+            phase = ProjectPhase.query.filter_by(student_id=student_id).one()
+            self.assertEqual((phase.phase_type, phase.deadline, phase.order_index),
+                             ('literature_review', TODAY + timedelta(days=30), 1))
+            tasks = PhaseTask.query.filter_by(phase_id=phase.id).order_by(PhaseTask.date).all()
+            self.assertEqual([t.task_description for t in tasks], DESCRIPTIONS)
+            self.assertEqual([t.task_type for t in tasks], [classify_task_type(text) for text in DESCRIPTIONS])
+            self.assertEqual([t.completed for t in tasks], [True, False, False])
+            self.assertTrue(all(t.priority == 'high' for t in tasks))
+
+        self.assertEqual(ProjectPhase.query.count(), 5)
+        checkpoint = db.session.get(JobCheckpoint, bulk_migration.JOB_NAME)
+        self.assertEqual((checkpoint.last_id, checkpoint.processed, checkpoint.items), (0, 5, 15))
+
+    def test_next_run_picks_up_newly_eligible_students(self):
+        bulk_migration.run_bulk_migration(chunk_size=2)
+        MigrationService.rollback_migration(self.legacy_ids[0])
+
+        summary = bulk_migration.run_bulk_migration(chunk_size=2)
+
+        self.assertEqual((summary['resumed_from'], summary['students'], summary['tasks']), (0, 1, 3))
+        self.assertTrue(db.session.get(Student, self.legacy_ids[0]).is_multi_phase)
+        checkpoint = db.session.get(JobCheckpoint, bulk_migration.JOB_NAME)
+        self.assertEqual((checkpoint.last_id, checkpoint.processed, checkpoint.items), (0, 1, 3))
+
+    def test_resumes_after_interruption(self):
+        original = bulk_migration._migrate_chunk
+        calls = []
+
+        def fail_on_second_chunk(student_ids, now):
+            calls.append(student_ids)
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            return original(student_ids, now)
+
+        with patch.object(bulk_migration, '_migrate_chunk', side_effect=fail_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                bulk_migration.run_bulk_migration(chunk_size=2)
+
+        self.assertEqual(Student.query.filter_by(is_multi_phase=True).count(), 3)  # First chunk plus "Multi"
+
+        summary = bulk_migration.run_bulk_migration(chunk_size=2)
+        self.assertEqual(summary['resumed_from'], self.legacy_ids[1])
+        self.assertEqual(summary['students'], 3)
+        self.assertEqual(ProjectPhase.query.count(), 5)
+        self.assertEqual(PhaseTask.query.count(), 15)
+
+    def test_dry_run_writes_nothing(self):
+        summary = bulk_migration.run_bulk_migration(chunk_size=2, dry_run=True)
+
+        self.assertEqual((summary['students'], summary['tasks'], summary['completed_tasks']), (5, 15, 5))
+        self.assertEqual(sum(summary['task_types'].values()), 15)
+        self.assertEqual(ProjectPhase.query.count(), 0)
+        self.assertIsNone(db.session.get(JobCheckpoint, bulk_migration.JOB_NAME))
+
+    def test_preview_aggregates_in_sql(self):
+        preview = MigrationService.get_migration_preview(self.legacy_ids[0])
+        tasks = preview['migration_plan']['tasks_to_migrate']
+
+        self.assertEqual((tasks['total_tasks'], tasks['completed_tasks'], tasks['pending_tasks']), (3, 1, 2))
+        self.assertEqual(tasks['date_range'], {'earliest': TODAY, 'latest': TODAY + timedelta(days=2)})
+        self.assertEqual(sum(tasks['task_types'].values()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
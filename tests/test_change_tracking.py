@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the schedule change journal and delta sync
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, PhaseTask, ProjectPhase, ScheduleChange, Student
+import change_tracking
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+
+
+class TestChangeJournal(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        self.student = Student(name="Journal User", email="journal@example.com",
+                               password_hash=generate_password_hash("password"), onboarded=True,
+                               is_multi_phase=True)
+        db.session.add(self.student)
+        db.session.flush()
+        self.phases = [ProjectPhase(student_id=self.student.id, phase_type=phase_type, phase_name=phase_type,
+                                    deadline=TODAY + timedelta(days=30 * order), order_index=order)
+                       for order, phase_type in enumerate(('literature_review', 'research_question'), start=1)]
+        db.session.add_all(self.phases)
+        db.session.flush()
+        self.tasks = [PhaseTask(phase_id=phase.id, date=TODAY + timedelta(days=i), task_description=f"Task {i}")
+                      for phase in self.phases for i in range(3)]
+        db.session.add_all(self.tasks)
+        db.session.commit()
+        self.version = self.student.schedule_version
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def changes(self, since=None):
+        return change_tracking.changes_since(self.student, self.version if since is None else since)
+
+    def test_returns_only_changed_rows(self):
+        self.assertEqual(self.changes(), {'version': self.version, 'reset': False, 'phases': [], 'tasks': [],
+                                          'deleted': {'phases': [], 'tasks': []}})
+
+        first, second = self.tasks[0], self.tasks[1]
+        first.completed = True
+        db.session.commit()
+        first.status = 'completed'
+        db.session.commit()
+        added = PhaseTask(phase_id=self.phases[0].id, date=TODAY, task_description="Added")
+        db.session.add(added)
+        db.session.delete(second)
+        self.phases[0].phase_name = "Renamed"
+        db.session.commit()
+
+        changes = self.changes()
+        self.assertEqual(changes['version'], self.version + 3)
+        self.assertEqual([t['id'] for t in changes['tasks']], [first.id, added.id])
+        self.assertEqual((changes['tasks'][0]['completed'], changes['tasks'][0]['status']), (True, 'completed'))
+        self.assertEqual([p['phase_name'] for p in changes['phases']], ["Renamed"])
+        self.assertEqual(changes['deleted'], {'phases': [], 'tasks': [second.id]})
+
+        # Only what changed after the client's version
+        later = self.changes(self.version + 2)
+        self.assertEqual([t['id'] for t in later['tasks']], [added.id])
+        self.assertEqual(ScheduleChange.query.filter_by(kind=change_tracking.TASK, entity_id=first.id).count(), 1)
+
+    def test_deleted_phase_takes_its_tasks(self):
+        phase = self.phases[1]
+        task_ids = [t.id for t in self.tasks if t.phase_id == phase.id]
+        self.tasks[3].completed = True
+        db.session.commit()
+        db.session.delete(phase)
+        db.session.commit()
+
+        changes = self.changes()
+        self.assertEqual(changes['deleted']['phases'], [phase.id])
+        self.assertEqual(changes['deleted']['tasks'], [task_ids[0]])
+        self.assertEqual(changes['tasks'], [])
+
+    def test_bulk_changes(self):
+        self.tasks[0].completed = True
+        db.session.commit()
+
+        moved = self.tasks[1]
+        db.session.execute(db.update(PhaseTask).where(PhaseTask.id == moved.id).values(date=TODAY))
+        change_tracking.bump_schedule_versions([self.student.id], changed_tasks={self.student.id: [moved.id]})
+        db.session.commit()
+        self.assertEqual([t['id'] for t in self.changes(self.version + 1)['tasks']], [moved.id])
+
+        change_tracking.bump_schedule_versions([self.student.id])
+        db.session.commit()
+        self.assertTrue(self.changes()['reset'])
+        self.assertFalse(self.changes(self.version + 3)['reset'])
+        self.assertEqual(ScheduleChange.query.count(), 1)
+
+    def test_redistribution_journals_moved_tasks(self):
+        from schedule_coordinator import ScheduleCoordinator
+
+        today = date.today()
+        for i, task in enumerate(self.tasks[:3]):
+            task.date = today + timedelta(days=20 + i)
+        self.phases[0].deadline = today + timedelta(days=30)
+        db.session.commit()
+        since = self.student.schedule_version
+
+        result = ScheduleCoordinator(self.student.id).redistribute_tasks_after_deadline_change(
+            self.phases[0].id, today + timedelta(days=5))
+        moved = sorted(move['task_id'] for move in result['moves'])
+
+        changes = self.changes(since)
+        self.assertTrue(moved)
+        self.assertFalse(changes['reset'])
+        self.assertTrue(set(moved) <= {t['id'] for t in changes['tasks']})
+        self.assertEqual([p['id'] for p in changes['phases']], [self.phases[0].id])
+
+    def test_api(self):
+        client = app.test_client()
+        client.post('/login', data={'email': "journal@example.com", 'password': "password"})
+        task_id = self.tasks[2].id
+
+        response = client.post('/toggle_task_completion', data={'task_id': task_id, 'completed': 'true'})
+        self.assertEqual(response.get_json()['version'], self.version + 1)
+
+        changes = client.get(f'/api/changes?since={self.version}').get_json()
+        self.assertEqual(changes['version'], self.version + 1)
+        self.assertEqual([(t['id'], t['completed']) for t in changes['tasks']], [(task_id, True)])
+        self.assertEqual(client.get('/api/changes').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the cold archive of inactive students
+"""
+
+import unittest
+import os
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (app, db, ActivityBitmap, PhaseTask, ProgressLog, ProgressLogTask, ProjectPhase,
+                 ScheduleItem, Student, StudentArchive)
+import activity_bitmap
+import cold_archive
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+LONG_AGO = TODAY - timedelta(days=400)
+
+
+class TestColdArchive(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_student(self, email, deadline, multi_phase=True):
+        student = Student(name="Archive User", email=email, password_hash=generate_password_hash("password"),
+                          onboarded=True, is_multi_phase=multi_phase, thesis_deadline=deadline,
+                          lit_review_deadline=deadline, created_at=datetime.combine(LONG_AGO, datetime.min.time()))
+        db.session.add(student)
+        db.session.flush()
+        if multi_phase:
+            phase = ProjectPhase(student_id=student.id, phase_type='literature_review',
+                                 phase_name='Literature Review', deadline=deadline, order_index=1)
+            db.session.add(phase)
+            db.session.flush()
+            tasks = [PhaseTask(phase_id=phase.id, date=deadline - timedelta(days=i), task_description=f"Task {i}",
+                               completed=(i == 0)) for i in range(3)]
+            db.session.add_all(tasks)
+            db.session.flush()
+            completed = [str(tasks[0].id)]
+        else:
+            items = [ScheduleItem(student_id=student.id, date=deadline - timedelta(days=i),
+                                  task_description=f"Item {i}", completed=(i == 0)) for i in range(3)]
+            db.session.add_all(items)
+            db.session.flush()
+            completed = [str(items[0].id)]
+        log = ProgressLog(student_id=student.id, date=deadline - timedelta(days=1),
+                          tasks_completed=json.dumps(completed), notes="Done")
+        log.add_completed_tasks(completed, is_phase_task=multi_phase)
+        db.session.add(log)
+        activity_bitmap.record_activity(student.id, deadline - timedelta(days=1))
+        db.session.commit()
+        return student
+
+    def snapshot(self, student_id):
+        """Every archived table's rows for one student, as plain dicts"""
+        tables = cold_archive._table_models()
+        filters = cold_archive._student_filters(tables, [student_id])
+        return {name: [dict(row) for row in db.session.execute(
+            db.select(tables[name]).where(filters[name]).order_by(*tables[name].primary_key)
+        ).mappings()] for name in cold_archive.TABLES}
+
+    def test_archives_only_inactive_students(self):
+        inactive = self.add_student("inactive@example.com", LONG_AGO)
+        legacy = self.add_student("legacy@example.com", LONG_AGO, multi_phase=False)
+        current = self.add_student("current@example.com", TODAY + timedelta(days=30))
+        recent_login = self.add_student("login@example.com", LONG_AGO)
+        recent_login.last_login_at = datetime.combine(TODAY, datetime.min.time())
+        db.session.commit()
+        version = inactive.schedule_version
+
+        summary = cold_archive.run_archive(TODAY, chunk_size=1)
+
+        self.assertEqual((summary['status'], summary['students']), ('ok', 2))
+        self.assertLess(summary['stored_bytes'], summary['raw_bytes'])
+        self.assertEqual({a.student_id for a in StudentArchive.query}, {inactive.id, legacy.id})
+        for student in (inactive, legacy):
+            db.session.refresh(student)
+            self.assertIsNotNone(student.archived_at)
+            self.assertTrue(all(not rows for rows in self.snapshot(student.id).values()))
+        self.assertEqual(inactive.schedule_version, version + 1)
+        self.assertEqual(ProjectPhase.query.count(), 2)
+        self.assertEqual(ProgressLogTask.query.count(), 2)
+
+        # A second run finds nothing left to archive
+        self.assertEqual(cold_archive.run_archive(TODAY)['students'], 0)
+
+    def test_rehydrate_restores_rows_unchanged(self):
+        students = [self.add_student("multi@example.com", LONG_AGO),
+                    self.add_student("legacy@example.com", LONG_AGO, multi_phase=False)]
+        before = {student.id: self.snapshot(student.id) for student in students}
+        cold_archive.run_archive(TODAY)
+
+        for student in students:
+            student = db.session.get(Student, student.id)
+            self.assertTrue(cold_archive.rehydrate_student(student))
+            self.assertIsNone(student.archived_at)
+            self.assertEqual(self.snapshot(student.id), before[student.id])
+            self.assertFalse(cold_archive.rehydrate_student(student))
+        self.assertEqual(StudentArchive.query.count(), 0)
+
+    def test_rehydrate_remaps_taken_ids(self):
+        student = self.add_student("multi@example.com", LONG_AGO)
+        activity_bitmap.record_activity(student.id, LONG_AGO - timedelta(days=1),
+                                        phase_id=student.project_phases[0].id)
+        db.session.commit()
+        before = self.snapshot(student.id)
+        cold_archive.run_archive(TODAY)
+
+        # A new student takes over the freed ids
+        newcomer = self.add_student("new@example.com", TODAY + timedelta(days=30))
+        self.assertEqual(self.snapshot(newcomer.id)['project_phase'][0]['id'],
+                         before['project_phase'][0]['id'])
+
+        cold_archive.rehydrate_student(db.session.get(Student, student.id))
+
+        phase = ProjectPhase.query.filter_by(student_id=student.id).one()
+        self.assertNotEqual(phase.id, before['project_phase'][0]['id'])
+        tasks = PhaseTask.query.filter_by(phase_id=phase.id).order_by(PhaseTask.id).all()
+        self.assertEqual([t.task_description for t in tasks], ["Task 0", "Task 1", "Task 2"])
+        log = ProgressLog.query.filter_by(student_id=student.id).one()
+        self.assertEqual([(link.task_id, link.is_phase_task) for link in log.completed_task_links],
+                         [(tasks[0].id, True)])
+        self.assertEqual(json.loads(log.tasks_completed), [str(tasks[0].id)])
+        self.assertEqual(sorted(row.phase_id for row in ActivityBitmap.query.filter_by(student_id=student.id)),
+                         [activity_bitmap.ALL_PHASES, phase.id])
+        # The newcomer's rows are untouched
+        self.assertEqual(PhaseTask.query.join(ProjectPhase).filter(ProjectPhase.student_id == newcomer.id).count(), 3)
+
+    def test_login_rehydrates(self):
+        student = self.add_student("multi@example.com", LONG_AGO)
+        cold_archive.run_archive(TODAY)
+
+        response = app.test_client().post('/login', data={'email': "multi@example.com", 'password': "password"})
+
+        self.assertEqual(response.status_code, 302)
+        student = db.session.get(Student, student.id)
+        self.assertIsNone(student.archived_at)
+        self.assertIsNotNone(student.last_login_at)
+        self.assertEqual(PhaseTask.query.count(), 3)
+        self.assertEqual(StudentArchive.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
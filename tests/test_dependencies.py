@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Unit tests for task dependencies, the critical path and schedule versions
+"""
+
+import unittest
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (app, db, PHASE_DEPENDENCY_RULES, PHASE_TEMPLATES, PhaseTask, PhaseTaskGenerator,
+                 ProjectPhase, Student)
+import dependencies
+from dependencies import CriticalPath, TaskNode, compile_dependencies, resolve_edges, topological_order
+from redistribution import TaskSlot, plan_redistribution, work_day_capacities
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)  # A Monday
+
+
+def node(task_id, phase_id, day, deadline, phase_type='irb_proposal', description=None):
+    return TaskNode(task_id, phase_id, phase_type, description or f"Task {task_id}",
+                    TODAY + timedelta(days=day), TODAY + timedelta(days=deadline))
+
+
+class TestRules(unittest.TestCase):
+    def test_declared_rules_compile(self):
+        prerequisites = PHASE_DEPENDENCY_RULES.task_prerequisites[('irb_proposal', "Submit IRB application")]
+        self.assertIn(('irb_proposal', "Draft informed consent forms"), prerequisites)
+
+    def test_invalid_rules(self):
+        lit = 'literature_review'
+        first, last = PHASE_TEMPLATES[lit]['task_templates'][0], PHASE_TEMPLATES[lit]['task_templates'][-1]
+        invalid = [
+            ([((lit, "No such task"), (lit, last))], {}),
+            ([((lit, last), (lit, first))], {}),
+            ([(('irb_proposal', "Submit IRB application"), (lit, last))], {}),
+            ([], {lit: ('irb_proposal',), 'irb_proposal': (lit,)}),
+        ]
+        for task_dependencies, phase_dependencies in invalid:
+            with self.assertRaises(ValueError):
+                compile_dependencies(PHASE_TEMPLATES, task_dependencies, phase_dependencies)
+
+    def test_resolve_edges(self):
+        tasks = [
+            node(1, 10, 0, 20, 'methods_planning', "Finalize sampling criteria and recruitment methods"),
+            node(2, 10, 3, 20, 'methods_planning', "Document methodology decisions and rationale"),
+            node(3, 20, 1, 30, 'irb_proposal', "Draft consent forms and recruitment scripts"),
+            node(4, 20, 2, 30, 'irb_proposal', "Submit IRB application"),
+            node(5, 20, 4, 30, 'irb_proposal', "Finalize all compliance documentation"),
+        ]
+        edges = resolve_edges(PHASE_DEPENDENCY_RULES, tasks)
+        self.assertIn((1, 3), edges)  # Across phases
+        self.assertIn((3, 4), edges)  # Within a phase
+        self.assertIn((2, 5), edges)  # Last task of methods before the last IRB task
+        self.assertEqual(topological_order([1, 2, 3, 4, 5], edges)[:2], [1, 2])
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(ValueError):
+            topological_order([1, 2, 3], [(1, 2), (2, 3), (3, 1)])
+
+
+class TestCriticalPath(unittest.TestCase):
+    def test_slack_and_late_chains(self):
+        tasks = [node(1, 1, 0, 2), node(2, 1, 0, 2), node(3, 1, 0, 2), node(4, 2, 5, 20)]
+        graph = CriticalPath(tasks, [(1, 2), (2, 3)], TODAY)
+        self.assertEqual(graph.earliest_start[3], TODAY + timedelta(days=2))
+        self.assertEqual([graph.slack(i) for i in (1, 2, 3)], [0, 0, 0])
+        self.assertEqual(graph.slack(4), 15)
+        self.assertEqual(graph.critical_tasks(), [1, 2, 3])
+
+        graph.move(1, TODAY + timedelta(days=1))
+        self.assertEqual(graph.slack(3), -1)
+        self.assertEqual(graph.phase_summary()[1]['late_tasks'], 3)
+
+    def test_incremental_moves_match_rebuild(self):
+        rng = random.Random(42)
+        for _ in range(30):
+            count = rng.randint(2, 40)
+            tasks = [node(i, rng.randint(1, 3), rng.randint(-3, 20), rng.randint(5, 40)) for i in range(count)]
+            edges = {(a, b) for a, b in (sorted(rng.sample(range(count), 2)) for _ in range(count))}
+            graph = CriticalPath(tasks, edges, TODAY)
+            for _ in range(10):
+                task_id = rng.randrange(count)
+                graph.move(task_id, TODAY + timedelta(days=rng.randint(-3, 30)))
+                tasks[task_id] = tasks[task_id]._replace(date=graph.dates[task_id])
+            rebuilt = CriticalPath(tasks, edges, TODAY)
+            self.assertEqual(graph.earliest_start, rebuilt.earliest_start)
+            self.assertEqual(graph.latest_start, rebuilt.latest_start)
+
+
+class TestRedistributionWithDependencies(unittest.TestCase):
+    def test_dependent_moves_off_prerequisite_day(self):
+        days = work_day_capacities(None, TODAY, TODAY + timedelta(days=10))
+        tasks = [TaskSlot(1, 1, 0, TODAY + timedelta(days=10), TODAY, 0),
+                 TaskSlot(2, 1, 0, TODAY + timedelta(days=10), TODAY, 1)]
+        plan = plan_redistribution(tasks, days, [(1, 2)])
+        self.assertEqual([(m.task_id, m.new_date) for m in plan.moves], [(2, TODAY + timedelta(days=1))])
+
+    def test_impossible_dependency_is_reported(self):
+        days = {TODAY: ('light', 4)}
+        tasks = [TaskSlot(1, 1, 0, TODAY, TODAY, 0), TaskSlot(2, 1, 0, TODAY, TODAY, 1)]
+        plan = plan_redistribution(tasks, days, [(1, 2)])
+        self.assertEqual(plan.broken_dependencies, [(1, 2)])
+        self.assertEqual(plan.moves, [])
+
+    def test_random_plans_respect_dependencies(self):
+        rng = random.Random(43)
+        all_days = work_day_capacities(None, TODAY, TODAY + timedelta(days=60))
+        for _ in range(60):
+            tasks = []
+            for phase_id in range(1, 4):
+                deadline = TODAY + timedelta(days=rng.randint(10, 60))
+                current = sorted(TODAY + timedelta(days=rng.randint(-5, 40)) for _ in range(rng.randint(1, 15)))
+                tasks.extend(TaskSlot(phase_id * 100 + i, phase_id, phase_id, deadline, day, i)
+                             for i, day in enumerate(current))
+            ids = [task.task_id for task in tasks]
+            # Edges from earlier to later ids only, so the graph is acyclic
+            edges = {tuple(sorted(rng.sample(ids, 2))) for _ in range(len(ids) // 2)}
+            plan = plan_redistribution(tasks, all_days, edges)
+
+            moved = {move.task_id: move.new_date for move in plan.moves}
+            dates = {task.task_id: moved.get(task.task_id, task.current_date) for task in tasks}
+            deadlines = {task.task_id: task.deadline for task in tasks}
+            for prerequisite, dependent in edges:
+                if (prerequisite, dependent) not in plan.broken_dependencies:
+                    self.assertLess(dates[prerequisite], dates[dependent])
+            for task_id, day in dates.items():
+                if task_id not in plan.unplaced:
+                    self.assertLessEqual(day, deadlines[task_id])
+
+
+class TestDependencyTracking(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        dependencies.clear_cache()
+
+        self.today = date.today()
+        student = Student(name="Deps", email="deps@example.com", password_hash=generate_password_hash("password"),
+                          onboarded=True, is_multi_phase=True,
+                          work_days='{"monday": "light", "tuesday": "light", "wednesday": "light", '
+                                    '"thursday": "light", "friday": "light"}')
+        db.session.add(student)
+        db.session.flush()
+        self.phase = ProjectPhase(student_id=student.id, phase_type='irb_proposal', phase_name='IRB Proposal',
+                                  deadline=self.today + timedelta(days=60), order_index=1)
+        db.session.add(self.phase)
+        db.session.commit()
+        self.student_id = student.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        dependencies.clear_cache()
+
+    def test_generated_tasks_follow_prerequisites(self):
+        work_days = {'monday': 'heavy', 'tuesday': 'heavy'}
+        tasks = PhaseTaskGenerator.generate_tasks_for_phase(self.phase, work_days)
+        by_description = {task.task_description: task.date for task in tasks}
+        for (phase_type, description), prerequisites in PHASE_DEPENDENCY_RULES.task_prerequisites.items():
+            if phase_type != 'irb_proposal':
+                continue
+            for prerequisite_type, prerequisite in prerequisites:
+                if prerequisite_type == 'irb_proposal':
+                    self.assertLess(by_description[prerequisite], by_description[description])
+
+    def test_versions_and_incremental_cache(self):
+        student = db.session.get(Student, self.student_id)
+        version = student.schedule_version
+        PhaseTaskGenerator.create_and_save_tasks_for_phase(self.phase, student.work_days)
+        self.assertEqual(student.schedule_version, version + 1)
+
+        graph = dependencies.student_critical_path(student, self.today)
+        task = PhaseTask.query.filter_by(task_description="Submit IRB application").one()
+        task.date = task.date + timedelta(days=7)
+        db.session.commit()
+
+        self.assertEqual(student.schedule_version, version + 2)
+        self.assertIs(dependencies.student_critical_path(student, self.today), graph)
+        self.assertEqual(graph.dates[task.id], task.date)
+        finalize = PhaseTask.query.filter_by(task_description="Finalize all compliance documentation").one()
+        self.assertGreater(graph.earliest_start[finalize.id], task.date)
+
+        # Anything more than a move rebuilds the graph
+        task.completed = True
+        db.session.commit()
+        self.assertIsNot(dependencies.student_critical_path(student, self.today), graph)
+
+    def test_rollback_keeps_version(self):
+        student = db.session.get(Student, self.student_id)
+        version = student.schedule_version
+        self.phase.deadline = self.phase.deadline + timedelta(days=1)
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(db.session.get(Student, self.student_id).schedule_version, version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the daily digest email job
+"""
+
+import unittest
+import os
+import shutil
+import smtplib
+import sys
+import tempfile
+from datetime import date, timedelta
+from email import message_from_bytes
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import app, db, PhaseTask, ProjectPhase, ScheduleItem, Student, build_email
+from digest import DigestSender, iter_digests, run_digest
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+
+
+class FakeSMTP:
+    """Records messages; optionally drops the connection on the first send"""
+
+    instances = []
+
+    def __init__(self, disconnect_first=False):
+        self.sent = []
+        self.disconnect_first = disconnect_first
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def send_message(self, msg):
+        if self.disconnect_first:
+            self.disconnect_first = False
+            raise smtplib.SMTPServerDisconnected("idle timeout")
+        self.sent.append(msg)
+
+    def quit(self):
+        self.closed = True
+
+
+class TestDigestSender(unittest.TestCase):
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        FakeSMTP.instances = []
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_reuses_one_connection_at_bounded_rate(self):
+        clock = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        with patch('app.open_smtp_connection', side_effect=FakeSMTP):
+            with DigestSender(rate=4, sleep=sleep, clock=lambda: clock[0]) as sender:
+                for i in range(5):
+                    self.assertEqual(sender.send(build_email(f"s{i}@example.com", "Hi", "Body"), "x.eml"), 'sent')
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 5)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertEqual(sleeps, [0.25] * 4)
+
+    def test_reconnects_once_after_disconnect(self):
+        connections = iter([FakeSMTP(disconnect_first=True), FakeSMTP()])
+        with patch('app.open_smtp_connection', side_effect=lambda: next(connections)):
+            with DigestSender(rate=0) as sender:
+                self.assertEqual(sender.send(build_email("a@example.com", "Hi", "Body"), "a.eml"), 'sent')
+                self.assertEqual(sender.send(build_email("b@example.com", "Hi", "Body"), "b.eml"), 'sent')
+
+        self.assertEqual([len(c.sent) for c in FakeSMTP.instances], [0, 2])
+
+
+class TestDailyDigest(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        self.output_dir = tempfile.mkdtemp()
+
+        self.multi = Student(name="Multi <Student>", email="multi@example.com",
+                             password_hash=generate_password_hash("password"),
+                             onboarded=True, is_multi_phase=True)
+        self.legacy = Student(name="Legacy Student", email="legacy@example.com",
+                              password_hash=generate_password_hash("password"),
+                              onboarded=True, is_multi_phase=False,
+                              lit_review_deadline=TODAY + timedelta(days=30))
+        self.idle = Student(name="Idle Student", email="idle@example.com",
+                            password_hash=generate_password_hash("password"), onboarded=True)
+        db.session.add_all([self.multi, self.legacy, self.idle])
+        db.session.flush()
+
+        lit = ProjectPhase(student_id=self.multi.id, phase_type='literature_review',
+                           phase_name='Literature Review', deadline=TODAY - timedelta(days=1), order_index=0)
+        methods = ProjectPhase(student_id=self.multi.id, phase_type='methods_planning',
+                               phase_name='Methods Planning', deadline=TODAY + timedelta(days=10), order_index=1)
+        db.session.add_all([lit, methods])
+        db.session.flush()
+        db.session.add_all([
+            PhaseTask(phase_id=methods.id, date=TODAY, task_description="Draft sampling plan"),
+            PhaseTask(phase_id=methods.id, date=TODAY, task_description="Done already", completed=True),
+            PhaseTask(phase_id=lit.id, date=TODAY - timedelta(days=3), task_description="Late 1"),
+            PhaseTask(phase_id=lit.id, date=TODAY - timedelta(days=2), task_description="Late 2"),
+            ScheduleItem(student_id=self.legacy.id, date=TODAY, task_description="Read two articles")
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_digest_contents(self):
+        digests = {d.email: d for d in iter_digests(TODAY, chunk_size=2)}
+
+        self.assertNotIn("idle@example.com", digests)
+        multi = digests["multi@example.com"]
+        self.assertEqual([t.description for t in multi.today_tasks], ["Draft sampling plan"])
+        self.assertEqual(multi.overdue_count, 2)
+        self.assertEqual(multi.next_deadline, ("Methods Planning", TODAY + timedelta(days=10)))
+        legacy = digests["legacy@example.com"]
+        self.assertEqual(legacy.today_tasks[0].description, "Read two articles")
+        self.assertEqual(legacy.next_deadline.name, "Literature Review")
+
+    def test_query_count_is_per_chunk(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            list(iter_digests(TODAY, chunk_size=500))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        # One chunk of students, five grouped queries, and the empty next page
+        self.assertEqual(len(statements), 7)
+
+    def test_dry_run_writes_eml_files(self):
+        summary = run_digest(TODAY, dry_run=True, output_dir=self.output_dir)
+
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual(summary['messages'], 2)
+        files = sorted(os.listdir(summary['output_dir']))
+        self.assertEqual(files, [f"{self.multi.id}.eml", f"{self.legacy.id}.eml"])
+
+        with open(os.path.join(summary['output_dir'], f"{self.multi.id}.eml"), 'rb') as handle:
+            msg = message_from_bytes(handle.read())
+        self.assertEqual(msg['To'], "multi@example.com")
+        text, html = [part.get_payload(decode=True).decode() for part in msg.get_payload()]
+        self.assertIn("Draft sampling plan (Methods Planning)", text)
+        self.assertIn("Overdue tasks: 2", text)
+        self.assertIn("Multi &lt;Student&gt;", html)
+
+    def test_rerun_skips_students_already_sent(self):
+        class FailForLegacy(FakeSMTP):
+            def send_message(self, msg):
+                if msg['To'] == "legacy@example.com":
+                    raise smtplib.SMTPException("temporary failure")
+                super().send_message(msg)
+
+        with patch.dict(app.config, {'MAIL_ENABLED': True, 'DIGEST_RATE_LIMIT': 0}):
+            with patch('app.open_smtp_connection', side_effect=FailForLegacy):
+                first = run_digest(TODAY)
+            with patch('app.open_smtp_connection', side_effect=FakeSMTP):
+                second = run_digest(TODAY)
+                third = run_digest(TODAY)
+                tomorrow = run_digest(TODAY + timedelta(days=1))
+
+        self.assertEqual((first['messages'], first['failed']), (1, 1))
+        self.assertEqual((second['messages'], second['already_sent']), (1, 1))
+        self.assertEqual([msg['To'] for msg in FakeSMTP.instances[-2].sent], ["legacy@example.com"])
+        self.assertEqual((third['messages'], third['already_sent']), (0, 2))
+        self.assertEqual((tomorrow['messages'], tomorrow['already_sent']), (2, 0))
+
+    def test_disabled_without_mail(self):
+        with patch.dict(app.config, {'MAIL_ENABLED': False}):
+            self.assertEqual(run_digest(TODAY)['status'], 'disabled')
+
+
+if __name__ == '__main__':
+    unittest.main()
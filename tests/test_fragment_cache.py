@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the template fragment cache
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db, PhaseTask, ProjectPhase, Student
+import fragment_cache
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+
+
+class TestLRUBackend(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        backend = fragment_cache.LRUBackend(2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (1, None, 3))
+        self.assertEqual(len(backend), 2)
+
+
+class TestCacheTag(unittest.TestCase):
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        fragment_cache.clear_cache()
+        self.renders = 0
+        self.template = app.jinja_env.from_string(
+            "{% cache 'counter' %}<b>{{ render() }}</b>{{ note }}{% endcache %}")
+
+    def tearDown(self):
+        fragment_cache.clear_cache()
+        self.app_context.pop()
+
+    def render(self, student, today=TODAY, note=''):
+        def count():
+            self.renders += 1
+            return self.renders
+        return self.template.render(student=student, today=today, render=count, note=note)
+
+    def test_keyed_by_student_version_and_date(self):
+        student = SimpleNamespace(id=1, schedule_version=4, created_at=None)
+        self.assertEqual(self.render(student, note='<i>'), "<b>1</b>&lt;i&gt;")
+        self.assertEqual(self.render(student), "<b>1</b>&lt;i&gt;")
+
+        student.schedule_version = 5
+        self.assertEqual(self.render(student), "<b>2</b>")
+        self.assertEqual(self.render(student, today=TODAY + timedelta(days=1)), "<b>3</b>")
+        self.assertEqual(self.render(SimpleNamespace(id=2, schedule_version=5, created_at=None)), "<b>4</b>")
+        # A new student reusing a deleted student's id
+        self.assertEqual(self.render(SimpleNamespace(id=2, schedule_version=5, created_at=datetime(2025, 1, 1))),
+                         "<b>5</b>")
+
+    def test_renders_every_time_without_a_student(self):
+        self.assertEqual(self.render(None), "<b>1</b>")
+        self.assertEqual(self.render(None), "<b>2</b>")
+
+
+class TestCachedPages(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        fragment_cache.clear_cache()
+
+        student = Student(name="Fragment User", email="fragment@example.com",
+                          password_hash=generate_password_hash("password"), onboarded=True, is_multi_phase=True)
+        db.session.add(student)
+        db.session.flush()
+        today = date.today()
+        for order, phase_type in enumerate(('literature_review', 'research_question'), start=1):
+            phase = ProjectPhase(student_id=student.id, phase_type=phase_type,
+                                 phase_name=phase_type.replace('_', ' ').title(),
+                                 deadline=today + timedelta(days=30 * order), order_index=order)
+            db.session.add(phase)
+            db.session.flush()
+            db.session.add_all([PhaseTask(phase_id=phase.id, date=today + timedelta(days=i),
+                                          task_description=f"Task {i}") for i in range(4)])
+        db.session.commit()
+        self.client.post('/login', data={'email': "fragment@example.com", 'password': "password"})
+
+    def tearDown(self):
+        fragment_cache.clear_cache()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, path):
+        # The test's app context (and the logged-in user) outlives the request
+        db.session.expire_all()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # Reads may go to the read-only engine
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.get(path)
+        finally:
+            event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True), len(statements)
+
+    def test_repeat_views_skip_cached_blocks(self):
+        for path in ('/dashboard', '/timeline'):
+            first, first_queries = self.get(path)
+            second, second_queries = self.get(path)
+            self.assertEqual(first, second)
+            self.assertLess(second_queries, first_queries)
+
+    def test_schedule_change_rerenders(self):
+        self.get('/dashboard')
+        self.assertIn("0/8 tasks", self.get('/dashboard')[0])
+
+        task = PhaseTask.query.first()
+        task.completed = True
+        db.session.commit()
+
+        self.assertIn("1/8 tasks", self.get('/dashboard')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unit tests for live update events and the event server
+"""
+
+import unittest
+import os
+import asyncio
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, PhaseTask, ProgressLog, ProjectPhase, Student
+import change_tracking
+import live_events
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+
+
+class TestLiveEvents(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['LIVE_EVENTS_URL'] = '/events'
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        student = Student(name="Live User", email="live@example.com",
+                          password_hash=generate_password_hash("password"), onboarded=True, is_multi_phase=True)
+        db.session.add(student)
+        db.session.flush()
+        phase = ProjectPhase(student_id=student.id, phase_type='literature_review', phase_name='Literature Review',
+                             deadline=TODAY + timedelta(days=30), order_index=1)
+        db.session.add(phase)
+        db.session.flush()
+        db.session.add(PhaseTask(phase_id=phase.id, date=TODAY, task_description="Read"))
+        db.session.commit()
+        self.student_id = student.id
+        self.version = student.schedule_version
+
+    def tearDown(self):
+        app.config['LIVE_EVENTS_URL'] = None
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def complete_task(self):
+        PhaseTask.query.first().completed = True
+        db.session.commit()
+
+    def session_cookie(self):
+        client = app.test_client()
+        client.post('/login', data={'email': "live@example.com", 'password': "password"})
+        return f"session={client.get_cookie('session').value}"
+
+    def test_changes_record_events(self):
+        start = live_events.latest_event_id()
+        self.complete_task()
+        db.session.add(ProgressLog(student_id=self.student_id, date=TODAY, tasks_completed='[]'))
+        db.session.commit()
+        change_tracking.bump_schedule_versions([self.student_id])
+        db.session.commit()
+
+        self.assertEqual([(kind, version) for _, student_id, kind, version in live_events.events_after(start)],
+                         [('schedule', self.version + 1), ('progress', None), ('schedule', self.version + 2)])
+
+        app.config['LIVE_EVENTS_URL'] = None
+        self.complete_task()
+        PhaseTask.query.first().completed = False
+        db.session.commit()
+        self.assertEqual(len(live_events.events_after(start)), 3)
+
+    def test_session_student_id(self):
+        cookie = self.session_cookie()
+        self.assertEqual(live_events.session_student_id(app, cookie), self.student_id)
+        self.assertIsNone(live_events.session_student_id(app, cookie[:-3] + "abc"))
+        self.assertIsNone(live_events.session_student_id(app, None))
+
+    def test_pages_connect_after_the_latest_event(self):
+        client = app.test_client()
+        client.post('/login', data={'email': "live@example.com", 'password': "password"})
+        self.complete_task()
+        latest = live_events.latest_event_id()
+
+        for page in ('/dashboard', '/remaining_tasks'):
+            html = client.get(page).get_data(as_text=True)
+            self.assertIn(f"let lastEventId = {latest};", html, page)
+            self.assertIn("after=", html, page)
+
+        app.config['LIVE_EVENTS_URL'] = None
+        self.assertNotIn("lastEventId", client.get('/dashboard').get_data(as_text=True))
+
+    def test_server_replays_events_after_the_page(self):
+        cookie = self.session_cookie()
+        rendered_at = live_events.latest_event_id()
+        # Written between the page render and the stream connecting
+        self.complete_task()
+
+        async def scenario():
+            server = live_events.EventServer(app, poll_interval=0.02, heartbeat=0.2)
+            await server.start('127.0.0.1', 0)
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writer.write(f"GET /events?after={rendered_at} HTTP/1.1\r\nHost: test\r\n"
+                             f"Cookie: {cookie}\r\n\r\n".encode())
+                await writer.drain()
+                await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+                event = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+                writer.close()
+                return event
+            finally:
+                await server.close()
+
+        event = asyncio.run(scenario())
+
+        self.assertIn(f"id: {rendered_at + 1}".encode(), event)
+        self.assertIn(f'"version": {self.version + 1}'.encode(), event)
+
+    def test_server_streams_student_events(self):
+        cookie = self.session_cookie()
+
+        async def scenario():
+            server = live_events.EventServer(app, poll_interval=0.02, heartbeat=0.2)
+            await server.start('127.0.0.1', 0)
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writer.write(f"GET /events HTTP/1.1\r\nHost: test\r\nCookie: {cookie}\r\n\r\n".encode())
+                await writer.drain()
+                head = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+
+                # The change is made by another "worker" and reaches the stream through the table
+                await asyncio.get_running_loop().run_in_executor(None, self.write_in_thread)
+                event = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+                while event.startswith(b':'):
+                    event = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+                writer.close()
+
+                stranger, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writer.write(b"GET /events HTTP/1.1\r\nHost: test\r\n\r\n")
+                await writer.drain()
+                refused = await asyncio.wait_for(stranger.read(), 5)
+                writer.close()
+
+                # Closed streams are noticed at the next heartbeat at the latest
+                for _ in range(50):
+                    if not server.connections():
+                        break
+                    await asyncio.sleep(0.05)
+                return head, event, refused, server.connections()
+            finally:
+                await server.close()
+
+        head, event, refused, connections = asyncio.run(scenario())
+
+        self.assertIn(b"200 OK", head)
+        self.assertIn(b"text/event-stream", head)
+        self.assertIn(b"event: schedule", event)
+        self.assertIn(f'"version": {self.version + 1}'.encode(), event)
+        self.assertTrue(refused.startswith(b"HTTP/1.1 401"))
+        self.assertEqual(connections, 0)
+
+    def write_in_thread(self):
+        with app.app_context():
+            try:
+                self.complete_task()
+            finally:
+                db.session.remove()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-worker memory tracking
+"""
+
+import unittest
+import os
+import sys
+import tracemalloc
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from memory_tracker import MemoryTracker, current_rss_bytes
+
+_leak = []
+
+
+def leaky_handler():
+    _leak.append(bytearray(64 * 1024))
+
+
+class TestMemoryTracker(unittest.TestCase):
+    def tearDown(self):
+        _leak.clear()
+        tracemalloc.stop()
+
+    def test_current_rss_bytes(self):
+        rss = current_rss_bytes()
+        self.assertIsNotNone(rss)
+        self.assertGreater(rss, 0)
+
+    def test_growth_site_is_reported(self):
+        tracker = MemoryTracker(snapshot_every=20, rss_every=5)
+        tracker.ensure_started()
+
+        for _ in range(40):
+            leaky_handler()
+            tracker.record_request()
+
+        report = tracker.report(top=5)
+
+        self.assertEqual(report['requests'], 40)
+        self.assertTrue(report['tracing'])
+        self.assertGreaterEqual(len(report['rss_history']), 8)
+        self.assertEqual(report['rss_history'][-1]['requests'], 40)
+
+        top_site = report['top_growth_since_baseline'][0]
+        self.assertIn('test_memory_tracker.py', top_site['site'])
+        self.assertGreaterEqual(top_site['size_diff_bytes'], 40 * 64 * 1024)
+
+    def test_no_growth_without_second_snapshot(self):
+        tracker = MemoryTracker(snapshot_every=1000)
+        tracker.ensure_started()
+
+        report = tracker.report()
+
+        self.assertEqual(report['top_growth_since_baseline'], [])
+        self.assertEqual(report['top_growth_since_previous'], [])
+
+
+class TestMemoryEndpoints(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        self.app = app
+        self.saved_config = {key: app.config.get(key) for key in ('ADMIN_TOKEN', 'MEMORY_TRACKING_ENABLED')}
+        app.config['TESTING'] = True
+        app.config['ADMIN_TOKEN'] = 'admin-secret'
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.app.config.update(self.saved_config)
+        tracemalloc.stop()
+
+    def test_report_requires_token(self):
+        self.assertEqual(self.client.get('/admin/memory').status_code, 403)
+
+    def test_report_when_disabled(self):
+        self.app.config['MEMORY_TRACKING_ENABLED'] = False
+        response = self.client.get('/admin/memory', headers={'X-Admin-Token': 'admin-secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_snapshot_and_report(self):
+        self.app.config['MEMORY_TRACKING_ENABLED'] = True
+        headers = {'X-Admin-Token': 'admin-secret'}
+
+        self.client.get('/login')
+        response = self.client.post('/admin/memory/snapshot', headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['pid'], os.getpid())
+        self.assertIn('top_growth_since_baseline', data)
+        self.assertGreater(len(data['rss_history']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
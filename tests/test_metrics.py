@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the metrics registry and /metrics endpoint
+"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.requests = Counter('test_requests_total', 'Requests', ('route',), registry=self.registry)
+        self.latency = Histogram('test_latency_seconds', 'Latency', ('route',),
+                                 buckets=(0.1, 1.0), registry=self.registry)
+        self.in_use = Gauge('test_in_use', 'In use', registry=self.registry)
+
+    def tearDown(self):
+        os.environ.pop(metrics.MULTIPROC_DIR_ENV, None)
+
+    def test_render_counter_and_gauge(self):
+        self.requests.inc(route='/dashboard')
+        self.requests.inc(2, route='/dashboard')
+        self.in_use.inc()
+
+        output = self.registry.render()
+
+        self.assertIn('# TYPE test_requests_total counter', output)
+        self.assertIn('test_requests_total{route="/dashboard"} 3', output)
+        self.assertIn('test_in_use 1', output)
+
+    def test_render_histogram_buckets_are_cumulative(self):
+        self.latency.observe(0.05, route='/timeline')
+        self.latency.observe(0.5, route='/timeline')
+        self.latency.observe(5.0, route='/timeline')
+
+        output = self.registry.render()
+
+        self.assertIn('test_latency_seconds_bucket{route="/timeline",le="0.1"} 1', output)
+        self.assertIn('test_latency_seconds_bucket{route="/timeline",le="1.0"} 2', output)
+        self.assertIn('test_latency_seconds_bucket{route="/timeline",le="+Inf"} 3', output)
+        self.assertIn('test_latency_seconds_count{route="/timeline"} 3', output)
+        self.assertIn('test_latency_seconds_sum{route="/timeline"} 5.55', output)
+
+    def test_wrong_labels_rejected(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(path='/dashboard')
+
+    def test_counter_cannot_decrease(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(-1, route='/dashboard')
+
+    def test_label_values_are_escaped(self):
+        self.requests.inc(route='a"b')
+        self.assertIn('test_requests_total{route="a\\"b"} 1', self.registry.render())
+
+    def test_multiprocess_samples_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ[metrics.MULTIPROC_DIR_ENV] = directory
+
+            # Another worker's samples, as written by its own flush()
+            other_worker = {
+                'test_requests_total': {'type': 'counter', 'samples': [[['/dashboard'], 4]]},
+                'test_latency_seconds': {'type': 'histogram',
+                                         'samples': [[['/timeline'], [[1, 0, 0], 0.05, 1]]]},
+                'test_in_use': {'type': 'gauge', 'samples': [[[], 2]]},
+            }
+            with open(os.path.join(directory, 'worker_999999.json'), 'w') as handle:
+                json.dump(other_worker, handle)
+
+            self.requests.inc(route='/dashboard')
+            self.latency.observe(0.05, route='/timeline')
+
+            output = self.registry.render()
+
+            self.assertIn('test_requests_total{route="/dashboard"} 5', output)
+            self.assertIn('test_latency_seconds_count{route="/timeline"} 2', output)
+            self.assertIn('test_in_use 2', output)
+
+            # A dead worker keeps its counters but loses its gauges
+            metrics.mark_process_dead(999999)
+            output = self.registry.render()
+            self.assertIn('test_requests_total{route="/dashboard"} 5', output)
+            self.assertNotIn('test_in_use 2', output)
+
+    def test_flush_thread_writes_idle_samples(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ[metrics.MULTIPROC_DIR_ENV] = directory
+            path = os.path.join(directory, f"worker_{os.getpid()}.json")
+            self.registry.start_flusher(interval=0.02)
+            try:
+                # Recorded after the last request: only the thread writes it
+                self.requests.inc(3, route='/dashboard')
+                for _ in range(100):
+                    if os.path.exists(path):
+                        with open(path) as handle:
+                            if json.load(handle)['test_requests_total']['samples']:
+                                break
+                    time.sleep(0.02)
+            finally:
+                self.registry.stop_flusher()
+
+            with open(path) as handle:
+                self.assertEqual(json.load(handle)['test_requests_total']['samples'], [[['/dashboard'], 3]])
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_metrics_endpoint_reports_requests(self):
+        self.client.get('/login')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('paperpacer_http_requests_total{method="GET",route="/login",status="200"}', body)
+        self.assertIn('paperpacer_db_request_duration_seconds_count{route="/login"}', body)
+        self.assertIn('# TYPE paperpacer_emails_total counter', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
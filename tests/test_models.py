@@ -9,7 +9,7 @@ import tempfile
 import os
 from datetime import datetime, date, timedelta
 
-from app import app, db, Student, ProjectPhase, PhaseTask, PhaseType, PhaseManager, PHASE_TEMPLATES
+from app import app, db, Student, ProjectPhase, PhaseTask, PhaseType, PhaseManager, PHASE_TEMPLATES, ProgressLog, ScheduleItem
 
 class TestMultiPhaseModels(unittest.TestCase):
     
@@ -420,6 +420,37 @@ class TestMultiPhaseModels(unittest.TestCase):
         self.assertEqual(progress['progress_percentage'], 66.7)
         self.assertFalse(progress['is_complete'])
         self.assertEqual(progress['phase'], phase)
+    
+    def test_student_recent_progress_logs(self):
+        """Test recent_progress_logs returns only the latest logs, oldest first"""
+        for offset in range(8):
+            db.session.add(ProgressLog(
+                student_id=self.student.id,
+                date=date.today() - timedelta(days=8 - offset),
+                tasks_completed="[]",
+                notes=f"Log {offset}"
+            ))
+        db.session.commit()
+        
+        recent = self.student.recent_progress_logs(5)
+        
+        self.assertEqual([log.notes for log in recent], [f"Log {i}" for i in range(3, 8)])
+        self.assertEqual(self.student.recent_progress_logs(20)[0].notes, "Log 0")
+    
+    def test_student_schedule_item_counts(self):
+        """Test schedule_item_counts counts in SQL"""
+        self.assertEqual(self.student.schedule_item_counts(), {'total': 0, 'completed': 0})
+        
+        for i in range(4):
+            db.session.add(ScheduleItem(
+                student_id=self.student.id,
+                date=date.today() + timedelta(days=i),
+                task_description=f"Task {i}",
+                completed=i % 2 == 0
+            ))
+        db.session.commit()
+        
+        self.assertEqual(self.student.schedule_item_counts(), {'total': 4, 'completed': 2})
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for configurable password hashing and rehash on login
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, Student
+import passwords
+from werkzeug.security import generate_password_hash
+
+FAST = 'pbkdf2:sha256:1000'
+FASTER = 'pbkdf2:sha256:500'
+
+
+class TestPasswordHelpers(unittest.TestCase):
+    def test_method_prefix_fills_in_defaults(self):
+        self.assertEqual(passwords.method_prefix(FAST), FAST)
+        self.assertEqual(passwords.method_prefix('pbkdf2'), 'pbkdf2:sha256:600000')
+        self.assertEqual(passwords.method_prefix('scrypt'), 'scrypt:32768:8:1')
+
+    def test_needs_rehash(self):
+        stored = generate_password_hash("secret", FAST)
+        self.assertFalse(passwords.needs_rehash(stored, FAST))
+        self.assertTrue(passwords.needs_rehash(stored, FASTER))
+        self.assertTrue(passwords.needs_rehash(None, FAST))
+
+    def test_hash_and_verify_in_process_pool(self):
+        with app.app_context(), patch.dict(app.config, {'PASSWORD_HASH_METHOD': FAST,
+                                                        'PASSWORD_HASH_POOL_SIZE': 1}):
+            try:
+                stored = passwords.hash_password("secret")
+                self.assertTrue(stored.startswith(FAST + '$'))
+                self.assertTrue(passwords.verify_password(stored, "secret"))
+                self.assertFalse(passwords.verify_password(stored, "wrong"))
+            finally:
+                passwords.shutdown_pool()
+
+
+class TestRehashOnLogin(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        student = Student(name="Hash User", email="hash@example.com",
+                          password_hash=generate_password_hash("password", FASTER), onboarded=True)
+        db.session.add(student)
+        db.session.commit()
+        self.student_id = student.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def stored_hash(self):
+        db.session.expire_all()
+        return db.session.get(Student, self.student_id).password_hash
+
+    def test_successful_login_upgrades_hash(self):
+        with patch.dict(app.config, {'PASSWORD_HASH_METHOD': FAST}):
+            response = self.client.post('/login', data={'email': 'hash@example.com', 'password': 'password'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(passwords.stored_method(self.stored_hash()), FAST)
+
+        # The upgraded hash still logs in, and is left alone this time
+        upgraded = self.stored_hash()
+        with patch.dict(app.config, {'PASSWORD_HASH_METHOD': FAST}):
+            self.client.get('/logout')
+            self.client.post('/login', data={'email': 'hash@example.com', 'password': 'password'})
+        self.assertEqual(self.stored_hash(), upgraded)
+
+    def test_failed_login_keeps_hash(self):
+        original = self.stored_hash()
+        with patch.dict(app.config, {'PASSWORD_HASH_METHOD': FAST}):
+            self.client.post('/login', data={'email': 'hash@example.com', 'password': 'wrong'})
+
+        self.assertEqual(self.stored_hash(), original)
+
+
+if __name__ == '__main__':
+    unittest.main()
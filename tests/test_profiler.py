@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sampling profiler and its admin endpoints
+"""
+
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profiler import SamplingProfiler, collapse_stack, PROFILE_REQUEST_HEADER, PROFILE_OUTPUT_HEADER
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_collapse_stack_orders_outer_to_inner(self):
+        def inner():
+            return collapse_stack(sys._getframe())
+
+        def outer():
+            return inner()
+
+        stack = outer()
+        names = stack.split(';')
+        self.assertTrue(names[-1].startswith('inner ('))
+        self.assertTrue(names[-2].startswith('outer ('))
+
+    def test_samples_are_aggregated_per_route(self):
+        profiler = SamplingProfiler(interval=0.001, max_overhead=0.5)
+        profiler.enter_route('/timeline')
+        profiler.ensure_started()
+        try:
+            busy_wait(0.2)
+        finally:
+            profiler.exit_route()
+            profiler.stop()
+
+        collapsed = profiler.collapsed()
+        self.assertIn('/timeline;', collapsed)
+        self.assertIn('busy_wait (', collapsed)
+        self.assertGreater(profiler.stats()['samples_per_route']['/timeline'], 0)
+
+        # Idle threads are not sampled
+        profiler.reset()
+        profiler.sample()
+        self.assertEqual(profiler.collapsed(), '')
+
+    def test_speedscope_output(self):
+        profiler = SamplingProfiler()
+        profiler.enter_route('/update_settings')
+        profiler.sample(exclude_ident=-1)
+        profiler.exit_route()
+
+        data = profiler.speedscope()
+        self.assertEqual(len(data['profiles']), 1)
+        profile = data['profiles'][0]
+        self.assertEqual(profile['name'], '/update_settings')
+        self.assertEqual(profile['type'], 'sampled')
+        self.assertEqual(sum(profile['weights']), 1)
+        for index in profile['samples'][0]:
+            self.assertLess(index, len(data['shared']['frames']))
+
+    def test_interval_backs_off_when_over_budget(self):
+        profiler = SamplingProfiler(interval=0.01, max_overhead=0.01, max_interval=0.08)
+        profiler._started_at = time.perf_counter() - 1.0
+        profiler._sampling_time = 0.5  # 50% overhead
+
+        for _ in range(5):
+            profiler._adjust_interval()
+
+        self.assertEqual(profiler.interval, 0.08)
+
+        profiler._sampling_time = 0.0
+        for _ in range(5):
+            profiler._adjust_interval()
+
+        self.assertEqual(profiler.interval, 0.01)
+
+    def test_measured_overhead_stays_within_budget(self):
+        """Sample a busy thread and check the measured overhead against the budget"""
+        profiler = SamplingProfiler(interval=0.005, max_overhead=0.02)
+        worker = threading.Thread(target=lambda: (profiler.enter_route('/busy'), busy_wait(0.5)))
+        worker.start()
+        profiler.ensure_started()
+        worker.join()
+        profiler.stop()
+
+        stats = profiler.stats()
+        self.assertGreater(stats['samples_taken'], 0)
+        # Back-off keeps the long-run overhead bounded near the budget
+        self.assertLess(stats['measured_overhead'], 0.1)
+
+
+class TestProfilerEndpoints(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        self.app = app
+        self.output_dir = tempfile.mkdtemp()
+        self.saved_config = {key: app.config.get(key) for key in ('ADMIN_TOKEN', 'PROFILER_TOKEN', 'PROFILER_OUTPUT_DIR')}
+        app.config['TESTING'] = True
+        app.config['ADMIN_TOKEN'] = 'admin-secret'
+        app.config['PROFILER_TOKEN'] = 'profile-secret'
+        app.config['PROFILER_OUTPUT_DIR'] = self.output_dir
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.app.config.update(self.saved_config)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_admin_endpoint_requires_token(self):
+        self.assertEqual(self.client.get('/admin/profiler').status_code, 403)
+
+        response = self.client.get('/admin/profiler', headers={'X-Admin-Token': 'admin-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('measured_overhead', response.get_json())
+
+    def test_dump_endpoint_returns_speedscope(self):
+        import profiler as profiler_module
+        profiler_module.profiler.enter_route('/timeline')
+        profiler_module.profiler.sample(exclude_ident=-1)
+        profiler_module.profiler.exit_route()
+
+        response = self.client.post('/admin/profiler/dump?format=speedscope&route=/timeline',
+                                    headers={'X-Admin-Token': 'admin-secret'})
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(data['profiles'][0]['name'], '/timeline')
+        self.assertIn(PROFILE_OUTPUT_HEADER, response.headers)
+
+    def test_deep_profile_requires_valid_token(self):
+        response = self.client.get('/login', headers={PROFILE_REQUEST_HEADER: 'wrong'})
+        self.assertNotIn(PROFILE_OUTPUT_HEADER, response.headers)
+
+        response = self.client.get('/login', headers={PROFILE_REQUEST_HEADER: 'profile-secret'})
+        self.assertIn(PROFILE_OUTPUT_HEADER, response.headers)
+        filename = response.headers[PROFILE_OUTPUT_HEADER]
+        self.assertTrue(filename.endswith('.prof'))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, filename)))
+
+
+if __name__ == '__main__':
+    unittest.main()
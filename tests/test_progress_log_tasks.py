@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Unit tests for normalized progress log task storage
+"""
+
+import unittest
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (
+    app, db, MigrationService, PhaseTask, ProgressLog, ProgressLogTask, ProjectPhase, Student
+)
+from werkzeug.security import generate_password_hash
+
+
+class TestProgressLogTasks(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        # Rebuild the schema so the test does not depend on a stale database file
+        db.drop_all()
+        db.create_all()
+
+        self.student = Student(
+            name="Log Task User",
+            email=f"log-tasks-{random.random()}@example.com",
+            password_hash=generate_password_hash("password"),
+            onboarded=True,
+            is_multi_phase=True
+        )
+        db.session.add(self.student)
+        db.session.flush()
+
+        self.phase = ProjectPhase(student_id=self.student.id, phase_type='literature_review',
+                                  phase_name='Literature Review', deadline=date.today() + timedelta(days=30))
+        db.session.add(self.phase)
+        db.session.flush()
+
+        self.phase_tasks = [
+            PhaseTask(phase_id=self.phase.id, date=date.today(), task_description=f"Task {i}")
+            for i in range(3)
+        ]
+        db.session.add_all(self.phase_tasks)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_add_completed_tasks(self):
+        log = ProgressLog(student_id=self.student.id, date=date.today(), tasks_completed='[]')
+        log.add_completed_tasks(['5', 5, 'x', None, 6], is_phase_task=True)
+        db.session.add(log)
+        db.session.commit()
+
+        self.assertEqual(sorted(link.task_id for link in log.completed_task_links), [5, 6])
+        reloaded = db.session.get(ProgressLog, log.id)
+        db.session.refresh(reloaded)
+        self.assertEqual(reloaded.completed_task_count, 2)
+
+    def test_submit_progress_links_only_own_tasks(self):
+        other = Student(name="Other", email=f"other-{random.random()}@example.com", password_hash="x",
+                        onboarded=True, is_multi_phase=True)
+        db.session.add(other)
+        db.session.flush()
+        other_phase = ProjectPhase(student_id=other.id, phase_type='literature_review',
+                                   phase_name='Literature Review', deadline=date.today() + timedelta(days=30))
+        db.session.add(other_phase)
+        db.session.flush()
+        foreign = PhaseTask(phase_id=other_phase.id, date=date.today(), task_description="Not mine")
+        db.session.add(foreign)
+        db.session.commit()
+        mine, foreign_id, email = self.phase_tasks[0].id, foreign.id, self.student.email
+
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+        client.post('/login', data={'email': email, 'password': "password"})
+        client.post('/submit_progress', data={'date': date.today().isoformat(), 'notes': "",
+                                              'completed_tasks': [str(mine), str(foreign_id)]})
+
+        log = ProgressLog.query.filter_by(student_id=self.student.id).one()
+        self.assertEqual([link.task_id for link in log.completed_task_links], [mine])
+        self.assertFalse(db.session.get(PhaseTask, foreign_id).completed)
+
+    def test_task_count_falls_back_to_json_lists(self):
+        log = ProgressLog(student_id=self.student.id, date=date.today(), tasks_completed='["1", "2"]',
+                          phase_tasks_completed='[2, 3]')
+        db.session.add(log)
+        db.session.commit()
+        db.session.refresh(log)
+        self.assertEqual(log.task_count(), 3)
+
+        log.add_completed_tasks([1], is_phase_task=True)
+        db.session.commit()
+        db.session.refresh(log)
+        self.assertEqual(log.task_count(), 1)
+
+    def test_migrate_json_lists(self):
+        ids = [task.id for task in self.phase_tasks]
+        legacy = ProgressLog(student_id=self.student.id, date=date.today(),
+                             tasks_completed=json.dumps([str(ids[0]), str(ids[1])]))
+        tracker = ProgressLog(student_id=self.student.id, date=date.today(), tasks_completed='[]',
+                              phase_id=self.phase.id, phase_tasks_completed=json.dumps([ids[2]]))
+        broken = ProgressLog(student_id=self.student.id, date=date.today(), tasks_completed='not json')
+        db.session.add_all([legacy, tracker, broken])
+        db.session.commit()
+
+        result = MigrationService.migrate_progress_log_tasks(self.student.id, batch_size=2)
+
+        self.assertEqual(result, {'migrated_logs': 2, 'migrated_links': 3})
+        links = ProgressLogTask.query.filter(ProgressLogTask.task_id.in_(ids)).all()
+        self.assertTrue(all(link.is_phase_task for link in links))
+
+        # When was task 2 completed: one indexed lookup instead of decoding every log
+        completed_on = db.session.query(ProgressLog.date).join(ProgressLogTask).filter(
+            ProgressLogTask.task_id == ids[2], ProgressLogTask.is_phase_task.is_(True)
+        ).scalar()
+        self.assertEqual(completed_on, date.today())
+
+        # Re-running does not duplicate links
+        again = MigrationService.migrate_progress_log_tasks(self.student.id)
+        self.assertEqual(again['migrated_links'], 0)
+        self.assertEqual(ProgressLogTask.query.filter(ProgressLogTask.task_id.in_(ids)).count(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for read-only connection routing
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, Student
+import read_routing
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+
+class TestReadUrl(unittest.TestCase):
+    def test_sqlite_file_opens_read_only(self):
+        url = read_routing.read_url(app, make_url('sqlite:////srv/paper pacer/app.db'))
+        self.assertEqual(url.database, 'file:/srv/paper%20pacer/app.db')
+        self.assertEqual((url.query['mode'], url.query['uri']), ('ro', 'true'))
+
+    def test_memory_database_keeps_primary(self):
+        self.assertIsNone(read_routing.read_url(app, make_url('sqlite:///:memory:')))
+        self.assertIsNone(read_routing.read_url(app, make_url('postgresql://db/paperpacer')))
+
+    def test_configured_replica(self):
+        app.config['SQLALCHEMY_READ_DATABASE_URI'] = 'postgresql://replica/paperpacer'
+        try:
+            url = read_routing.read_url(app, make_url('postgresql://db/paperpacer'))
+        finally:
+            app.config['SQLALCHEMY_READ_DATABASE_URI'] = None
+        self.assertEqual(url.host, 'replica')
+
+
+class TestReadRouting(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        self.read_engine = read_routing.read_engine(db)
+        if self.read_engine is None:
+            self.skipTest("No read engine for this database")
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def bind_for_select(self):
+        return db.session.get_bind(clause=select(Student.id))
+
+    def test_get_requests_read_from_read_engine(self):
+        with app.test_request_context('/timeline', method='GET'):
+            app.preprocess_request()
+            self.assertIs(self.bind_for_select(), self.read_engine)
+            self.assertIs(db.session.get_bind(clause=text("SELECT 1")), db.engine)
+
+        with app.test_request_context('/submit_progress', method='POST'):
+            app.preprocess_request()
+            self.assertIs(self.bind_for_select(), db.engine)
+
+    def test_writes_pin_the_transaction_to_primary(self):
+        with read_routing.read_only():
+            self.assertIs(self.bind_for_select(), self.read_engine)
+            db.session.add(Student(name="Pinned", email="pinned@example.com", password_hash="x"))
+            self.assertEqual(Student.query.filter_by(email="pinned@example.com").count(), 1)
+            self.assertIs(self.bind_for_select(), db.engine)
+            db.session.commit()
+            self.assertIs(self.bind_for_select(), self.read_engine)
+        self.assertIs(self.bind_for_select(), db.engine)
+
+    def test_read_engine_cannot_write(self):
+        with self.read_engine.connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.execute(text("INSERT INTO job_lock (name, holder, expires_at) "
+                                        "VALUES ('x', 'y', '2025-01-01')"))
+
+    def test_reads_do_not_wait_for_writer(self):
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("PRAGMA journal_mode")).scalar(), 'wal')
+
+        db.session.add(Student(name="Committed", email="committed@example.com", password_hash="x"))
+        db.session.commit()
+        db.session.close()
+
+        writer = db.engine.raw_connection()
+        try:
+            cursor = writer.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("UPDATE student SET name = 'Uncommitted'")
+            with read_routing.read_only():
+                self.assertEqual(db.session.execute(select(Student.name)).scalar(), "Committed")
+            db.session.close()
+        finally:
+            writer.rollback()
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
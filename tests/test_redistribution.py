@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the cross-phase redistribution engine
+"""
+
+import unittest
+import os
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from redistribution import TaskSlot, plan_redistribution, work_day_capacities
+
+TODAY = date(2025, 3, 3)  # A Monday
+
+
+def final_dates(tasks, plan):
+    moved = {move.task_id: move.new_date for move in plan.moves}
+    return {task.task_id: moved.get(task.task_id, task.current_date) for task in tasks}
+
+
+def feasible(tasks, days):
+    """Hall's condition for nested windows: tasks due by each day fit in the days up to it"""
+    for cutoff in sorted({task.deadline for task in tasks}):
+        due = sum(1 for task in tasks if task.deadline <= cutoff)
+        if due > sum(cap for day, (_, cap) in days.items() if day <= cutoff):
+            return False
+    return True
+
+
+def make_tasks(rng, phases, per_phase):
+    tasks = []
+    task_id = 1
+    for order, (phase_id, deadline) in enumerate(phases):
+        for sequence in range(per_phase):
+            current = TODAY + timedelta(days=rng.randint(-10, (deadline - TODAY).days + 5))
+            tasks.append(TaskSlot(task_id, phase_id, order, deadline, current, sequence))
+            task_id += 1
+    # Sequence follows current date within a phase, as load_student_problem builds it
+    ordered = []
+    for phase_id, _ in phases:
+        phase_tasks = sorted((t for t in tasks if t.phase_id == phase_id), key=lambda t: (t.current_date, t.task_id))
+        ordered.extend(t._replace(sequence=i) for i, t in enumerate(phase_tasks))
+    return ordered
+
+
+class TestWorkDays(unittest.TestCase):
+    def test_intensity_capacities(self):
+        work_days = json.dumps({'monday': 'heavy', 'wednesday': 'light', 'friday': 'none'})
+        days = work_day_capacities(work_days, TODAY, TODAY + timedelta(days=6))
+        self.assertEqual(days, {TODAY: ('heavy', 8), TODAY + timedelta(days=2): ('light', 4)})
+
+    def test_defaults_to_weekdays(self):
+        days = work_day_capacities(None, TODAY, TODAY + timedelta(days=6))
+        self.assertEqual(len(days), 5)
+        self.assertTrue(all(value == ('light', 4) for value in days.values()))
+
+
+class TestPlanRedistribution(unittest.TestCase):
+    def setUp(self):
+        self.days = work_day_capacities(None, TODAY, TODAY + timedelta(days=60))
+
+    def test_valid_schedule_is_left_alone(self):
+        tasks = [TaskSlot(i, 1, 0, TODAY + timedelta(days=30), TODAY + timedelta(days=i), i)
+                 for i in range(5)]  # Monday to Friday
+        plan = plan_redistribution(tasks, self.days)
+        self.assertEqual(plan.moves, [])
+
+    def test_overdue_and_weekend_tasks_move_forward(self):
+        tasks = [
+            TaskSlot(1, 1, 0, TODAY + timedelta(days=30), TODAY - timedelta(days=2), 0),
+            TaskSlot(2, 1, 0, TODAY + timedelta(days=30), TODAY + timedelta(days=5), 1),  # Saturday
+        ]
+        plan = plan_redistribution(tasks, self.days)
+        self.assertEqual({m.task_id: m.new_date for m in plan.moves},
+                         {1: TODAY, 2: TODAY + timedelta(days=7)})
+
+    def test_later_deadline_task_yields_its_day(self):
+        days = {TODAY: ('light', 1), TODAY + timedelta(days=1): ('light', 1)}
+        tasks = [
+            TaskSlot(1, 1, 0, TODAY + timedelta(days=1), TODAY, 0),  # Fine where it is, due later
+            TaskSlot(2, 2, 1, TODAY, TODAY - timedelta(days=1), 0),  # Overdue, due today
+        ]
+        plan = plan_redistribution(tasks, days)
+        dates = final_dates(tasks, plan)
+        self.assertEqual(dates, {1: TODAY + timedelta(days=1), 2: TODAY})
+        self.assertEqual(plan.overbooked_days, [])
+
+    def test_overflow_spreads_instead_of_stacking(self):
+        days = {TODAY: ('light', 1), TODAY + timedelta(days=1): ('light', 1)}
+        tasks = [TaskSlot(i, 1, 0, TODAY + timedelta(days=1), TODAY - timedelta(days=1), i) for i in range(4)]
+        plan = plan_redistribution(tasks, days)
+        dates = list(final_dates(tasks, plan).values())
+        self.assertEqual(dates.count(TODAY), 2)
+        self.assertEqual(dates.count(TODAY + timedelta(days=1)), 2)
+        self.assertEqual(plan.overbooked_days, sorted(days))
+
+    def test_no_days_before_deadline_is_unplaced(self):
+        tasks = [TaskSlot(1, 1, 0, TODAY - timedelta(days=1), TODAY - timedelta(days=3), 0)]
+        plan = plan_redistribution(tasks, self.days)
+        self.assertEqual(plan.unplaced, [1])
+        self.assertEqual(plan.moves, [])
+
+    def test_random_plans_respect_constraints(self):
+        rng = random.Random(40)
+        for _ in range(60):
+            phases = [(pid, TODAY + timedelta(days=rng.randint(3, 45))) for pid in range(1, rng.randint(2, 4))]
+            tasks = make_tasks(rng, phases, rng.randint(1, 25))
+            days = {day: value for day, value in self.days.items() if rng.random() < 0.8}
+            plan = plan_redistribution(tasks, days)
+            dates = final_dates(tasks, plan)
+            by_id = {task.task_id: task for task in tasks}
+
+            # Deadlines hold, and capacity is only exceeded when nothing else fits
+            load = {}
+            for task_id, day in dates.items():
+                if task_id in plan.unplaced:
+                    continue
+                self.assertIn(day, days)
+                self.assertLessEqual(day, by_id[task_id].deadline)
+                load[day] = load.get(day, 0) + 1
+            if feasible([t for t in tasks if t.task_id not in plan.unplaced], days):
+                self.assertEqual(plan.overbooked_days, [])
+                for day, count in load.items():
+                    self.assertLessEqual(count, days[day][1])
+
+            # Order within each phase is kept
+            for phase_id, _ in phases:
+                phase_tasks = sorted((t for t in tasks if t.phase_id == phase_id), key=lambda t: t.sequence)
+                phase_dates = [dates[t.task_id] for t in phase_tasks if t.task_id not in plan.unplaced]
+                self.assertEqual(phase_dates, sorted(phase_dates))
+
+            # The diff only lists real changes
+            for move in plan.moves:
+                self.assertNotEqual(move.old_date, move.new_date)
+
+    def test_realistic_size_is_fast(self):
+        rng = random.Random(41)
+        phases = [(pid, TODAY + timedelta(days=30 * pid)) for pid in range(1, 5)]
+        tasks = make_tasks(rng, phases, 150)
+        days = work_day_capacities(None, TODAY, TODAY + timedelta(days=120))
+
+        started = time.perf_counter()
+        plan_redistribution(tasks, days)
+        self.assertLess(time.perf_counter() - started, 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the remaining tasks view (SQL bucketing and week paging)
+"""
+
+import unittest
+import os
+import re
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import app, db, PhaseTask, ProjectPhase, ScheduleItem, Student, REMAINING_TASKS_WEEKS_PER_PAGE
+from werkzeug.security import generate_password_hash
+
+
+def shows_task(html, description):
+    return re.search(r'>\s*' + re.escape(description) + r'\s*<', html) is not None
+
+
+class TestRemainingTasks(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        self.student = Student(
+            name="Backlog User",
+            email="backlog@example.com",
+            password_hash=generate_password_hash("password"),
+            onboarded=True,
+            is_multi_phase=True
+        )
+        db.session.add(self.student)
+        db.session.flush()
+
+        self.phase = ProjectPhase(student_id=self.student.id, phase_type='literature_review',
+                                  phase_name='Literature Review', deadline=date.today() + timedelta(days=200))
+        db.session.add(self.phase)
+        db.session.commit()
+        self.phase_id = self.phase.id
+
+        self.today = date.today()
+        # Start on a Monday so each week holds exactly seven days
+        self.first_monday = self.today + timedelta(days=7 - self.today.weekday())
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_tasks(self, count, start=None, prefix="Task"):
+        start = start or self.first_monday
+        db.session.add_all([
+            PhaseTask(phase_id=self.phase_id, date=start + timedelta(days=i),
+                      task_description=f"{prefix} {i}", completed=False)
+            for i in range(count)
+        ])
+        db.session.commit()
+
+    def login(self):
+        self.client.post('/login', data={'email': 'backlog@example.com', 'password': 'password'})
+
+    def count_queries(self, path):
+        # Start each request from an empty identity map, as a real request would
+        db.session.remove()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.get(path)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_first_weeks_render_and_later_weeks_load_on_demand(self):
+        weeks = REMAINING_TASKS_WEEKS_PER_PAGE + 3
+        self.add_tasks(7 * weeks, prefix="Upcoming")
+        self.add_tasks(2, start=self.today - timedelta(days=5), prefix="Overdue")
+        self.login()
+
+        response = self.client.get('/remaining_tasks')
+        page = response.get_data(as_text=True)
+
+        self.assertIn(f"Upcoming Tasks ({7 * weeks})", page)
+        self.assertTrue(shows_task(page, "Overdue 0"))
+        last_rendered = 7 * REMAINING_TASKS_WEEKS_PER_PAGE - 1
+        self.assertTrue(shows_task(page, f"Upcoming {last_rendered}"))
+        self.assertFalse(shows_task(page, f"Upcoming {last_rendered + 1}"))
+        self.assertIn('id="load-more-weeks"', page)
+
+        more = self.client.get(f'/remaining_tasks/weeks?offset={REMAINING_TASKS_WEEKS_PER_PAGE}').get_json()
+        self.assertFalse(shows_task(more['html'], f"Upcoming {last_rendered}"))
+        self.assertTrue(shows_task(more['html'], f"Upcoming {last_rendered + 1}"))
+        self.assertTrue(shows_task(more['html'], f"Upcoming {7 * weeks - 1}"))
+        self.assertEqual(more['next_offset'], weeks)
+        self.assertFalse(more['has_more'])
+
+    def test_week_grouping_starts_on_monday(self):
+        self.add_tasks(8)
+        self.login()
+
+        data = self.client.get('/remaining_tasks/weeks?offset=0&limit=2').get_json()
+
+        monday = self.first_monday.strftime('%B %d')
+        next_monday = (self.first_monday + timedelta(days=7)).strftime('%B %d')
+        self.assertIn(f"Week of {monday}", data['html'])
+        self.assertIn(f"Week of {next_monday}", data['html'])
+        self.assertFalse(data['has_more'])
+
+    def test_query_count_does_not_grow_with_backlog(self):
+        self.add_tasks(5)
+        self.login()
+        small = self.count_queries('/remaining_tasks')
+
+        self.add_tasks(25, start=self.today - timedelta(days=30), prefix="Late")
+        large = self.count_queries('/remaining_tasks')
+
+        self.assertEqual(small, large)
+
+    def test_legacy_student(self):
+        self.student.is_multi_phase = False
+        db.session.add_all([
+            ScheduleItem(student_id=self.student.id, date=self.today, task_description="Legacy today"),
+            ScheduleItem(student_id=self.student.id, date=self.first_monday, task_description="Legacy later"),
+            ScheduleItem(student_id=self.student.id, date=self.first_monday, task_description="Legacy done",
+                         completed=True)
+        ])
+        db.session.commit()
+        self.login()
+
+        page = self.client.get('/remaining_tasks').get_data(as_text=True)
+
+        self.assertTrue(shows_task(page, "Legacy today"))
+        self.assertTrue(shows_task(page, "Legacy later"))
+        self.assertFalse(shows_task(page, "Legacy done"))
+        self.assertIn("Upcoming Tasks (1)", page)
+
+
+if __name__ == '__main__':
+    unittest.main()
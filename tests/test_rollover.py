@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the overdue task rollover job and job locks
+"""
+
+import unittest
+import os
+import json
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, JobLock, PhaseTask, ProjectPhase, ScheduleItem, Student
+import job_lock
+from rollover import available_days, plan_rollover, run_rollover
+from werkzeug.security import generate_password_hash
+
+WORK_DAYS = json.dumps({'monday': 'heavy', 'tuesday': 'light', 'wednesday': 'light',
+                        'thursday': 'light', 'friday': 'light'})
+
+# A Monday, so the work week lines up with the dates below
+TODAY = date(2025, 3, 3)
+
+
+class TestPlanRollover(unittest.TestCase):
+    def test_available_days_skip_days_off(self):
+        days = available_days(WORK_DAYS, TODAY, TODAY + timedelta(days=6))
+        self.assertEqual([d for d, _ in days], [TODAY + timedelta(days=i) for i in range(5)])
+        self.assertEqual(days[0][1], 'heavy')
+        self.assertEqual(available_days(None, TODAY, TODAY + timedelta(days=6)), [])
+        self.assertEqual(available_days(WORK_DAYS, TODAY, None), [])
+
+    def test_spreads_by_weight_within_window(self):
+        days = available_days(WORK_DAYS, TODAY, TODAY + timedelta(days=30))
+        plan = plan_rollover(6, days, {}, window_days=5)
+
+        self.assertEqual(sum(count for _, _, count in plan), 6)
+        self.assertTrue(all(day < TODAY + timedelta(days=5) for day, _, _ in plan))
+        self.assertEqual(plan[0], (TODAY, 'heavy', 2))
+
+    def test_extends_past_window_when_full(self):
+        days = available_days(WORK_DAYS, TODAY, TODAY + timedelta(days=30))
+        existing = {day: 8 for day, _ in days[:5]}
+        plan = plan_rollover(3, days, existing, window_days=5)
+
+        self.assertEqual(sum(count for _, _, count in plan), 3)
+        self.assertTrue(all(day >= TODAY + timedelta(days=7) for day, _, _ in plan))
+
+    def test_leaves_excess_when_capacity_runs_out(self):
+        days = [(TODAY, 'light')]
+        self.assertEqual(plan_rollover(10, days, {TODAY: 1}), [(TODAY, 'light', 3)])
+        self.assertEqual(plan_rollover(10, [], {}), [])
+
+
+class TestRolloverJob(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_student(self, email, multi_phase=True):
+        student = Student(name="Rollover User", email=email,
+                          password_hash=generate_password_hash("password"), onboarded=True,
+                          is_multi_phase=multi_phase, work_days=WORK_DAYS,
+                          lit_review_deadline=TODAY + timedelta(days=60))
+        db.session.add(student)
+        db.session.commit()
+        return student
+
+    def test_moves_overdue_tasks_forward(self):
+        student = self.add_student("multi@example.com")
+        phase = ProjectPhase(student_id=student.id, phase_type='literature_review',
+                             phase_name='Literature Review', deadline=TODAY + timedelta(days=60))
+        db.session.add(phase)
+        db.session.flush()
+        db.session.add_all(
+            [PhaseTask(phase_id=phase.id, date=TODAY - timedelta(days=i + 1), task_description=f"Late {i}")
+             for i in range(5)] +
+            [PhaseTask(phase_id=phase.id, date=TODAY - timedelta(days=2), task_description="Done",
+                       completed=True)]
+        )
+        legacy = self.add_student("legacy@example.com", multi_phase=False)
+        db.session.add(ScheduleItem(student_id=legacy.id, date=TODAY - timedelta(days=3),
+                                    task_description="Legacy late"))
+        db.session.commit()
+
+        summary = run_rollover(TODAY, chunk_size=1)
+
+        self.assertEqual(summary['status'], 'ok')
+        self.assertEqual(summary['moved'], 6)
+        self.assertEqual(summary['unplaced'], 0)
+        self.assertEqual(summary['chunks'], 2)
+        self.assertEqual(PhaseTask.query.filter(PhaseTask.completed == False,
+                                                PhaseTask.date < TODAY).count(), 0)
+        self.assertEqual(PhaseTask.query.filter_by(completed=True).one().date, TODAY - timedelta(days=2))
+        self.assertGreaterEqual(ScheduleItem.query.one().date, TODAY)
+        for task in PhaseTask.query.filter_by(completed=False):
+            self.assertEqual(task.day_intensity, 'heavy' if task.date.weekday() == 0 else 'light')
+
+        # Nothing left to move on a second run
+        self.assertEqual(run_rollover(TODAY)['moved'], 0)
+        self.assertEqual(JobLock.query.count(), 0)
+
+    def test_phase_tasks_stay_within_their_phase(self):
+        student = self.add_student("phases@example.com")
+        soon, later, inactive = [
+            ProjectPhase(student_id=student.id, phase_type=phase_type, phase_name=phase_type,
+                         deadline=TODAY + timedelta(days=days), is_active=is_active)
+            for phase_type, days, is_active in (('literature_review', 1, True), ('methodology', 60, True),
+                                                ('research_question', 60, False))
+        ]
+        db.session.add_all([soon, later, inactive])
+        db.session.flush()
+        db.session.add_all([PhaseTask(phase_id=phase.id, date=TODAY - timedelta(days=1), task_description="Late")
+                            for phase, count in ((soon, 15), (later, 10), (inactive, 10)) for _ in range(count)])
+        db.session.commit()
+
+        summary = run_rollover(TODAY)
+
+        # Monday and Tuesday hold 12 of the first phase's 15
+        self.assertEqual((summary['moved'], summary['unplaced']), (22, 3))
+        soon_dates = [t.date for t in PhaseTask.query.filter_by(phase_id=soon.id)]
+        self.assertTrue(all(day <= soon.deadline for day in soon_dates))
+        self.assertEqual(PhaseTask.query.filter(PhaseTask.phase_id == later.id, PhaseTask.date < TODAY).count(), 0)
+        self.assertEqual({t.date for t in PhaseTask.query.filter_by(phase_id=inactive.id)},
+                         {TODAY - timedelta(days=1)})
+
+    def test_skips_when_lock_is_held(self):
+        self.assertTrue(job_lock.acquire('overdue_rollover', 'other-node:1'))
+
+        summary = run_rollover(TODAY)
+
+        self.assertEqual(summary['status'], 'skipped')
+        self.assertEqual(JobLock.query.one().holder, 'other-node:1')
+
+
+class TestJobLock(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_single_holder(self):
+        self.assertTrue(job_lock.acquire('job', 'a'))
+        self.assertFalse(job_lock.acquire('job', 'b'))
+        self.assertTrue(job_lock.renew('job', 'a'))
+        self.assertFalse(job_lock.renew('job', 'b'))
+
+        job_lock.release('job', 'a')
+        self.assertTrue(job_lock.acquire('job', 'b'))
+
+    def test_expired_lease_is_taken_over(self):
+        self.assertTrue(job_lock.acquire('job', 'a', ttl=-1))
+        self.assertTrue(job_lock.acquire('job', 'b'))
+        self.assertFalse(job_lock.renew('job', 'a'))
+
+    def test_context_manager_releases(self):
+        with job_lock.job_lock('job') as holder:
+            self.assertEqual(JobLock.query.one().holder, holder)
+            with self.assertRaises(job_lock.LockNotAcquired):
+                with job_lock.job_lock('job', holder='someone-else'):
+                    pass
+        self.assertEqual(JobLock.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
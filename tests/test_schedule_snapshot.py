@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for compact schedule snapshots
+"""
+
+import unittest
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, PhaseTask, ProjectPhase, Student
+from schedule_coordinator import ScheduleCoordinator
+from schedule_snapshot import INTENSITY_CODES, STATUS_CODES, UNKNOWN, ScheduleSnapshot
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+
+
+class TestScheduleSnapshot(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        student = Student(name="Snapshot", email="snapshot@example.com",
+                          password_hash=generate_password_hash("password"), onboarded=True, is_multi_phase=True)
+        db.session.add(student)
+        db.session.flush()
+        self.student_id = student.id
+        self.phases = [
+            ProjectPhase(student_id=student.id, phase_type='research_question', phase_name='Research Question',
+                         deadline=TODAY + timedelta(days=40), order_index=2),
+            ProjectPhase(student_id=student.id, phase_type='literature_review', phase_name='Literature Review',
+                         deadline=TODAY + timedelta(days=20), order_index=1),
+            ProjectPhase(student_id=student.id, phase_type='irb_proposal', phase_name='IRB Proposal',
+                         deadline=TODAY + timedelta(days=60), order_index=3, is_active=False),
+        ]
+        db.session.add_all(self.phases)
+        db.session.flush()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_tasks(self, phase, offsets, **kwargs):
+        tasks = [PhaseTask(phase_id=phase.id, date=TODAY + timedelta(days=offset),
+                           task_description=f"Task {i}", **kwargs) for i, offset in enumerate(offsets)]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return tasks
+
+    def test_load(self):
+        research, literature, _ = self.phases
+        self.add_tasks(literature, [3, 1, 1], completed=False, status='in_progress', day_intensity='heavy')
+        done = self.add_tasks(literature, [2], completed=True, status='completed')
+        self.add_tasks(research, [5], status='unknown', day_intensity='extreme')
+
+        snapshot = ScheduleSnapshot.load(self.student_id)
+
+        self.assertEqual([p.phase_type for p in snapshot.phases],
+                         ['literature_review', 'research_question', 'irb_proposal'])
+        self.assertEqual([p.phase_type for p in snapshot.active_phases], ['literature_review', 'research_question'])
+        lit = snapshot.phase(literature.id)
+        self.assertEqual((lit.total_tasks, lit.completed_tasks), (4, 1))
+        self.assertEqual(list(snapshot.dates[lit.start:lit.stop]),
+                         [(TODAY + timedelta(days=d)).toordinal() for d in (1, 1, 2, 3)])
+        self.assertEqual(snapshot.task_ids[lit.start + 2], done[0].id)
+        self.assertEqual(snapshot.status[lit.start], STATUS_CODES['in_progress'])
+        self.assertEqual(snapshot.intensity[lit.start], INTENSITY_CODES['heavy'])
+        rq = snapshot.phase(research.id)
+        self.assertEqual((snapshot.status[rq.start], snapshot.intensity[rq.start]), (UNKNOWN, UNKNOWN))
+        self.assertEqual(snapshot.tasks_per_day(literature.id),
+                         {TODAY + timedelta(days=1): 2, TODAY + timedelta(days=2): 1, TODAY + timedelta(days=3): 1})
+        self.assertEqual(snapshot.phase(self.phases[2].id).total_tasks, 0)
+        self.assertIsNone(snapshot.phase(999))
+        self.assertEqual(snapshot.nbytes(), 5 * (8 + 4 + 1 + 1 + 1))
+
+    def test_coordinator_reloads_after_schedule_changes(self):
+        tasks = self.add_tasks(self.phases[1], [1, 2])
+        coordinator = ScheduleCoordinator(self.student_id)
+        snapshot = coordinator.snapshot
+        self.assertIs(coordinator.snapshot, snapshot)
+
+        tasks[0].completed = True
+        db.session.commit()
+        self.assertIsNot(coordinator.snapshot, snapshot)
+        metrics = {m.phase_id: m for m in coordinator.get_phase_metrics()}
+        self.assertEqual(metrics[self.phases[1].id].completed_tasks, 1)
+
+    def test_much_smaller_than_orm_objects(self):
+        for phase in self.phases:
+            self.add_tasks(phase, [i % 90 for i in range(1000)], status='not_started')
+        db.session.remove()
+
+        def retained(load):
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                result = load()
+                return tracemalloc.get_traced_memory()[0] - before, result
+            finally:
+                tracemalloc.stop()
+
+        snapshot_bytes, snapshot = retained(lambda: ScheduleSnapshot.load(self.student_id))
+        db.session.remove()
+        orm_bytes, tasks = retained(lambda: PhaseTask.query.join(ProjectPhase).filter(
+            ProjectPhase.student_id == self.student_id).all())
+
+        self.assertEqual(len(snapshot.task_ids), len(tasks))
+        self.assertLess(snapshot_bytes * 10, orm_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
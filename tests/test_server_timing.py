@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Server-Timing instrumentation
+"""
+
+import unittest
+import json
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+import server_timing
+from server_timing import segment, timed_methods, collect, format_header
+
+
+@timed_methods('service')
+class SlowService:
+    @staticmethod
+    def outer():
+        time.sleep(0.01)
+        return SlowService.inner()
+
+    @staticmethod
+    def inner():
+        time.sleep(0.01)
+        return 'done'
+
+
+class TestServerTiming(unittest.TestCase):
+    def test_format_header(self):
+        header = format_header({'db': 0.0123, 'render': 0.004, 'total': 0.05}, db_queries=3)
+
+        self.assertEqual(
+            header,
+            'db;dur=12.3;desc="SQL (3 queries)", render;dur=4.0;desc="Template rendering", '
+            'total;dur=50.0;desc="Total"'
+        )
+
+    def test_nested_service_calls_are_counted_once(self):
+        with app.test_request_context('/'):
+            self.assertEqual(SlowService.outer(), 'done')
+            service_time = collect()['service']
+
+        # Two 10ms sleeps; counting the nested call twice would give ~30ms
+        self.assertGreaterEqual(service_time, 0.02)
+        self.assertLess(service_time, 0.03 + 0.01)
+
+    def test_segment_outside_request_is_noop(self):
+        with segment('service'):
+            pass
+        self.assertEqual(SlowService.inner(), 'done')
+
+    def test_response_has_server_timing_header(self):
+        client = app.test_client()
+
+        with self.assertLogs('paperpacer.timing', level='INFO') as logs:
+            response = client.get('/login')
+
+        header = response.headers.get('Server-Timing')
+        self.assertIsNotNone(header)
+        self.assertIn('render;dur=', header)
+        self.assertIn('db;dur=', header)
+        self.assertIn('total;dur=', header)
+
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['route'], '/login')
+        self.assertEqual(entry['status'], 200)
+        self.assertGreater(entry['render_ms'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batch task mutation endpoint
+"""
+
+import unittest
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, PhaseTask, ProjectPhase, Student
+from werkzeug.security import generate_password_hash
+
+TODAY = date(2025, 3, 3)
+WORK_DAYS = json.dumps({day: 'light' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                                                 'saturday', 'sunday')})
+
+
+class TestTaskBatch(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        self.tasks = {}
+        for email in ("batch@example.com", "other@example.com"):
+            student = Student(name="Batch User", email=email, password_hash=generate_password_hash("password"),
+                              onboarded=True, is_multi_phase=True, work_days=WORK_DAYS,
+                              lit_review_deadline=TODAY + timedelta(days=60))
+            db.session.add(student)
+            db.session.flush()
+            phase = ProjectPhase(student_id=student.id, phase_type='literature_review', phase_name='Literature Review',
+                                 deadline=TODAY + timedelta(days=30), order_index=1)
+            db.session.add(phase)
+            db.session.flush()
+            tasks = [PhaseTask(phase_id=phase.id, date=TODAY - timedelta(days=i), task_description=f"Task {i}")
+                     for i in range(3)]
+            db.session.add_all(tasks)
+            db.session.flush()
+            self.tasks[email] = [task.id for task in tasks]
+        db.session.commit()
+        self.student = Student.query.filter_by(email="batch@example.com").first()
+        self.version = self.student.schedule_version
+        self.client.post('/login', data={'email': "batch@example.com", 'password': "password"})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def batch(self, operations):
+        response = self.client.post('/api/tasks/batch', json={'operations': operations})
+        # The test's app context (and the logged-in user) outlives the request
+        db.session.expire_all()
+        return response
+
+    def test_applies_operations_in_one_commit(self):
+        first, second, third = self.tasks["batch@example.com"]
+        response = self.batch([
+            {'op': 'complete', 'task_id': first},
+            {'op': 'set_priority', 'task_id': second, 'priority': 'high'},
+            {'op': 'move', 'task_id': second, 'date': '2025-03-10'},
+            {'op': 'delete', 'task_id': third},
+        ])
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(result['success'] for result in data['results']))
+        self.assertEqual((data['results'][2]['date'], data['results'][2]['priority']), ('2025-03-10', 'high'))
+        self.assertEqual(data['version'], self.version + 1)
+
+        self.assertTrue(db.session.get(PhaseTask, first).completed)
+        self.assertEqual(db.session.get(PhaseTask, second).date, date(2025, 3, 10))
+        self.assertIsNone(db.session.get(PhaseTask, third))
+
+    def test_deferrals_count_the_batch_and_bump_once(self):
+        task_ids = self.tasks["batch@example.com"]
+        day = TODAY + timedelta(days=7)
+        results = self.batch(
+            [{'op': 'move', 'task_id': task_id, 'date': day.isoformat()} for task_id in task_ids] +
+            [{'op': 'set_priority', 'task_id': task_ids[0], 'priority': 'low'}] +
+            [{'op': 'set_status', 'task_id': task_id, 'status': 'deferred'} for task_id in task_ids]
+        ).get_json()
+
+        # Light days take two rescheduled tasks; the batch's own moves count
+        self.assertEqual([r['date'] for r in results['results'][-3:]],
+                         [(day + timedelta(days=n)).isoformat() for n in (1, 1, 2)])
+        self.assertEqual(results['version'], self.version + 1)
+        self.assertEqual(db.session.get(Student, self.student.id).schedule_version, self.version + 1)
+
+    def test_reports_failed_operations(self):
+        mine = self.tasks["batch@example.com"][0]
+        theirs = self.tasks["other@example.com"][0]
+        results = self.batch([
+            {'op': 'complete', 'task_id': theirs},
+            {'op': 'set_status', 'task_id': mine, 'status': 'finished'},
+            {'op': 'explode', 'task_id': mine},
+            {'op': 'delete', 'task_id': mine},
+            {'op': 'complete', 'task_id': mine},
+        ]).get_json()['results']
+
+        self.assertEqual([result['success'] for result in results], [False, False, False, True, False])
+        self.assertEqual(results[0]['error'], 'Task not found')
+        self.assertEqual(results[1]['error'], 'Invalid status')
+        self.assertFalse(db.session.get(PhaseTask, theirs).completed)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.client.post('/api/tasks/batch', data='nope').status_code, 400)
+        task_id = self.tasks["batch@example.com"][0]
+        self.assertEqual(self.batch([{'op': 'complete', 'task_id': task_id}] * 201).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the compiled task classifier
+"""
+
+import unittest
+import os
+import random
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from task_classifier import (
+    KeywordMatcher, PRIORITY_RULES, TASK_TYPE_RULES, classify_task_type, keyword_priority
+)
+from app import PHASE_TEMPLATES, PhaseTaskGenerator
+
+
+def reference_task_type(description):
+    """Keyword-by-keyword scan, as the classifier replaced it"""
+    task_lower = description.lower()
+    for task_type, keywords in TASK_TYPE_RULES:
+        if any(keyword in task_lower for keyword in keywords):
+            return task_type
+    return 'general'
+
+
+def reference_priority(description):
+    task_lower = description.lower()
+    for priority, keywords in PRIORITY_RULES:
+        if any(keyword in task_lower for keyword in keywords):
+            return priority
+    return None
+
+
+class TestTaskClassifier(unittest.TestCase):
+    def test_precedence(self):
+        self.assertEqual(classify_task_type("Submit IRB application"), 'documentation')
+        self.assertEqual(classify_task_type("Meet adviser to discuss draft"), 'consultation')
+        self.assertEqual(classify_task_type("Draft outline"), 'writing')
+        self.assertEqual(classify_task_type("Document methodology choices"), 'writing')
+        self.assertEqual(classify_task_type("Research reading list"), 'reading')
+        self.assertEqual(classify_task_type("Take a walk"), 'general')
+
+    def test_overlapping_keywords(self):
+        # 'research' contains 'search'; 'method' sits inside 'document methodology'
+        self.assertEqual(classify_task_type("Research topic"), 'research')
+        self.assertEqual(classify_task_type("Document methodology"), 'writing')
+        self.assertEqual(classify_task_type("Refine method"), 'design')
+
+    def test_keyword_priority(self):
+        self.assertEqual(keyword_priority("Optional: submit early"), 'high')
+        self.assertEqual(keyword_priority("If time, explore related work"), 'low')
+        self.assertIsNone(keyword_priority("Read two articles"))
+
+    def test_matches_reference_on_templates(self):
+        descriptions = [
+            task for template in PHASE_TEMPLATES.values() for task in template['task_templates']
+        ]
+        self.assertGreater(len(descriptions), 0)
+        for description in descriptions:
+            self.assertEqual(classify_task_type(description), reference_task_type(description))
+            self.assertEqual(keyword_priority(description), reference_priority(description))
+
+    def test_matches_reference_on_random_descriptions(self):
+        keywords = [k for _, ks in TASK_TYPE_RULES + PRIORITY_RULES for k in ks]
+        fillers = ['the', 'a', 'notes', 're', 'de', 'sub', 'x', '', ' ']
+        rng = random.Random(7)
+        for _ in range(3000):
+            parts = [rng.choice(keywords + fillers) for _ in range(rng.randint(0, 6))]
+            description = rng.choice(['', ' ']).join(parts)
+            if rng.random() < 0.3:
+                description = description.upper()
+            self.assertEqual(classify_task_type(description), reference_task_type(description),
+                             description)
+            self.assertEqual(keyword_priority(description), reference_priority(description),
+                             description)
+
+    def test_results_are_memoized(self):
+        classify_task_type.cache_clear()
+        for _ in range(5):
+            classify_task_type("Write literature review introduction")
+        info = classify_task_type.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 4)
+
+    def test_same_position_prefers_earlier_rule(self):
+        matcher = KeywordMatcher([('first', ['abc']), ('second', ['ab', 'abcd'])])
+        self.assertEqual(matcher.match('abcd'), 'first')
+        self.assertEqual(matcher.match('ab'), 'second')
+        self.assertIsNone(matcher.match('xyz'))
+
+    def test_generator_priority_falls_back_to_position(self):
+        self.assertEqual(PhaseTaskGenerator._determine_task_priority("Read", 0, 10), 'high')
+        self.assertEqual(PhaseTaskGenerator._determine_task_priority("Read", 5, 10), 'medium')
+        self.assertEqual(PhaseTaskGenerator._determine_task_priority("Bonus reading", 5, 10), 'low')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Unit tests for precompiled task plans
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (
+    LEGACY_ONGOING_TASKS, LEGACY_PLAN, LEGACY_WEEKLY_TASKS, PHASE_PLAN_VERSION, PHASE_PLANS,
+    PHASE_TEMPLATES, PhaseTaskGenerator
+)
+from task_plans import LegacyPlan, compile_task_list, intern_description, plan_version
+
+
+class TestTaskPlans(unittest.TestCase):
+    def test_phase_plans_match_per_task_classification(self):
+        self.assertEqual(set(PHASE_PLANS), set(PHASE_TEMPLATES))
+
+        for phase_type, template in PHASE_TEMPLATES.items():
+            descriptions = template['task_templates']
+            plan = PHASE_PLANS[phase_type]
+            self.assertEqual([task.description for task in plan], descriptions)
+            for index, (task, text) in enumerate(zip(plan, descriptions)):
+                self.assertEqual(task.task_type, PhaseTaskGenerator._determine_task_type(text))
+                self.assertEqual(task.priority,
+                                 PhaseTaskGenerator._determine_task_priority(text, index, len(descriptions)))
+
+    def test_plans_are_immutable(self):
+        plan = PHASE_PLANS['literature_review']
+        self.assertIsInstance(plan, tuple)
+        with self.assertRaises(TypeError):
+            PHASE_PLANS['literature_review'] = ()
+        with self.assertRaises(AttributeError):
+            plan[0].priority = 'low'
+
+    def test_descriptions_are_interned(self):
+        self.assertEqual(intern_description("Same text"), intern_description("Same text"))
+        plan = compile_task_list(["Draft outline", "Read article", "Draft outline"])
+        self.assertEqual(plan[0].description_id, plan[2].description_id)
+        self.assertEqual([task.weight for task in plan], [2, 1, 2])
+
+    def test_legacy_queue(self):
+        queue = LEGACY_PLAN.task_queue(2)
+        expected = ([f"Week 1: {task}" for task in LEGACY_WEEKLY_TASKS[1]] +
+                    [f"Week 2: {task}" for task in LEGACY_WEEKLY_TASKS[2]] +
+                    [f"Ongoing: {task}" for task in LEGACY_ONGOING_TASKS])
+        self.assertEqual([task.description for task in queue], expected)
+        self.assertTrue(all(task.priority == 'medium' for task in queue))
+
+        # Weeks past the table are capped and queues are reused
+        self.assertEqual(len(LEGACY_PLAN.task_queue(30)),
+                         sum(len(tasks) for tasks in LEGACY_WEEKLY_TASKS.values()) + len(LEGACY_ONGOING_TASKS))
+        self.assertIs(LEGACY_PLAN.task_queue(5), LEGACY_PLAN.task_queue(5))
+
+    def test_plan_version(self):
+        self.assertEqual(PHASE_PLAN_VERSION,
+                         plan_version(PHASE_TEMPLATES, LEGACY_WEEKLY_TASKS, LEGACY_ONGOING_TASKS))
+
+        changed = {key: dict(value) for key, value in PHASE_TEMPLATES.items()}
+        changed['irb_proposal']['task_templates'] = ["Submit IRB application"]
+        self.assertNotEqual(PHASE_PLAN_VERSION,
+                            plan_version(changed, LEGACY_WEEKLY_TASKS, LEGACY_ONGOING_TASKS))
+
+    def test_generated_tasks_record_plan_version(self):
+        work_days = {day: 'heavy' for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')}
+        tasks = PhaseTaskGenerator.distribute_tasks_by_intensity(
+            PHASE_PLANS['research_question'], work_days, date.today() + timedelta(days=21), 1
+        )
+
+        self.assertEqual(len(tasks), len(PHASE_TEMPLATES['research_question']['task_templates']))
+        for task in tasks:
+            self.assertEqual(task.plan_version, PHASE_PLAN_VERSION)
+
+    def test_empty_legacy_plan(self):
+        plan = LegacyPlan({}, [])
+        self.assertEqual(plan.task_queue(4), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
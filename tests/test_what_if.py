@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the side-effect-free what-if API
+"""
+
+import unittest
+import os
+import sys
+import json
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import app, db, PhaseTask, ProjectPhase, Student
+import what_if
+from werkzeug.security import generate_password_hash
+
+
+class TestWhatIf(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+        self.today = date.today()
+        student = Student(name="What If", email="whatif@example.com",
+                          password_hash=generate_password_hash("password"),
+                          onboarded=True, is_multi_phase=True,
+                          work_days=json.dumps({day: 'light' for day in what_if.WEEKDAYS}),
+                          thesis_deadline=self.today + timedelta(days=120))
+        db.session.add(student)
+        db.session.flush()
+
+        self.lit = ProjectPhase(student_id=student.id, phase_type='literature_review',
+                                phase_name='Literature Review', deadline=self.today + timedelta(days=40),
+                                order_index=1)
+        self.methods = ProjectPhase(student_id=student.id, phase_type='methods_planning',
+                                    phase_name='Methods Planning', deadline=self.today + timedelta(days=80),
+                                    order_index=2)
+        db.session.add_all([self.lit, self.methods])
+        db.session.flush()
+        db.session.add_all(
+            [PhaseTask(phase_id=self.lit.id, date=self.today + timedelta(days=i + 20), task_description=f"Lit {i}")
+             for i in range(12)] +
+            [PhaseTask(phase_id=self.lit.id, date=self.today - timedelta(days=5), task_description="Done",
+                       completed=True)] +
+            [PhaseTask(phase_id=self.methods.id, date=self.today + timedelta(days=i + 50),
+                       task_description=f"Methods {i}") for i in range(6)]
+        )
+        db.session.commit()
+        self.lit_id, self.methods_id = self.lit.id, self.methods.id
+
+        self.client.post('/login', data={'email': 'whatif@example.com', 'password': 'password'})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def task_dates(self):
+        return sorted((task.id, task.date, task.phase_id) for task in PhaseTask.query.all())
+
+    def test_projection_does_not_write(self):
+        before = self.task_dates()
+        writes = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith('SELECT'):
+                writes.append(statement)
+
+        proposed = (self.today + timedelta(days=7)).isoformat()
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.post('/api/what_if', json={
+                'deadlines': {str(self.lit_id): proposed},
+                'work_days': {'saturday': 'heavy'}
+            })
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(writes, [])
+        self.assertEqual(self.task_dates(), before)
+        self.assertEqual(db.session.get(ProjectPhase, self.lit_id).deadline, self.today + timedelta(days=40))
+
+        data = response.get_json()
+        self.assertGreater(data['tasks_moved'], 0)
+        lit = next(p for p in data['phases'] if p['phase_id'] == self.lit_id)
+        self.assertEqual(lit['deadline'], proposed)
+        self.assertEqual(lit['remaining_tasks'], 12)
+        self.assertIn(lit['criticality'], ('low', 'medium', 'high', 'critical'))
+        self.assertEqual(sum(day['load'] for day in data['days']), 18)
+        self.assertTrue(all(day['date'] <= proposed for day in data['days'] if day['load'] and
+                            day['date'] < (self.today + timedelta(days=50)).isoformat()))
+        self.assertTrue(any(day['intensity'] == 'heavy' for day in data['days']))
+
+    def test_deadline_order_conflicts(self):
+        response = self.client.post('/api/what_if', json={
+            'deadlines': {str(self.lit_id): (self.today + timedelta(days=90)).isoformat()}
+        })
+        conflicts = response.get_json()['conflicts']
+        self.assertEqual(len(conflicts), 1)
+        self.assertIn("Methods Planning", conflicts[0])
+
+    def test_invalid_input(self):
+        for payload in ({'deadlines': {'999': '2030-01-01'}},
+                        {'deadlines': {str(self.lit_id): 'soon'}},
+                        {'work_days': {'funday': 'heavy'}},
+                        {'work_days': {'monday': 'extreme'}}):
+            response = self.client.post('/api/what_if', json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_evaluate_matches_current_schedule_without_changes(self):
+        snapshot = what_if.load_snapshot(db.session.get(Student, db.session.query(Student.id).scalar()))
+        result = what_if.evaluate(snapshot, self.today)
+        self.assertEqual(result['tasks_moved'], 0)
+        self.assertEqual(result['conflicts'], [])
+
+    def test_evaluation_is_fast(self):
+        phases = [what_if.PhaseInfo(pid, f"Phase {pid}", pid, self.today + timedelta(days=30 * pid), 80, 5)
+                  for pid in range(1, 5)]
+        tasks = [what_if.TaskSlot(pid * 100 + i, pid, pid, phase.deadline, self.today + timedelta(days=i % 90), i)
+                 for pid, phase in enumerate(phases, 1) for i in range(75)]
+        snapshot = what_if.WhatIfSnapshot({'monday': 'heavy', 'wednesday': 'light'}, None, phases, tasks)
+
+        started = time.perf_counter()
+        result = what_if.evaluate(snapshot, self.today, {1: self.today + timedelta(days=10)}, {'friday': 'light'})
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual(sum(day['load'] for day in result['days']), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+"""
+What-If Schedule Evaluation for PaperPacer
+
+``/api/what_if`` shows what proposed phase deadlines and work-day intensities
+would do to a student's schedule, without changing anything. The student's
+phases and tasks are read once into an in-memory ``WhatIfSnapshot`` (two
+queries). The redistribution engine (see redistribution.py), honouring task
+dependencies, and the coordinator's criticality rules then run against the
+snapshot. Nothing is added to or changed in the database session.
+
+Evaluation is cheap enough for a settings-page slider to call on every
+change: a few milliseconds for a typical schedule.
+"""
+
+import json
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from dependencies import TaskNode, resolve_edges
+from redistribution import TaskSlot, plan_redistribution, work_day_capacities
+from schedule_coordinator import phase_buffer_days, phase_criticality
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+INTENSITIES = ('none', 'light', 'heavy')
+
+
+class PhaseInfo(NamedTuple):
+    phase_id: int
+    phase_name: str
+    order_index: int
+    deadline: date
+    total_tasks: int
+    completed_tasks: int
+
+
+class WhatIfSnapshot(NamedTuple):
+    """Read-only copy of what a what-if evaluation needs"""
+    work_days: Dict[str, str]
+    thesis_deadline: Optional[date]
+    phases: List[PhaseInfo]
+    tasks: List[TaskSlot]  # Incomplete tasks, deadlines from the current phase deadlines
+    edges: List[Tuple[int, int]] = []  # Dependencies between the tasks (see dependencies.py)
+
+
+def load_snapshot(student) -> WhatIfSnapshot:
+    """Read a multi-phase student's active phases and tasks"""
+    from app import db, PHASE_DEPENDENCY_RULES, PhaseTask, ProjectPhase
+
+    phase_rows = db.session.query(
+        ProjectPhase.id, ProjectPhase.phase_name, ProjectPhase.phase_type, ProjectPhase.order_index,
+        ProjectPhase.deadline
+    ).filter(
+        ProjectPhase.student_id == student.id,
+        ProjectPhase.is_active == True
+    ).order_by(ProjectPhase.order_index, ProjectPhase.id).all()
+    phase_by_id = {row.id: row for row in phase_rows}
+
+    totals = {}
+    completed = {}
+    tasks = []
+    nodes = []
+    sequence = {}
+    task_rows = db.session.query(
+        PhaseTask.id, PhaseTask.phase_id, PhaseTask.date, PhaseTask.completed, PhaseTask.task_description
+    ).filter(
+        PhaseTask.phase_id.in_(list(phase_by_id))
+    ).order_by(PhaseTask.phase_id, PhaseTask.date, PhaseTask.id).all() if phase_rows else []
+    for task_id, phase_id, task_date, is_completed, description in task_rows:
+        totals[phase_id] = totals.get(phase_id, 0) + 1
+        if is_completed:
+            completed[phase_id] = completed.get(phase_id, 0) + 1
+            continue
+        position = sequence.get(phase_id, 0)
+        sequence[phase_id] = position + 1
+        phase = phase_by_id[phase_id]
+        tasks.append(TaskSlot(task_id, phase_id, phase.order_index or 0, phase.deadline, task_date, position))
+        nodes.append(TaskNode(task_id, phase_id, phase.phase_type, description, task_date, phase.deadline))
+
+    phases = [
+        PhaseInfo(row.id, row.phase_name, row.order_index or 0, row.deadline,
+                  totals.get(row.id, 0), completed.get(row.id, 0))
+        for row in phase_rows
+    ]
+    work_days = json.loads(student.work_days) if student.work_days else {}
+    edges = resolve_edges(PHASE_DEPENDENCY_RULES, nodes)
+    return WhatIfSnapshot(work_days, student.thesis_deadline, phases, tasks, edges)
+
+
+def validate_proposal(snapshot: WhatIfSnapshot, deadlines: Dict, work_days: Dict):
+    """
+    Parse proposed changes from JSON input.
+
+    Returns:
+        (deadline per phase id, work-day intensities)
+
+    Raises:
+        ValueError: for unknown phases or weekdays, bad dates or intensities
+    """
+    phase_ids = {phase.phase_id for phase in snapshot.phases}
+    parsed_deadlines = {}
+    for key, value in (deadlines or {}).items():
+        phase_id = int(key)
+        if phase_id not in phase_ids:
+            raise ValueError(f"Unknown phase {phase_id}")
+        parsed_deadlines[phase_id] = date.fromisoformat(value)
+
+    parsed_work_days = dict(snapshot.work_days)
+    for day, intensity in (work_days or {}).items():
+        if day not in WEEKDAYS or intensity not in INTENSITIES:
+            raise ValueError(f"Invalid work day setting {day}={intensity}")
+        parsed_work_days[day] = intensity
+
+    return parsed_deadlines, parsed_work_days
+
+
+def evaluate(snapshot: WhatIfSnapshot, today: date, deadlines: Dict[int, date] = None,
+             work_days: Dict[str, str] = None) -> Dict[str, any]:
+    """
+    Project the schedule under proposed deadlines and work days.
+
+    Args:
+        snapshot: The student's current schedule
+        today: First day tasks may be placed on
+        deadlines: Proposed deadline per phase id (others keep theirs)
+        work_days: Proposed intensity per weekday (defaults to the current ones)
+
+    Returns:
+        JSON-ready dict with projected load per day, phase criticality,
+        deadline-order conflicts and the size of the re-plan
+    """
+    deadlines = deadlines or {}
+    work_days = snapshot.work_days if work_days is None else work_days
+    phases = [phase._replace(deadline=deadlines.get(phase.phase_id, phase.deadline)) for phase in snapshot.phases]
+    phase_deadlines = {phase.phase_id: phase.deadline for phase in phases}
+
+    tasks = [task._replace(deadline=phase_deadlines[task.phase_id]) for task in snapshot.tasks]
+    end = max(phase_deadlines.values(), default=today)
+    days = work_day_capacities(json.dumps(work_days), today, end)
+    plan = plan_redistribution(tasks, days, snapshot.edges)
+
+    moved = {move.task_id: move.new_date for move in plan.moves}
+    load = {}
+    for task in tasks:
+        task_date = moved.get(task.task_id, task.current_date)
+        if task_date >= today:
+            load[task_date] = load.get(task_date, 0) + 1
+
+    projected_days = []
+    for day in sorted(set(days) | set(load)):
+        intensity, capacity = days.get(day, ('none', 0))
+        count = load.get(day, 0)
+        projected_days.append({
+            'date': day.isoformat(),
+            'intensity': intensity,
+            'capacity': capacity,
+            'load': count,
+            'over_capacity': count > capacity
+        })
+
+    remaining = {}
+    for task in tasks:
+        remaining[task.phase_id] = remaining.get(task.phase_id, 0) + 1
+
+    projected_phases = []
+    conflicts = []
+    for phase in phases:
+        days_remaining = (phase.deadline - today).days
+        work_days_left = sum(1 for day in days if day <= phase.deadline)
+        later = [p for p in phases if p.order_index > phase.order_index]
+        projected_phases.append({
+            'phase_id': phase.phase_id,
+            'phase_name': phase.phase_name,
+            'deadline': phase.deadline.isoformat(),
+            'days_remaining': days_remaining,
+            'remaining_tasks': remaining.get(phase.phase_id, 0),
+            'tasks_per_work_day': round(remaining.get(phase.phase_id, 0) / work_days_left, 2) if work_days_left else None,
+            'buffer_days': phase_buffer_days(phase.deadline, [p.deadline for p in later], snapshot.thesis_deadline),
+            'criticality': phase_criticality(days_remaining, phase.total_tasks, phase.completed_tasks).value
+        })
+        for other in later:
+            if phase.deadline >= other.deadline:
+                conflicts.append(
+                    f"{phase.phase_name} deadline ({phase.deadline.isoformat()}) is not before "
+                    f"{other.phase_name} (due {other.deadline.isoformat()})"
+                )
+
+    return {
+        'days': projected_days,
+        'phases': projected_phases,
+        'conflicts': conflicts,
+        'tasks_moved': len(plan.moves),
+        'overbooked_days': [day.isoformat() for day in plan.overbooked_days],
+        'unplaced_tasks': len(plan.unplaced),
+        'broken_dependencies': len(plan.broken_dependencies)
+    }